@@ -0,0 +1,62 @@
+import json
+
+# 펀드 여러 개의 구간 양 끝 값(기간 수익률)과 최근 row를 set 기반 쿼리 한 번으로(펀드별 전체 이력을 pandas로 읽지 않고)
+# 로컬(sqlite)은 json_each로 펀드 목록을 받아 펀드마다 (Symbol, AsOfDate) index로 양 끝 날짜만 찾음
+# window 함수(ROW_NUMBER/FIRST_VALUE)는 구간의 row를 전부 읽고 정렬해서 index seek보다 훨씬 느림
+# 원격은 IN 목록 + GROUP BY(MIN/MAX)로 같은 결과
+
+# 기간 수익률: start_date 이상 첫 거래일 ~ end_date 이하 마지막 거래일(DateIndex.between과 같은 기준)
+PERIOD_RETURN_SQL = {
+    "local": """
+        WITH ends AS (
+            SELECT j.value AS Symbol,
+                   (SELECT MIN(AsOfDate) FROM Trading
+                        WHERE Symbol = j.value AND AsOfDate >= :start_date) AS start_date,
+                   (SELECT MAX(AsOfDate) FROM Trading
+                        WHERE Symbol = j.value AND AsOfDate <= :end_date) AS end_date
+                FROM json_each(:symbols) j
+        )
+        SELECT e.Symbol, e.start_date, e.end_date,
+               CAST(s.AdjustedNAV AS REAL) AS start_nav, CAST(t.AdjustedNAV AS REAL) AS end_nav,
+               (CAST(t.AdjustedNAV AS REAL) - s.AdjustedNAV) / s.AdjustedNAV * 100 AS period_return
+            FROM ends e
+            JOIN Trading s ON s.Symbol = e.Symbol AND s.AsOfDate = e.start_date
+            JOIN Trading t ON t.Symbol = e.Symbol AND t.AsOfDate = e.end_date
+            WHERE e.start_date <= e.end_date
+    """,
+    "remote": """
+        SELECT e.Symbol, e.start_date, e.end_date,
+               CAST(s.AdjustedNAV AS DOUBLE) AS start_nav, CAST(t.AdjustedNAV AS DOUBLE) AS end_nav,
+               (CAST(t.AdjustedNAV AS DOUBLE) - s.AdjustedNAV) / s.AdjustedNAV * 100 AS period_return
+            FROM (SELECT Symbol, MIN(AsOfDate) AS start_date, MAX(AsOfDate) AS end_date
+                    FROM Trading
+                    WHERE Symbol IN :symbols AND AsOfDate >= :start_date AND AsOfDate <= :end_date
+                    GROUP BY Symbol) e
+            JOIN Trading s ON s.Symbol = e.Symbol AND s.AsOfDate = e.start_date
+            JOIN Trading t ON t.Symbol = e.Symbol AND t.AsOfDate = e.end_date
+    """,
+}
+
+# 펀드별 target date 이하 마지막 row
+LATEST_ROW_SQL = {
+    "local": """
+        SELECT t.Symbol, t.AsOfDate, t.NAV, t.AdjustedNAV, t.AUM, t.ShareClassAUM
+            FROM json_each(:symbols) j
+            JOIN Trading t ON t.Symbol = j.value
+                AND t.AsOfDate = (SELECT MAX(AsOfDate) FROM Trading
+                                    WHERE Symbol = j.value AND AsOfDate <= :target_date)
+    """,
+    "remote": """
+        SELECT t.Symbol, t.AsOfDate, t.NAV, t.AdjustedNAV, t.AUM, t.ShareClassAUM
+            FROM (SELECT Symbol, MAX(AsOfDate) AS max_date
+                    FROM Trading
+                    WHERE Symbol IN :symbols AND AsOfDate <= :target_date
+                    GROUP BY Symbol) l
+            JOIN Trading t ON t.Symbol = l.Symbol AND t.AsOfDate = l.max_date
+    """,
+}
+
+
+# 펀드 목록 bind parameter(로컬은 json 문자열, 원격은 IN 목록으로 펼쳐지는 tuple)
+def symbol_param(symbol_tuple: tuple, remote: bool = False):
+    return tuple(symbol_tuple) if remote else json.dumps(list(symbol_tuple))
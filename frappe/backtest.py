@@ -0,0 +1,206 @@
+import argparse
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from frappeController import TRADE_SCHEMA, FrappeController, compact_frame
+from logger import CustomLogger
+from tradingCalendar import DateIndex
+
+logger = CustomLogger()
+
+# 연율화에 쓰는 1년 거래일 수
+TRADING_DAYS = 252
+
+
+# 백테스트 기간 전체의 펀드 가격을 한 번에 읽어 메모리에 들고 있는 panel
+# frames: 펀드별 frame(get_fund_trade_df 캐시와 같은 모양), nav: 날짜 x 펀드 AdjustedNAV
+class PricePanel:
+    def __init__(self, float_dtype: str = "float64"):
+        self.float_dtype = float_dtype
+        self.frames = {}
+        self.nav = pd.DataFrame()
+
+    def __contains__(self, symbol: str):
+        return symbol in self.frames
+
+    # 로컬 Trading에서 end date까지의 데이터를 한 번의 쿼리로 추가
+    def load(self, local_store, symbol_tuple: tuple, end_date: str):
+        symbols = [symbol for symbol in symbol_tuple if symbol not in self.frames]
+        if not symbols:
+            return
+        query = """
+            SELECT * FROM Trading
+                WHERE Symbol IN (SELECT value FROM json_each(:symbols)) AND AsOfDate <= :end_date
+                ORDER BY Symbol, AsOfDate
+        """
+        trade_df = local_store.read_df(query, {"symbols": json.dumps(symbols), "end_date": end_date})
+        trade_df = trade_df.set_index(pd.DatetimeIndex(trade_df.pop('AsOfDate'), name='AsOfDate'))
+        trade_df = compact_frame(trade_df, TRADE_SCHEMA, self.float_dtype)
+
+        for symbol, frame in trade_df.groupby('Symbol', observed=True, sort=False):
+            self.frames[symbol] = frame
+
+        nav = trade_df.astype({'Symbol': str}).pivot(columns='Symbol', values='AdjustedNAV').astype('float')
+        self.nav = pd.concat([self.nav, nav], axis=1).sort_index().ffill()
+
+    # controller 캐시에 panel frame 넣기(target date로 자르는 건 get_fund_trade_df에서)
+    def install(self, controller: FrappeController):
+        controller.cache_fund_dict.update(self.frames)
+
+    # start ~ end 동안 weights대로 사서 들고 있을 때의 가치(start = 1)
+    def holding_path(self, weights: dict, start, end) -> pd.Series:
+        window = self.nav.iloc[DateIndex(self.nav.index).between(start, end)]
+        symbols = [symbol for symbol in weights if symbol in window.columns and window[symbol].iloc[0] > 0]
+        if window.empty or not symbols:
+            return pd.Series(1.0, index=window.index)
+
+        weight = np.array([weights[symbol] for symbol in symbols], dtype=float)
+        price = window[symbols].to_numpy()
+        path = (price / price[0]) @ (weight / weight.sum())
+        return pd.Series(path, index=window.index)
+
+
+# 리밸런싱 날짜마다 RA 프로세스를 돌리고 위험 유형별 포트폴리오 NAV 구하기
+# 가격은 PricePanel 하나로, bm/유니버스/macro score는 controller 캐시와 로컬 복사본으로 재사용
+class Backtest:
+    def __init__(self, controller: FrappeController, start_date: str, end_date: str, freq: str = "M",
+                 user_risk_type: dict = None, sync: bool = True):
+        self.controller = controller
+        self.start_date = start_date
+        self.end_date = end_date
+        self.freq = freq
+        self.user_risk_type = user_risk_type if user_risk_type is not None else controller.config["RISK_TYPE"]
+        self.sync = sync
+        self.panel = PricePanel(controller.cache_float_dtype)
+
+        self.rebalance_dates = []
+        self.portfolios = {}  # 리밸런싱 날짜 -> 위험 유형별 {asset_id: weight}
+        self.skipped = []  # (날짜, 에러) 포트폴리오를 못 만든 날짜는 직전 포트폴리오 유지
+        self.nav = None
+
+    # 기간 안의 freq 날짜들을 로컬 거래일(as-of)로
+    def trading_dates(self) -> list:
+        calendar = self.controller.local_store.execute("""
+            SELECT DISTINCT AsOfDate FROM Trading WHERE AsOfDate <= :end_date ORDER BY AsOfDate
+        """, {"end_date": self.end_date})
+        calendar = DateIndex([row[0] for row in calendar])
+
+        candidates = pd.date_range(self.start_date, self.end_date, freq=self.freq)
+        positions = sorted({calendar.as_of(date) for date in candidates} - {-1})
+        return [calendar.date(pos).strftime("%Y-%m-%d") for pos in positions]
+
+    # 리밸런싱 날짜들의 유니버스를 로컬에 맞추고(sync면 가격도) 전체 펀드 symbol 돌려주기
+    def sync_universe(self) -> tuple:
+        controller = self.controller
+        candidates = [date.strftime("%Y-%m-%d") for date in pd.date_range(self.start_date, self.end_date,
+                                                                          freq=self.freq)]
+        symbols = set()
+        for date in candidates:
+            symbols.update(controller.load_funds_info(controller.customer_db_adaptor, date)['asset_id'])
+
+        if self.sync:
+            controller.dump_fund_trading_data(tuple(sorted(symbols)))
+            controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+        return tuple(sorted(symbols))
+
+    # 리밸런싱 날짜 정하고 panel 만들기
+    def prepare(self):
+        symbol_tuple = self.sync_universe()
+        self.rebalance_dates = self.trading_dates()
+        self.panel.load(self.controller.local_store, symbol_tuple, self.end_date)
+        self.panel.install(self.controller)
+
+    def rebalance(self, target_date: str) -> dict:
+        controller = self.controller
+
+        # 거래일로 옮기면서 유니버스 snapshot이 바뀐 경우
+        universe = tuple(controller.load_funds_info(controller.customer_db_adaptor, target_date)['asset_id'])
+        missing = tuple(symbol for symbol in universe if symbol not in self.panel)
+        if missing:
+            self.panel.load(controller.local_store, missing, self.end_date)
+            self.panel.install(controller)
+
+        fund_df = controller.run_pipeline(target_date, self.user_risk_type)
+        return {risk_type: dict(zip(portfolio_df['asset_id'], portfolio_df['weight'].astype(float)))
+                for risk_type, portfolio_df in fund_df["new_portfolio_by_risk"].items()}
+
+    def run(self) -> pd.DataFrame:
+        if not self.rebalance_dates:
+            self.prepare()
+        self.panel.install(self.controller)
+        logger.log(f"백테스트 시작: {self.start_date} ~ {self.end_date}, 리밸런싱 {len(self.rebalance_dates)}번")
+
+        for target_date in self.rebalance_dates:
+            try:
+                self.portfolios[target_date] = self.rebalance(target_date)
+            except (IndexError, KeyError, ValueError, ZeroDivisionError) as e:
+                logger.log_error(f"{target_date} 포트폴리오 산출 실패, 직전 포트폴리오 유지: {e!r}")
+                self.skipped.append((target_date, repr(e)))
+
+        self.nav = self.nav_paths()
+        logger.log(f"백테스트 끝: 실패 {len(self.skipped)}번")
+        return self.nav
+
+    # 다른 곳(work queue 등)에서 계산한 리밸런싱 포트폴리오로 NAV 구하기
+    def load_portfolios(self, portfolios: dict) -> pd.DataFrame:
+        self.portfolios = dict(portfolios)
+        symbols = {symbol for holdings in self.portfolios.values() for weights in holdings.values()
+                   for symbol in weights}
+        self.panel.load(self.controller.local_store, tuple(sorted(symbols)), self.end_date)
+        self.nav = self.nav_paths()
+        return self.nav
+
+    # 리밸런싱 구간마다 들고 있는 가치를 이어 붙인 위험 유형별 NAV(첫 리밸런싱 날 = 1)
+    def nav_paths(self) -> pd.DataFrame:
+        dates = sorted(self.portfolios)
+        if not dates:
+            return pd.DataFrame()
+        ends = dates[1:] + [self.end_date]
+
+        paths = {}
+        for risk_type in self.user_risk_type:
+            segments = []
+            level = 1.0
+            for start, end in zip(dates, ends):
+                segment = self.panel.holding_path(self.portfolios[start].get(risk_type, {}), start, end) * level
+                if segments:
+                    segment = segment.iloc[1:]  # 구간 시작일은 직전 구간의 마지막 날
+                if not segment.empty:
+                    level = segment.iloc[-1]
+                    segments.append(segment)
+            paths[risk_type] = pd.concat(segments)
+        return pd.DataFrame(paths)
+
+    # 위험 유형별 성과 요약(수익률, 변동성, MDD는 %)
+    def summary(self) -> pd.DataFrame:
+        rows = {}
+        for risk_type, path in self.nav.items():
+            path = path.dropna()
+            years = (path.index[-1] - path.index[0]).days / 365.25
+            daily = np.diff(np.log(path.to_numpy()))
+            rows[risk_type] = {
+                "total_return": (path.iloc[-1] - 1) * 100,
+                "annual_return": (path.iloc[-1] ** (1 / years) - 1) * 100 if years > 0 else np.nan,
+                "volatility": daily.std(ddof=1) * math.sqrt(TRADING_DAYS) * 100 if len(daily) > 1 else np.nan,
+                "max_drawdown": ((path / path.cummax()).min() - 1) * 100,
+            }
+        return pd.DataFrame(rows).T
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="기간 동안 리밸런싱하면서 위험 유형별 포트폴리오 NAV 구하기")
+    parser.add_argument('--start', required=True)
+    parser.add_argument('--end', required=True)
+    parser.add_argument('--freq', default="M", help="pandas date_range freq(M: 월말, W-FRI: 매주 금요일 ...)")
+    parser.add_argument('--no-sync', action='store_true', help="원격과 동기화하지 않고 로컬 데이터만 사용")
+    parser.add_argument('--output', help="NAV를 csv로 저장")
+    args = parser.parse_args()
+
+    backtest = Backtest(FrappeController(), args.start, args.end, args.freq, sync=not args.no_sync)
+    nav = backtest.run()
+    print(backtest.summary().round(2).to_string())
+    if args.output:
+        nav.to_csv(args.output)
@@ -0,0 +1,89 @@
+# 백테스트 벤치마크: 날짜마다 test_app처럼 캐시 없이 파이프라인 실행 vs Backtest(PricePanel 재사용)
+# 사용법(frappe 디렉토리에서): python -m bench.backtest [--funds 200] [--start 2020-08-01]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from backtest import Backtest
+from bench import synthetic
+from bench.results import save_result
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+def portfolio_weights(fund_df: dict) -> dict:
+    return {risk_type: dict(zip(portfolio_df['asset_id'], portfolio_df['weight'].astype(float)))
+            for risk_type, portfolio_df in fund_df["new_portfolio_by_risk"].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="백테스트 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--start', default='2020-08-01')
+    parser.add_argument('--end', default='2021-08-09')
+    parser.add_argument('--freq', default='M')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.end)
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_backtest_bench_")
+    try:
+        controller = FrappeController(local_db_file=os.path.join(local_dir, 'local.db'))
+
+        # 동기화/panel 준비는 따로 재고, 두 방식 모두 같은 로컬 db에서
+        backtest = Backtest(controller, args.start, args.end, args.freq)
+        started = time.perf_counter()
+        backtest.prepare()
+        prepare_s = time.perf_counter() - started
+
+        # 1. 날짜마다 캐시를 비우고 처음부터(test_app을 날짜마다 돌리는 것과 같음)
+        started = time.perf_counter()
+        naive = {}
+        for target_date in backtest.rebalance_dates:
+            FrappeController.cache_fund_dict.clear()
+            FrappeController.cache_bm_price_dict.clear()
+            naive[target_date] = portfolio_weights(controller.run_pipeline(target_date))
+        naive_s = time.perf_counter() - started
+
+        # 2. panel 하나로 전체 기간
+        FrappeController.cache_fund_dict.clear()
+        FrappeController.cache_bm_price_dict.clear()
+        started = time.perf_counter()
+        backtest.run()
+        engine_s = time.perf_counter() - started
+
+        controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {
+        "funds": args.funds, "start": args.start, "end": args.end, "freq": args.freq,
+        "rebalances": len(backtest.rebalance_dates),
+        "prepare_s": prepare_s,
+        "naive_s": naive_s,
+        "engine_s": engine_s,
+        "speedup": naive_s / engine_s if engine_s else None,
+        "same_portfolios": naive == backtest.portfolios,
+        "skipped": len(backtest.skipped),
+        "summary": backtest.summary().round(4).to_dict(orient='index'),
+    }
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("backtest", result)
+
+
+if __name__ == '__main__':
+    main()
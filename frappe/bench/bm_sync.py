@@ -0,0 +1,138 @@
+# BM 동기화: source 3개 UNION 쿼리(이전 방식) vs source별 동시 동기화. 여러 해 backfill과 최근 며칠 gap
+# 사용법(frappe 디렉토리에서): python -m bench.bm_sync [--years 11] [--latency-ms 30] [--bandwidth-mbps 20]
+# recent_gap은 원격에 최근 gap_days 만큼 새로 들어온 상황(원격 복사본에서 지웠다가 원래 원격으로)
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from bench import synthetic
+from bench.results import save_result
+from bench.sync import LatencyDBAdaptor
+from frappeController import BM_SOURCES, FrappeController
+from logger import CustomLogger, NullSink
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+# 이전 dump_bm_price_data: max date와 데이터를 각각 3-way UNION 한 번에, 전부 받은 다음 저장
+def union_dump(controller: FrappeController, bm_symbol_tuple: tuple):
+    remote_sql = """
+        SELECT MAX(AsOfDate) as max_date FROM FTSE WHERE Symbol IN :symbols
+        UNION
+        SELECT MAX(AsOfDate) as max_date FROM MerrillLynch WHERE Symbol IN :symbols
+        UNION
+        SELECT MAX(AsOfDate) as max_date FROM GSCI WHERE Symbol IN :symbols
+    """
+    local_sql = """
+        SELECT MAX(AsOfDate) as max_date FROM BM_price WHERE Symbol IN (SELECT value FROM json_each(:symbols))
+    """
+    remote_max_date, local_max_date = controller.get_local_remote_date(
+        controller.bm_db_adaptor, remote_sql, local_sql,
+        {"symbols": bm_symbol_tuple}, {"symbols": json.dumps(list(bm_symbol_tuple))})
+    if local_max_date == remote_max_date:
+        return
+
+    load_sql = """
+        SELECT AsOfDate, Symbol, Price, IndexName FROM FTSE
+            WHERE Symbol IN :symbols AND AsOfDate > :from_date AND AsOfDate <= :to_date
+        UNION
+        SELECT AsOfDate, Symbol, Price, IndexName FROM MerrillLynch
+            WHERE Symbol IN :symbols AND AsOfDate > :from_date AND AsOfDate <= :to_date
+        UNION
+        SELECT AsOfDate, Symbol, Price, IndexName FROM GSCI
+            WHERE Symbol IN :symbols AND AsOfDate > :from_date AND AsOfDate <= :to_date
+    """
+    params = {"symbols": bm_symbol_tuple, "from_date": local_max_date, "to_date": remote_max_date}
+    load_df = controller.bm_db_adaptor.get(load_sql, params).df()
+    if not load_df.empty:
+        controller.local_store.write_df(load_df.astype('str'), 'BM_price')
+
+
+def snapshot(controller: FrappeController) -> list:
+    return controller.local_store.execute("SELECT AsOfDate, Symbol, Price FROM BM_price ORDER BY AsOfDate, Symbol")
+
+
+def measure(controller: FrappeController, dump, bm_symbol_tuple: tuple) -> dict:
+    controller.bm_db_adaptor.reset_counters()
+    rows_before = controller.local_store.execute("SELECT COUNT(*) FROM BM_price")[0][0]
+    start = time.perf_counter()
+    dump(controller, bm_symbol_tuple)
+    elapsed = time.perf_counter() - start
+    rows = controller.local_store.execute("SELECT COUNT(*) FROM BM_price")[0][0] - rows_before
+    return {"seconds": elapsed, "rows": rows, "queries": controller.bm_db_adaptor.query_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM 동기화 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--bandwidth-mbps', type=float, default=20)
+    parser.add_argument('--gap-days', type=int, default=20)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    methods = {"union": union_dump,
+               "per_source": lambda controller, bm_symbol_tuple: controller.dump_bm_price_data(bm_symbol_tuple)}
+    local_dir = tempfile.mkdtemp(prefix="frappe_bm_sync_bench_")
+    scenarios, snapshots = {}, {}
+    try:
+        # 최근 gap_days 만큼 아직 안 들어온 원격 db 복사본
+        lagging_db = os.path.join(local_dir, 'bm_lagging.db')
+        shutil.copy(manifest["uris"]["BM_DB"][len("sqlite:///"):], lagging_db)
+        with sqlite3.connect(lagging_db) as conn:
+            for source in BM_SOURCES:
+                conn.execute(f"""DELETE FROM {source} WHERE AsOfDate > (
+                                    SELECT DISTINCT AsOfDate FROM {source} ORDER BY AsOfDate DESC
+                                    LIMIT 1 OFFSET {args.gap_days})""")
+
+        for name, dump in methods.items():
+            controller = FrappeController(local_db_file=os.path.join(local_dir, f'{name}.db'))
+            bm_symbol_tuple = tuple(controller.config["ASSET_CLASS_MAP"].values())
+
+            # 1. 빈 로컬 db에 여러 해(gap 전까지)
+            controller.bm_db_adaptor = LatencyDBAdaptor(f"sqlite:///{lagging_db}", args.latency_ms,
+                                                        args.bandwidth_mbps)
+            scenarios.setdefault("backfill", {})[name] = measure(controller, dump, bm_symbol_tuple)
+            controller.bm_db_adaptor.close()
+
+            # 2. 원격에 최근 gap_days 데이터가 들어온 다음
+            controller.bm_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BM_DB"], args.latency_ms,
+                                                        args.bandwidth_mbps)
+            scenarios.setdefault("recent_gap", {})[name] = measure(controller, dump, bm_symbol_tuple)
+
+            # 3. 이미 최신
+            scenarios.setdefault("up_to_date", {})[name] = measure(controller, dump, bm_symbol_tuple)
+
+            snapshots[name] = snapshot(controller)
+            controller.bm_db_adaptor.close()
+            controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    for scenario in scenarios.values():
+        scenario["speedup"] = scenario["union"]["seconds"] / scenario["per_source"]["seconds"] \
+            if scenario["per_source"]["seconds"] else None
+    result = {"params": {key: value for key, value in vars(args).items() if key not in ('no_save', 'data_dir')},
+              "scenarios": scenarios,
+              "same_rows": snapshots["union"] == snapshots["per_source"]}
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("bm_sync", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# 새 설치 cold start: 원격에서 전체 backfill vs bundle 불러오기 + bundle 이후만 동기화
+# bundle은 원격에 최근 gap_days가 아직 없을 때 만든 것(원격 복사본에서 지우고 동기화한 로컬 db)
+# 사용법(frappe 디렉토리에서): python -m bench.bootstrap [--funds 200] [--latency-ms 30] [--bandwidth-mbps 20]
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from bench import synthetic
+from bench.results import save_result
+from bench.sync import LatencyDBAdaptor
+from frappeController import BM_SOURCES, FrappeController
+from logger import CustomLogger, NullSink
+from snapshotBundle import export_bundle, import_bundle
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+# 최근 gap_days가 아직 안 들어온 원격 db 복사본
+def lagging_copy(uri: str, path: str, tables: tuple, gap_days: int) -> str:
+    shutil.copy(uri[len("sqlite:///"):], path)
+    with sqlite3.connect(path) as conn:
+        for table in tables:
+            conn.execute(f"""DELETE FROM {table} WHERE AsOfDate > (
+                                SELECT DISTINCT AsOfDate FROM {table} ORDER BY AsOfDate DESC
+                                LIMIT 1 OFFSET {gap_days})""")
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+def sync(controller: FrappeController, symbol_tuple: tuple, bm_symbol_tuple: tuple):
+    controller.dump_fund_trading_data(symbol_tuple)
+    controller.dump_bm_price_data(bm_symbol_tuple)
+
+
+def snapshot(controller: FrappeController) -> dict:
+    return {table: controller.local_store.execute(f"SELECT * FROM {table} ORDER BY AsOfDate, Symbol")
+            for table in ("Trading", "BM_price")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cold start bootstrap 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--bandwidth-mbps', type=float, default=20)
+    parser.add_argument('--gap-days', type=int, default=20)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_bootstrap_bench_")
+    try:
+        # bundle 만들기(측정 안 함)
+        builder = FrappeController(local_db_file=os.path.join(local_dir, 'builder.db'))
+        symbol_tuple = tuple(builder.load_funds_info(builder.customer_db_adaptor, args.target_date)['asset_id'])
+        bm_symbol_tuple = tuple(builder.config["ASSET_CLASS_MAP"].values())
+        builder.price_db_adaptor.close()
+        builder.bm_db_adaptor.close()
+        builder.price_db_adaptor = LatencyDBAdaptor(lagging_copy(
+            manifest["uris"]["BLUE_DB"], os.path.join(local_dir, 'blue_lagging.db'), ("Trading",), args.gap_days), 0, 0)
+        builder.bm_db_adaptor = LatencyDBAdaptor(lagging_copy(
+            manifest["uris"]["BM_DB"], os.path.join(local_dir, 'bm_lagging.db'), BM_SOURCES, args.gap_days), 0, 0)
+        sync(builder, symbol_tuple, bm_symbol_tuple)
+        bundle_path = os.path.join(local_dir, 'frappe.bundle')
+        start = time.perf_counter()
+        bundle = export_bundle(builder.local_store, bundle_path)
+        export_s = time.perf_counter() - start
+        builder.local_store.close()
+
+        scenarios, snapshots = {}, {}
+        for name in ("backfill", "bundle"):
+            FrappeController.cache_fund_dict.clear()
+            FrappeController.cache_bm_price_dict.clear()
+            controller = FrappeController(local_db_file=os.path.join(local_dir, f'{name}.db'))
+            controller.price_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BLUE_DB"], args.latency_ms,
+                                                           args.bandwidth_mbps)
+            controller.bm_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BM_DB"], args.latency_ms,
+                                                        args.bandwidth_mbps)
+
+            start = time.perf_counter()
+            import_s = 0
+            if name == "bundle":
+                import_s = import_bundle(controller.local_store, bundle_path)["seconds"]
+            sync(controller, symbol_tuple, bm_symbol_tuple)
+            elapsed = time.perf_counter() - start
+
+            adaptors = (controller.price_db_adaptor, controller.bm_db_adaptor)
+            scenarios[name] = {"seconds": elapsed, "import_s": import_s,
+                               "queries": sum(adaptor.query_count for adaptor in adaptors),
+                               "bytes_fetched": sum(adaptor.bytes_fetched for adaptor in adaptors)}
+            snapshots[name] = snapshot(controller)
+            for adaptor in adaptors:
+                adaptor.close()
+            controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {"params": {key: value for key, value in vars(args).items() if key not in ('no_save', 'data_dir')},
+              "bundle": {"export_s": export_s, "db_bytes": bundle["db_bytes"], "gz_bytes": bundle["gz_bytes"]},
+              "scenarios": scenarios,
+              "speedup": scenarios["backfill"]["seconds"] / scenarios["bundle"]["seconds"],
+              "same_rows": snapshots["backfill"] == snapshots["bundle"]}
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("bootstrap", result)
+
+
+if __name__ == '__main__':
+    main()
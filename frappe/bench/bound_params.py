@@ -0,0 +1,100 @@
+# symbol별 동기화 루프의 쿼리 비용 비교: 값을 sql에 직접 넣기 vs bind parameter(statement 재사용)
+# 사용법(frappe 디렉토리에서): python -m bench.bound_params [--funds 300] [--rounds 3]
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from bench import synthetic
+from bench.results import save_result
+from frappeController import DBAdaptor
+from localStore import LocalStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+MAX_DATE_SQL = "SELECT MAX(AsOfDate) as max_date FROM Trading WHERE Symbol = :symbol"
+LOAD_SQL = """SELECT AsOfDate, Symbol, CompanyCode, NAV, AUM, NetAssets, AdjustedNAV, ShareClassAUM
+                FROM Trading WHERE Symbol = :symbol AND AsOfDate > :from_date AND AsOfDate <= :to_date"""
+
+
+def inline(sql: str, params: dict) -> str:
+    for name, value in params.items():
+        sql = sql.replace(f":{name}", f"'{value}'")
+    return sql
+
+
+# 동기화 루프와 같은 모양: symbol마다 max date 조회 + 최근 하루치 조회
+def remote_loop(adaptor: DBAdaptor, symbols: list, from_date: str, to_date: str, bound: bool) -> float:
+    start = time.perf_counter()
+    for symbol in symbols:
+        params = {"symbol": symbol}
+        load_params = {"symbol": symbol, "from_date": from_date, "to_date": to_date}
+        if bound:
+            adaptor.get(MAX_DATE_SQL, params)
+            adaptor.get(LOAD_SQL, load_params)
+        else:
+            adaptor.get(inline(MAX_DATE_SQL, params))
+            adaptor.get(inline(LOAD_SQL, load_params))
+    return time.perf_counter() - start
+
+
+def local_loop(store: LocalStore, symbols: list, bound: bool) -> float:
+    start = time.perf_counter()
+    for symbol in symbols:
+        params = {"symbol": symbol}
+        if bound:
+            store.execute(MAX_DATE_SQL, params)
+        else:
+            store.execute(inline(MAX_DATE_SQL, params))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bind parameter 쿼리 벤치마크")
+    parser.add_argument('--funds', type=int, default=300)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    blue_file = manifest["uris"]["BLUE_DB"][len("sqlite:///"):]
+    with sqlite3.connect(blue_file) as conn:
+        symbols = [row[0] for row in conn.execute("SELECT DISTINCT Symbol FROM Trading")]
+        dates = [row[0] for row in conn.execute("SELECT DISTINCT AsOfDate FROM Trading ORDER BY AsOfDate DESC LIMIT 2")]
+
+    # 로컬은 합성 원격 파일 복사본을 LocalStore로 읽기
+    local_dir = tempfile.mkdtemp(prefix="frappe_bind_bench_")
+    try:
+        local_file = os.path.join(local_dir, 'local.db')
+        shutil.copyfile(blue_file, local_file)
+        store = LocalStore(local_file)
+        adaptor = DBAdaptor(manifest["uris"]["BLUE_DB"])
+
+        result = {"funds": len(symbols), "queries_per_round": {"remote": len(symbols) * 2, "local": len(symbols)}}
+        for name, run in (("remote", lambda bound: remote_loop(adaptor, symbols, dates[1], dates[0], bound)),
+                          ("local", lambda bound: local_loop(store, symbols, bound))):
+            # 처음 한 번은 연결/캐시 준비용으로 버림
+            run(True)
+            inline_s = min(run(False) for _ in range(args.rounds))
+            bound_s = min(run(True) for _ in range(args.rounds))
+            result[name] = {"inline_s": inline_s, "bound_s": bound_s, "speedup": inline_s / bound_s}
+
+        adaptor.close()
+        store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("bound_params", result)
+
+
+if __name__ == '__main__':
+    main()
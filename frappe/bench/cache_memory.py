@@ -0,0 +1,71 @@
+# 캐시 frame 메모리 비교: sqlite에서 읽은 그대로 vs compact dtype(float64/float32)
+# 사용법(frappe 디렉토리에서): python -m bench.cache_memory [--funds 1000]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from bench import synthetic
+from bench.results import save_result
+from frappeConfig import get_config
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="캐시 frame 메모리 벤치마크")
+    parser.add_argument('--funds', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_memory_bench_")
+    try:
+        result = {"funds": args.funds, "years": args.years}
+        for float_dtype in ("float64", "float32"):
+            FrappeController.cache_fund_dict.clear()
+            FrappeController.cache_bm_price_dict.clear()
+            controller = FrappeController(config={**get_config(), "CACHE_FLOAT_DTYPE": float_dtype},
+                                          local_db_file=os.path.join(local_dir, 'local.db'))
+            symbols = tuple(controller.load_funds_info(controller.customer_db_adaptor, args.target_date)['asset_id'])
+            controller.dump_fund_trading_data(symbols)
+
+            # 전체 universe를 캐시에 올리기
+            for symbol in symbols:
+                controller.get_fund_trade_df(symbol, args.target_date)
+            report = controller.memory_report()
+
+            # 같은 데이터를 읽은 그대로 들고 있을 때
+            raw_bytes = 0
+            for symbol in symbols:
+                df = controller.local_store.read_df(
+                    "SELECT * FROM Trading WHERE Symbol = :symbol AND AsOfDate <= :target_date",
+                    {"symbol": symbol, "target_date": args.target_date}).set_index('AsOfDate')
+                raw_bytes += int(df.memory_usage(index=True, deep=True).sum())
+
+            result[float_dtype] = {"raw_bytes": raw_bytes, "compact_bytes": report["fund_bytes"],
+                                   "bytes_per_fund": report["bytes_per_fund"], "bytes_per_row": report["bytes_per_row"],
+                                   "reduction": raw_bytes / report["fund_bytes"]}
+            controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("cache_memory", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# headless 파이프라인 cold start 시간 측정
+# 사용법(frappe 디렉토리에서): python -m bench.cold_start [--target-date 2021-08-09] [--repeat 3]
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from bench.results import save_result
+
+FRAPPE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 새 프로세스에서 실행할 코드: import -> controller 생성 -> (선택) 파이프라인 실행
+CHILD_CODE = """
+import json, sys, time
+t0 = time.perf_counter()
+from frappeController import FrappeController
+t1 = time.perf_counter()
+controller = FrappeController()
+t2 = time.perf_counter()
+timing = {"import_s": t1 - t0, "init_s": t2 - t1}
+if len(sys.argv) > 1:
+    controller.run_pipeline(sys.argv[1])
+    timing["pipeline_s"] = time.perf_counter() - t2
+timing["total_s"] = time.perf_counter() - t0
+print(json.dumps(timing))
+"""
+
+
+def measure_once(target_date: str = None) -> dict:
+    cmd = [sys.executable, '-c', CHILD_CODE] + ([target_date] if target_date else [])
+    out = subprocess.run(cmd, cwd=FRAPPE_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="headless cold start 측정")
+    parser.add_argument('--target-date', default=None, help="지정하면 파이프라인까지 실행")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    runs = [measure_once(args.target_date) for _ in range(args.repeat)]
+    result = {
+        "target_date": args.target_date,
+        "runs": runs,
+        "best": {key: min(run[key] for run in runs) for key in runs[0]},
+    }
+    print(json.dumps(result["best"], indent=2))
+    if not args.no_save:
+        save_result("cold_start", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# 고객 일괄 포트폴리오: 합성 고객 테이블로 처리량 측정, RISK_TYPE 점수 고객은 파이프라인 결과와 비교
+# 사용법(frappe 디렉토리에서): python -m bench.customer_batch [--customers 500000]
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from bench import synthetic
+from bench.results import save_result
+from customerBatch import CustomerBatch
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+# 합성 oak db 복사본에 고객 테이블 만들기(앞쪽 고객은 RISK_TYPE 값, 일부는 점수 없음)
+def make_customers(oak_db: str, count: int, risk_scores: list, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    scores = rng.uniform(0, 1, count)
+    scores[:len(risk_scores)] = risk_scores
+    scores[len(risk_scores)::97] = np.nan
+    with sqlite3.connect(oak_db) as conn:
+        conn.execute("DROP TABLE IF EXISTS customer")
+        conn.execute("CREATE TABLE customer (customer_id INTEGER PRIMARY KEY, risk_score DECIMAL)")
+        conn.executemany("INSERT INTO customer VALUES (?, ?)",
+                         ((i + 1, None if np.isnan(score) else float(score)) for i, score in enumerate(scores)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="고객 일괄 포트폴리오 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--customers', type=int, default=500000)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    work_dir = tempfile.mkdtemp(prefix="frappe_customer_bench_")
+    try:
+        oak_db = os.path.join(work_dir, 'oak.db')
+        shutil.copy(manifest["uris"]["OAK_DB"][len("sqlite:///"):], oak_db)
+        os.environ["OAK_DB"] = f"sqlite:///{oak_db}"
+
+        controller = FrappeController(local_db_file=os.path.join(work_dir, 'local.db'))
+        risk_type = controller.config["RISK_TYPE"]
+        make_customers(oak_db, args.customers, list(risk_type.values()))
+
+        stats = CustomerBatch(controller, args.target_date).run()
+
+        # RISK_TYPE 점수 고객(id 1~5, 결과 테이블에는 문자열 id)의 포트폴리오가 파이프라인 결과와 같은지
+        fund_df = controller.run_pipeline(args.target_date)
+        with sqlite3.connect(oak_db) as conn:
+            saved = conn.execute("""
+                SELECT c.customer_id, i.asset_id, i.weight
+                    FROM customer_portfolio c JOIN customer_portfolio_item i
+                    ON c.portfolio_id = i.portfolio_id AND c.date = i.date
+                    WHERE c.customer_id IN ({})
+            """.format(", ".join("?" * len(risk_type))), [str(i + 1) for i in range(len(risk_type))]).fetchall()
+            saved_rows = conn.execute("SELECT COUNT(*) FROM customer_portfolio").fetchone()[0]
+        matched = all(
+            sorted((asset_id, weight) for customer_id, asset_id, weight in saved if customer_id == str(i + 1))
+            == sorted(zip(fund_df["new_portfolio_by_risk"][name]['asset_id'],
+                          fund_df["new_portfolio_by_risk"][name]['weight'].astype(float)))
+            for i, name in enumerate(risk_type))
+        controller.local_store.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {"table_customers": args.customers, "saved_rows": saved_rows, "matches_pipeline": matched, **stats}
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("customer_batch", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# 큰 Trading 조회를 DataFrame으로 만드는 비용 비교: row 목록으로 만들기 vs column 배열로 만들기
+# sqlite(숫자를 float으로 줌)와 MySQL DECIMAL처럼 Decimal로 주는 원격 두 가지
+# 사용법(frappe 디렉토리에서): python -m bench.fetch [--funds 1000] [--rounds 3]
+import argparse
+import decimal
+import json
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from bench import synthetic
+from bench.results import save_result
+from frappeController import DBAdaptor, FRAFetchResult
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+QUERY = "SELECT AsOfDate, Symbol, CompanyCode, NAV, AUM, NetAssets, AdjustedNAV, ShareClassAUM FROM Trading"
+
+
+# MySQL DECIMAL column처럼 숫자를 Decimal로 주는 cursor(메모리에 올려둔 row에서, 측정에 조회 시간은 빠짐)
+class DecimalCursor:
+    def __init__(self, keys: list, rows: list):
+        self._keys = keys
+        self._rows = rows
+        self._position = 0
+
+    def keys(self):
+        return self._keys
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def fetchmany(self, size: int):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def close(self):
+        pass
+
+
+def decimal_rows(adaptor: DBAdaptor) -> (list, list):
+    result = adaptor.connect().execute(adaptor.statement(QUERY))
+    keys = list(result.keys())
+    rows = [tuple(decimal.Decimal(str(value)) if isinstance(value, float) else value for value in row)
+            for row in result.fetchall()]
+    result.close()
+    return keys, rows
+
+
+# 이전 방식: fetchall()한 row 목록에서 DataFrame
+def rows_path(open_cursor) -> pd.DataFrame:
+    result = open_cursor()
+    data = result.fetchall()
+    keys = result.keys()
+    result.close()
+    return pd.DataFrame(columns=keys, data=data)
+
+
+def columnar_path(open_cursor) -> pd.DataFrame:
+    result = open_cursor()
+    fetch_result = FRAFetchResult.from_cursor(result)
+    result.close()
+    return fetch_result.df()
+
+
+def measure(func, open_cursor, rounds: int) -> dict:
+    seconds = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        df = func(open_cursor)
+        seconds.append(time.perf_counter() - start)
+        del df
+
+    tracemalloc.start()
+    df = func(open_cursor)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rows": len(df), "best_s": min(seconds), "peak_memory_mb": peak / 1024 / 1024,
+            "df_memory_mb": df.memory_usage(deep=True).sum() / 1024 / 1024}
+
+
+def compare(open_cursor, rounds: int) -> dict:
+    result = {"rows": measure(rows_path, open_cursor, rounds), "columnar": measure(columnar_path, open_cursor, rounds)}
+    result["speedup"] = result["rows"]["best_s"] / result["columnar"]["best_s"]
+    result["peak_memory_ratio"] = result["columnar"]["peak_memory_mb"] / result["rows"]["peak_memory_mb"]
+    result["df_memory_ratio"] = result["columnar"]["df_memory_mb"] / result["rows"]["df_memory_mb"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="column 배열 fetch 벤치마크")
+    parser.add_argument('--funds', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    adaptor = DBAdaptor(manifest["uris"]["BLUE_DB"])
+    result = {"funds": args.funds, "years": args.years,
+              "sqlite": compare(lambda: adaptor.connect().execute(adaptor.statement(QUERY)), args.rounds)}
+    keys, rows = decimal_rows(adaptor)
+    adaptor.close()
+    result["decimal"] = compare(lambda: DecimalCursor(keys, rows), args.rounds)
+
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("fetch", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# 로컬 sqlite 조회 latency 비교: 조회마다 sqlite3.connect vs LocalStore 연결 재사용
+# 사용법(frappe 디렉토리에서): python -m bench.local_store [--symbols 500] [--days 2500] [--queries 300] [--rounds 3]
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from bench.results import save_result
+from localStore import LocalStore
+from sqlite_table import create_tables
+
+
+# 테스트용 Trading 데이터 만들기
+def build_db(db_file: str, symbol_count: int, day_count: int) -> list:
+    symbols = [f"K{i:07d}" for i in range(symbol_count)]
+    start = datetime.date(2010, 1, 1)
+    dates = [str(start + datetime.timedelta(days=d)) for d in range(day_count)]
+
+    with sqlite3.connect(db_file) as conn:
+        create_tables(conn)
+        rows = ((date, symbol, 'C001', 1000.0, 1e10, 1e10, 1000.0 + d, 6e9)
+                for symbol in symbols for d, date in enumerate(dates))
+        conn.executemany("INSERT INTO Trading VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return symbols, dates
+
+
+# 컨트롤러에서 쓰는 조회 모양들 (종류, sql)
+def make_queries(symbols: list, dates: list, count: int) -> list:
+    rng = random.Random(0)
+    queries = []
+    for _ in range(count):
+        symbol = rng.choice(symbols)
+        date = rng.choice(dates[len(dates) // 2:])
+        sample = tuple(rng.sample(symbols, min(50, len(symbols))))
+        queries.append(rng.choice([
+            ("fund_history", f"SELECT * FROM Trading WHERE Symbol='{symbol}' AND AsOfDate <= '{date}'"),
+            ("max_date", f"SELECT MAX(AsOfDate) as max_date FROM Trading WHERE Symbol = '{symbol}'"),
+            ("outdated", f"""SELECT Symbol, ShareClassAUM, Max(AsOfDate) as MaxDate FROM Trading
+                WHERE Symbol in {sample} AND AsOfDate <= '{date}' GROUP BY Symbol HAVING MaxDate != '{date}'"""),
+        ]))
+    return queries
+
+
+# 조회 종류별 latency 요약
+def summarize(latencies: list) -> dict:
+    result = {}
+    for kind in sorted({kind for kind, _ in latencies}):
+        values = sorted(latency for k, latency in latencies if k == kind)
+        result[kind] = {
+            "count": len(values),
+            "mean_ms": statistics.mean(values) * 1000,
+            "p50_ms": values[len(values) // 2] * 1000,
+            "p95_ms": values[int(len(values) * 0.95)] * 1000,
+        }
+    return result
+
+
+def run_per_query_connect(db_file: str, queries: list) -> list:
+    latencies = []
+    for kind, query in queries:
+        t0 = time.perf_counter()
+        with sqlite3.connect(db_file) as conn:
+            pd.read_sql(sql=query, con=conn)
+        latencies.append((kind, time.perf_counter() - t0))
+    return latencies
+
+
+def run_local_store(db_file: str, queries: list) -> list:
+    store = LocalStore(db_file)
+    latencies = []
+    for kind, query in queries:
+        t0 = time.perf_counter()
+        store.read_df(query)
+        latencies.append((kind, time.perf_counter() - t0))
+    store.close()
+    return latencies
+
+
+# 여러 번 번갈아 돌려서 조회별로 가장 빠른 값만 사용(노이즈 줄이기)
+def best_of(runner, db_file: str, queries: list, rounds: int) -> list:
+    runs = [runner(db_file, queries) for _ in range(rounds)]
+    return [(kind, min(run[i][1] for run in runs)) for i, (kind, _) in enumerate(queries)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 sqlite 조회 latency 비교")
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, 'bench.db')
+        symbols, dates = build_db(db_file, args.symbols, args.days)
+        queries = make_queries(symbols, dates, args.queries)
+
+        # 같은 조회를 두 방식으로
+        run_local_store(db_file, queries[:10])
+        before = summarize(best_of(run_per_query_connect, db_file, queries, args.rounds))
+        after = summarize(best_of(run_local_store, db_file, queries, args.rounds))
+
+    result = {
+        "params": {key: value for key, value in vars(args).items() if key != 'no_save'},
+        "per_query_connect": before,
+        "local_store": after,
+        "speedup_mean": {kind: before[kind]["mean_ms"] / after[kind]["mean_ms"] for kind in before},
+    }
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("local_store", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# 합성 데이터로 전체 RA 파이프라인 단계별 시간 측정
+# 사용법(frappe 디렉토리에서): python -m bench.pipeline [--sizes 1000 5000 20000] [--years 11]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from bench import synthetic
+from bench.results import load_results, save_result
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+from profiler import Profiler
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+BENCH_NAME = "pipeline"
+# 이전 결과보다 이 비율 이상 느려지면 회귀로 표시
+REGRESSION_RATIO = 1.2
+
+logger = CustomLogger()
+profiler = Profiler()
+
+
+# 실행 결과에서 최상위 단계별 wall time 합계
+def stage_times(report: dict) -> dict:
+    times = {}
+    for stage in report["stages"]:
+        if stage["parent"] is None:
+            times[stage["name"]] = times.get(stage["name"], 0) + stage["wall_s"]
+    times["total"] = report["wall_s"]
+    return times
+
+
+def run_size(fund_count: int, years: int, target_date: str, data_dir: str) -> dict:
+    manifest = synthetic.ensure(os.path.join(data_dir, f"f{fund_count}_y{years}"), fund_count, years, target_date)
+    # 원격 db 대신 합성 데이터 파일 사용
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_bench_")
+    try:
+        FrappeController.cache_fund_dict.clear()
+        FrappeController.cache_bm_price_dict.clear()
+        controller = FrappeController(local_db_file=os.path.join(local_dir, 'local.db'))
+
+        # 1. 빈 로컬 db 채우기(GUI의 Load Recent data와 같음)
+        with profiler.run("sync", funds=fund_count):
+            symbol_tuple = tuple(controller.load_funds_info(controller.customer_db_adaptor, target_date)['asset_id'])
+            controller.dump_fund_trading_data(symbol_tuple)
+            controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+        sync = stage_times(profiler.history[-1].to_dict())
+
+        # 2. 메모리 캐시가 빈 상태로 한 번, 채워진 상태로 한 번
+        controller.run_pipeline(target_date)
+        cold = stage_times(profiler.history[-1].to_dict())
+        controller.run_pipeline(target_date)
+        warm = stage_times(profiler.history[-1].to_dict())
+        rows = {key: (len(value) if value is not None else None) for key, value in controller.fund_df.items()}
+
+        for adaptor in (controller.customer_db_adaptor, controller.price_db_adaptor, controller.bm_db_adaptor):
+            adaptor.close()
+        controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    return {"funds": fund_count, "years": years, "trading_rows": manifest["trading_rows"],
+            "sync": sync, "cold": cold, "warm": warm, "rows": rows}
+
+
+# 같은 조건의 직전 결과와 비교
+def compare_with_previous(result: dict, previous_records: list) -> list:
+    regressions = []
+    for record in reversed(previous_records):
+        previous = {(size["funds"], size["years"]): size for size in record["result"]["sizes"]}
+        matched = False
+        for size in result["sizes"]:
+            before = previous.get((size["funds"], size["years"]))
+            if before is None:
+                continue
+            matched = True
+            for phase in ("sync", "cold", "warm"):
+                for stage, seconds in size[phase].items():
+                    old = before[phase].get(stage)
+                    if old and seconds / old >= REGRESSION_RATIO:
+                        regressions.append({"funds": size["funds"], "phase": phase, "stage": stage,
+                                            "before_s": old, "after_s": seconds, "ratio": seconds / old,
+                                            "baseline_revision": record["revision"]})
+        if matched:
+            break
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터 RA 파이프라인 벤치마크")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--log', action='store_true', help="로그 출력(기본은 끔)")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    if not args.log:
+        logger.set_sinks([NullSink()])
+
+    sizes = []
+    for fund_count in args.sizes:
+        size = run_size(fund_count, args.years, args.target_date, args.data_dir)
+        print(json.dumps(size, indent=2))
+        sizes.append(size)
+
+    result = {"target_date": args.target_date, "sizes": sizes}
+    regressions = compare_with_previous(result, load_results(BENCH_NAME))
+    for regression in regressions:
+        print(f"[REGRESSION] {regression['funds']} funds {regression['phase']}/{regression['stage']}: "
+              f"{regression['before_s']:.3f}s -> {regression['after_s']:.3f}s (x{regression['ratio']:.2f})")
+    result["regressions"] = regressions
+
+    if not args.no_save:
+        save_result(BENCH_NAME, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# 기간 수익률/최근 row: 펀드별 전체 이력을 pandas로 읽기(이전 방식) vs set 기반 쿼리 한 번(analyticsPushdown)
+# 사용법(frappe 디렉토리에서): python -m bench.pushdown [--funds 200] [--repeat 5]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from bench import synthetic
+from bench.results import save_result
+from bench.sync import LatencyDBAdaptor
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+from tradingCalendar import DateIndex
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+# 이전 get_fund_period_return: 펀드마다 전체 이력을 읽어서 양 끝 AdjustedNAV만
+def pandas_period_returns(controller: FrappeController, symbol_tuple: tuple, target_date: str) -> dict:
+    returns = {}
+    for asset_id in symbol_tuple:
+        nav_df = controller.get_fund_nav_df(asset_id, target_date)
+        date_index = DateIndex(nav_df.index)
+        period = date_index.between(date_index.offset_date('weeks', 104, target_date),
+                                    date_index.offset_date('weeks', 4, target_date))
+        nav = nav_df[asset_id].values
+        if period.stop > period.start:
+            returns[asset_id] = float((nav[period.stop - 1] - nav[period.start]) / nav[period.start] * 100)
+    return returns
+
+
+# 이전 get_funds_outdated: 펀드별 GROUP BY MAX
+def group_by_outdated(controller: FrappeController, symbol_tuple: tuple, target_date: str):
+    return controller.local_store.read_df("""
+        SELECT Symbol, ShareClassAUM, Max(AsOfDate) as MaxDate
+            FROM Trading
+            WHERE Symbol IN (SELECT value FROM json_each(:symbols)) AND AsOfDate <= :target_date
+            GROUP BY Symbol
+            HAVING MaxDate != :target_date
+    """, {"symbols": json.dumps(list(symbol_tuple)), "target_date": target_date})
+
+
+def timed(func, repeat: int, before=None):
+    seconds = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analytics pushdown 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--bandwidth-mbps', type=float, default=20)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_pushdown_bench_")
+    try:
+        controller = FrappeController(local_db_file=os.path.join(local_dir, 'local.db'))
+        symbol_tuple = tuple(controller.load_funds_info(controller.customer_db_adaptor, args.target_date)['asset_id'])
+        controller.dump_fund_trading_data(symbol_tuple)
+        target_date = args.target_date
+
+        # 이전 방식은 펀드 캐시가 빈 상태(처음 preselecting)
+        pandas_s, pandas_returns = timed(lambda: pandas_period_returns(controller, symbol_tuple, target_date),
+                                         args.repeat, before=controller.cache_fund_dict.clear)
+        pushdown_s, pushdown_returns = timed(lambda: controller.get_period_returns(symbol_tuple, target_date),
+                                             args.repeat)
+        group_by_s, group_by_df = timed(lambda: group_by_outdated(controller, symbol_tuple, target_date), args.repeat)
+        latest_s, latest_df = timed(lambda: controller.get_funds_outdated(symbol_tuple, target_date), args.repeat)
+
+        # 원격에서 계산해서 결과만 받기
+        controller.price_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BLUE_DB"], args.latency_ms,
+                                                       args.bandwidth_mbps)
+        remote_s, remote_df = timed(lambda: controller.load_period_returns(
+            symbol_tuple, *controller.period_return_range(target_date), remote=True), args.repeat)
+        remote_returns = dict(zip(remote_df['Symbol'], remote_df['period_return'].astype(float)))
+
+        controller.price_db_adaptor.close()
+        controller.local_store.close()
+        FrappeController.cache_fund_dict.clear()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {
+        "params": {key: value for key, value in vars(args).items() if key not in ('no_save', 'data_dir')},
+        "period_return": {"pandas_s": pandas_s, "pushdown_s": pushdown_s, "speedup": pandas_s / pushdown_s,
+                          "remote_pushdown_s": remote_s, "funds": len(pushdown_returns),
+                          "same_result": pandas_returns == pushdown_returns,
+                          "same_remote_result": remote_returns == pushdown_returns},
+        "outdated": {"group_by_s": group_by_s, "latest_row_s": latest_s, "speedup": group_by_s / latest_s,
+                     "same_result": sorted(group_by_df['Symbol']) == sorted(latest_df['Symbol'])},
+    }
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("pushdown", result)
+
+
+if __name__ == '__main__':
+    main()
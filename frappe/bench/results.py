@@ -0,0 +1,40 @@
+# 벤치마크 결과를 버전별로 쌓아두는 유틸
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+RESULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# 결과 한 건을 bench/results/<name>.jsonl 에 한 줄로 추가
+def save_result(name: str, result: dict, result_dir: str = RESULT_DIR) -> dict:
+    record = {
+        "bench": name,
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "result": result,
+    }
+    os.makedirs(result_dir, exist_ok=True)
+    with open(os.path.join(result_dir, f"{name}.jsonl"), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    return record
+
+
+# 이전 결과 불러오기
+def load_results(name: str, result_dir: str = RESULT_DIR) -> list:
+    path = os.path.join(result_dir, f"{name}.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,92 @@
+# 상관계수 추이: 주마다 cal_spearman_corr 다시 계산 vs RollingSpearman 한 번 훑기
+# 사용법(frappe 디렉토리에서): python -m bench.rolling_corr [--funds 200] [--asset-class KR_STOCK]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench import synthetic
+from bench.results import save_result
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rolling 스피어만 상관계수 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--asset-class', default='KR_STOCK')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_corr_bench_")
+    try:
+        controller = FrappeController(local_db_file=os.path.join(local_dir, 'local.db'))
+        total_fund_df = controller.load_funds_info(controller.customer_db_adaptor, args.target_date)
+        symbol_tuple = tuple(total_fund_df['asset_id'])
+        controller.dump_fund_trading_data(symbol_tuple)
+        controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+
+        # 펀드 하나씩 BM과 붙여서(펀드마다 기간이 달라서)
+        bm_df, _ = controller.get_bm_price_df(args.asset_class, args.target_date)
+        asset_ids = total_fund_df[total_fund_df['asset_class_symbol'] == args.asset_class]['asset_id']
+        bm_fund_dfs = {}
+        for asset_id in asset_ids:
+            trade_df = controller.get_fund_trade_df(asset_id, args.target_date)[['AdjustedNAV']]
+            bm_fund_dfs[asset_id] = controller.concat_fund_bm_df(trade_df, bm_df)
+
+        # 1. 주마다 전체 window 다시 계산
+        started = time.perf_counter()
+        full = {}
+        for asset_id, bm_fund_df in bm_fund_dfs.items():
+            last_date = bm_fund_df.index[-1]
+            dates = pd.date_range(bm_fund_df.index[0], last_date, freq=f"W-{last_date:%a}")
+            full[asset_id] = pd.Series({
+                date: controller.cal_spearman_corr(bm_fund_df.loc[:date])[args.asset_class]['AdjustedNAV']
+                for date in dates})
+        full_s = time.perf_counter() - started
+
+        # 2. 한 번 훑기
+        started = time.perf_counter()
+        rolling = {asset_id: controller.cal_spearman_corr_trend(bm_fund_df, args.asset_class,
+                                                                min_periods=2)['AdjustedNAV']
+                   for asset_id, bm_fund_df in bm_fund_dfs.items()}
+        rolling_s = time.perf_counter() - started
+
+        diffs = [np.nanmax(np.abs(full[asset_id] - rolling[asset_id].reindex(full[asset_id].index)))
+                 for asset_id in bm_fund_dfs if full[asset_id].notna().any()]
+        controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {
+        "funds": len(bm_fund_dfs), "asset_class": args.asset_class,
+        "points": int(sum(len(series) for series in full.values())),
+        "full_s": full_s,
+        "rolling_s": rolling_s,
+        "speedup": full_s / rolling_s if rolling_s else None,
+        "max_abs_diff": float(max(diffs)) if diffs else None,
+    }
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("rolling_corr", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# 기준값 sweep: 조합마다 config를 바꿔서 파이프라인 다시 돌리기 vs ScenarioSweep 한 번
+# 사용법(frappe 디렉토리에서): python -m bench.scenario_sweep [--funds 200]
+import argparse
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from bench import synthetic
+from bench.results import save_result
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+from scenarioSweep import ScenarioSweep
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_GRID = {
+    "MIN_SHARE_CLASS_AUM": [3000000000, 5000000000],
+    "MIN_PERIOD_YEARS": [1, 2, 3],
+    "MIN_CORRELATION": [0.7, 0.8, 0.9],
+    "MAX_WEIGHT": [25, 30],
+}
+
+logger = CustomLogger()
+
+
+def portfolios(result: dict) -> dict:
+    return {risk_type: portfolio_df[['asset_id', 'weight']].values.tolist()
+            for risk_type, portfolio_df in result["new_portfolio_by_risk"].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기준값 sweep 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--grid', default=json.dumps(DEFAULT_GRID))
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+    grid = json.loads(args.grid)
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_sweep_bench_")
+    try:
+        local_db_file = os.path.join(local_dir, 'local.db')
+        controller = FrappeController(local_db_file=local_db_file)
+        total_fund_df = controller.load_funds_info(controller.customer_db_adaptor, args.target_date)
+        controller.dump_fund_trading_data(tuple(total_fund_df['asset_id']))
+        controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+
+        # 1. 조합마다 config 바꿔서 처음부터(캐시 없이)
+        sweep = ScenarioSweep(controller, args.target_date, grid, sync=False)
+        started = time.perf_counter()
+        naive = []
+        for rule in sweep.scenarios:
+            config = copy.deepcopy(controller.config)
+            config["SCREENING_RULE"] = {key: rule[key] for key in controller.screening_rule}
+            config["SELECTION_RULE"] = {key: rule[key] for key in controller.selection_rule}
+            FrappeController.cache_fund_dict.clear()
+            FrappeController.cache_bm_price_dict.clear()
+            naive.append(portfolios(FrappeController(config=config, local_db_file=local_db_file)
+                                    .run_pipeline(args.target_date)))
+        naive_s = time.perf_counter() - started
+
+        # 2. 한 번에
+        FrappeController.cache_fund_dict.clear()
+        FrappeController.cache_bm_price_dict.clear()
+        started = time.perf_counter()
+        summary = sweep.run()
+        sweep_s = time.perf_counter() - started
+
+        same = all(result is not None and portfolios(result) == expected
+                   for result, expected in zip(sweep.results, naive))
+        controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {
+        "funds": args.funds, "grid": grid, "scenarios": len(sweep.scenarios),
+        "naive_s": naive_s,
+        "sweep_s": sweep_s,
+        "speedup": naive_s / sweep_s if sweep_s else None,
+        "class_corr_computed": len(sweep.class_corrs),
+        "portfolios_computed": len(sweep.portfolios),
+        "same_portfolios": same,
+    }
+    print(summary.round(3).to_string())
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("scenario_sweep", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# 원격 db 동기화 처리량 측정. 쿼리마다 지연시간과 대역폭 제한을 넣은 adaptor로 WAN 환경 흉내
+# 사용법(frappe 디렉토리에서): python -m bench.sync [--funds 300] [--latency-ms 30] [--bandwidth-mbps 20]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from bench import synthetic
+from bench.results import save_result
+from frappeController import DBAdaptor, FrappeController
+from logger import CustomLogger, NullSink
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+# 쿼리마다 왕복 지연 + 가져온 데이터 크기만큼 전송 지연을 넣는 adaptor
+class LatencyDBAdaptor(DBAdaptor):
+    def __init__(self, config, latency_ms: float = 30, bandwidth_mbps: float = 20, **kwargs):
+        super().__init__(config, **kwargs)
+        self.latency_s = latency_ms / 1000
+        self.bytes_per_s = bandwidth_mbps * 1024 * 1024 / 8 if bandwidth_mbps else None
+        self.query_count = 0
+        self.bytes_fetched = 0
+
+    def get(self, query, *args, **kwargs):
+        time.sleep(self.latency_s)
+        result = super().get(query, *args, **kwargs)
+        size = result.nbytes()
+        self.query_count += 1
+        self.bytes_fetched += size
+        if self.bytes_per_s:
+            time.sleep(size / self.bytes_per_s)
+        return result
+
+    # 첫 chunk 전에 왕복 지연, chunk마다 전송 지연
+    def stream(self, query, *args, **kwargs):
+        time.sleep(self.latency_s)
+        self.query_count += 1
+        for chunk in super().stream(query, *args, **kwargs):
+            size = chunk.nbytes()
+            self.bytes_fetched += size
+            if self.bytes_per_s:
+                time.sleep(size / self.bytes_per_s)
+            yield chunk
+
+    def save(self, query, *args, **kwargs):
+        time.sleep(self.latency_s)
+        self.query_count += 1
+        return super().save(query, *args, **kwargs)
+
+    def reset_counters(self):
+        self.query_count = 0
+        self.bytes_fetched = 0
+
+
+def local_row_count(controller: FrappeController) -> int:
+    return controller.local_store.execute("SELECT COUNT(*) FROM Trading")[0][0] + \
+        controller.local_store.execute("SELECT COUNT(*) FROM BM_price")[0][0]
+
+
+# 동기화 한 번 측정
+def measure(controller: FrappeController, symbol_tuple: tuple, bm_symbol_tuple: tuple) -> dict:
+    adaptors = (controller.price_db_adaptor, controller.bm_db_adaptor)
+    for adaptor in adaptors:
+        adaptor.reset_counters()
+    rows_before = local_row_count(controller)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    controller.dump_fund_trading_data(symbol_tuple)
+    controller.dump_bm_price_data(bm_symbol_tuple)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rows = local_row_count(controller) - rows_before
+    return {
+        "seconds": elapsed,
+        "rows": rows,
+        "rows_per_s": rows / elapsed if elapsed else None,
+        "queries": sum(adaptor.query_count for adaptor in adaptors),
+        "bytes_fetched": sum(adaptor.bytes_fetched for adaptor in adaptors),
+        "peak_memory_mb": peak / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="원격 동기화 처리량 벤치마크")
+    parser.add_argument('--funds', type=int, default=300)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--bandwidth-mbps', type=float, default=20)
+    parser.add_argument('--gap-days', type=int, default=20, help="partial gap 시나리오에서 지울 최근 일 수")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    local_dir = tempfile.mkdtemp(prefix="frappe_sync_bench_")
+    try:
+        FrappeController.cache_fund_dict.clear()
+        FrappeController.cache_bm_price_dict.clear()
+        os.environ.update(manifest["uris"])
+        controller = FrappeController(local_db_file=os.path.join(local_dir, 'local.db'))
+        controller.price_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BLUE_DB"], args.latency_ms,
+                                                       args.bandwidth_mbps)
+        controller.bm_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BM_DB"], args.latency_ms, args.bandwidth_mbps)
+
+        symbol_tuple = tuple(controller.load_funds_info(controller.customer_db_adaptor, args.target_date)['asset_id'])
+        bm_symbol_tuple = tuple(controller.config["ASSET_CLASS_MAP"].values())
+        scenarios = {}
+
+        # 1. 빈 로컬 db 전체 채우기
+        scenarios["cold_backfill"] = measure(controller, symbol_tuple, bm_symbol_tuple)
+
+        # 2. 마지막 하루만 없는 상태
+        with controller.local_store.writer() as conn:
+            for table in ("Trading", "BM_price"):
+                conn.execute(f"DELETE FROM {table} WHERE AsOfDate = (SELECT MAX(AsOfDate) FROM {table})")
+        scenarios["one_day_incremental"] = measure(controller, symbol_tuple, bm_symbol_tuple)
+
+        # 3. 일부 펀드는 통째로, 나머지는 최근 gap_days 만큼 없는 상태
+        missing = symbol_tuple[::3]
+        with controller.local_store.writer() as conn:
+            conn.executemany("DELETE FROM Trading WHERE Symbol = ?", [(symbol,) for symbol in missing])
+            conn.execute(f"""DELETE FROM Trading WHERE AsOfDate > (
+                                SELECT DISTINCT AsOfDate FROM Trading ORDER BY AsOfDate DESC
+                                LIMIT 1 OFFSET {args.gap_days})""")
+        scenarios["partial_gap"] = measure(controller, symbol_tuple, bm_symbol_tuple)
+
+        for adaptor in (controller.customer_db_adaptor, controller.price_db_adaptor, controller.bm_db_adaptor):
+            adaptor.close()
+        controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {"params": {key: value for key, value in vars(args).items() if key not in ('no_save', 'data_dir')},
+              "scenarios": scenarios}
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("sync", result)
+
+
+if __name__ == '__main__':
+    main()
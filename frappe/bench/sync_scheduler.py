@@ -0,0 +1,130 @@
+# 펀드 전체 갱신 중의 차트 클릭/RA 프로세스: callback thread 하나에서 순서대로(이전) vs 우선순위 sync queue
+# 로컬은 최근 gap_days가 빠진 상태에서, background 갱신 시작 click_after_s 뒤에 차트 클릭(아직 안 받은 펀드),
+# 그 다음 RA 프로세스가 전체 펀드 동기화를 요청
+# 사용법(frappe 디렉토리에서): python -m bench.sync_scheduler [--funds 200] [--latency-ms 30]
+import argparse
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from bench import synthetic
+from bench.results import save_result
+from bench.bootstrap import lagging_copy
+from bench.sync import LatencyDBAdaptor
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+from syncScheduler import BACKGROUND, INTERACTIVE, PIPELINE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+# 이전: GUI callback처럼 thread 하나에서 요청 순서대로(전체 갱신은 한 번에)
+def serial(controller: FrappeController, symbol_tuple: tuple, click_symbol: str, click_after_s: float) -> dict:
+    tasks = queue.Queue()
+    done = {}
+
+    def run():
+        while True:
+            name, symbols = tasks.get()
+            if name is None:
+                return
+            controller.dump_fund_trading_data(symbols)
+            done[name] = time.perf_counter()
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    start = time.perf_counter()
+    tasks.put(("background", symbol_tuple))
+    time.sleep(click_after_s)
+    click = time.perf_counter()
+    tasks.put(("interactive", (click_symbol,)))
+    tasks.put(("pipeline", symbol_tuple))
+    tasks.put((None, None))
+    worker.join()
+    return {"interactive_wait_s": done["interactive"] - click, "pipeline_ready_s": done["pipeline"] - start}
+
+
+def scheduled(controller: FrappeController, symbol_tuple: tuple, click_symbol: str, click_after_s: float) -> dict:
+    scheduler = controller.sync_scheduler
+    start = time.perf_counter()
+    background = scheduler.submit(symbol_tuple, BACKGROUND)
+    time.sleep(click_after_s)
+    click = time.perf_counter()
+    scheduler.sync((click_symbol,), INTERACTIVE)
+    interactive_wait = time.perf_counter() - click
+    scheduler.sync(symbol_tuple, PIPELINE)
+    pipeline_ready = time.perf_counter() - start
+    for future in background.values():
+        future.result()
+    return {"interactive_wait_s": interactive_wait, "pipeline_ready_s": pipeline_ready,
+            "stats": dict(scheduler.stats)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="우선순위 sync queue 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--target-date', default='2021-08-09')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--bandwidth-mbps', type=float, default=20)
+    parser.add_argument('--gap-days', type=int, default=20)
+    parser.add_argument('--click-after-s', type=float, default=0.5)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.target_date)
+    os.environ.update(manifest["uris"])
+
+    local_dir = tempfile.mkdtemp(prefix="frappe_sync_scheduler_bench_")
+    try:
+        # 최근 gap_days가 빠진 로컬 db(측정 안 함)
+        base_db = os.path.join(local_dir, 'base.db')
+        builder = FrappeController(local_db_file=base_db)
+        symbol_tuple = tuple(builder.load_funds_info(builder.customer_db_adaptor, args.target_date)['asset_id'])
+        builder.price_db_adaptor = LatencyDBAdaptor(lagging_copy(
+            manifest["uris"]["BLUE_DB"], os.path.join(local_dir, 'blue_lagging.db'), ("Trading",), args.gap_days), 0, 0)
+        builder.dump_fund_trading_data(symbol_tuple)
+        builder.price_db_adaptor.close()
+        builder.local_store.close()
+        # 전체 갱신에서 가장 늦게 받는 펀드를 클릭
+        click_symbol = symbol_tuple[-1]
+
+        scenarios = {}
+        for name, run in (("serial", serial), ("scheduled", scheduled)):
+            db_file = os.path.join(local_dir, f'{name}.db')
+            shutil.copy(base_db, db_file)
+            controller = FrappeController(local_db_file=db_file)
+            controller.price_db_adaptor = LatencyDBAdaptor(manifest["uris"]["BLUE_DB"], args.latency_ms,
+                                                           args.bandwidth_mbps)
+            scenarios[name] = run(controller, symbol_tuple, click_symbol, args.click_after_s)
+            scenarios[name]["queries"] = controller.price_db_adaptor.query_count
+            scenarios[name]["max_date"] = controller.local_store.execute("""
+                SELECT MIN(max_date) FROM (SELECT MAX(AsOfDate) AS max_date FROM Trading GROUP BY Symbol)
+            """)[0][0]
+            controller.sync_scheduler.shutdown()
+            controller.price_db_adaptor.close()
+            controller.local_store.close()
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    result = {"params": {key: value for key, value in vars(args).items() if key not in ('no_save', 'data_dir')},
+              "scenarios": scenarios,
+              "interactive_speedup": scenarios["serial"]["interactive_wait_s"] /
+              scenarios["scheduled"]["interactive_wait_s"],
+              "pipeline_speedup": scenarios["serial"]["pipeline_ready_s"] / scenarios["scheduled"]["pipeline_ready_s"]}
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("sync_scheduler", result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# 원격 db(OAK_DB, BLUE_DB, BM_DB) 대신 쓸 합성 데이터 sqlite 파일 만들기
+# 사용법(frappe 디렉토리에서): python -m bench.synthetic --funds 1000 --years 11 --out bench/data/f1000_y11
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from frappeConfig import get_config
+
+# BM symbol -> (원격 table, IndexName)
+BM_SOURCES = {
+    "I01270": ("FTSE", "FTSE Emerging"),
+    "I00010": ("FTSE", "FTSE Developed"),
+    "I04809": ("FTSE", "FTSE Global Technology"),
+    "I04781": ("FTSE", "FTSE Korea"),
+    "MLEMGB": ("MerrillLynch", "ICE BofA EM Sovereign"),
+    "MLHW00": ("MerrillLynch", "ICE BofA Global High Yield"),
+    "MLGBMI": ("MerrillLynch", "ICE BofA Global Broad Market"),
+    "MLG0SK": ("MerrillLynch", "ICE BofA Korea Government"),
+    "SPGSGC": ("GSCI", "S&P GSCI Gold"),
+}
+
+REMOTE_TABLES = {
+    "oak": [
+        """CREATE TABLE asset_info (
+            date DATE, asset_id VARCHAR, asset_name VARCHAR, risk_type_name VARCHAR, asset_class_name VARCHAR,
+            asset_class_symbol VARCHAR, investment_area_name VARCHAR, fund_bm_name VARCHAR)""",
+        "CREATE INDEX idx_asset_info_date ON asset_info (date)",
+        "CREATE TABLE macro_score (date DATE, score_id VARCHAR, score_value DECIMAL)",
+    ],
+    "blue": [
+        """CREATE TABLE Trading (
+            AsOfDate DATE, Symbol VARCHAR, CompanyCode VARCHAR, NAV DECIMAL, AUM DECIMAL, NetAssets DECIMAL,
+            AdjustedNAV DECIMAL, ShareClassAUM DECIMAL, PRIMARY KEY (AsOfDate, Symbol))""",
+        "CREATE INDEX idx_trading_symbol_date ON Trading (Symbol, AsOfDate)",
+        "CREATE TABLE Operation (Symbol VARCHAR, Name VARCHAR, InceptionDate DATE, EndDate DATE)",
+        "CREATE TABLE Company (Code VARCHAR, Name VARCHAR)",
+    ],
+    "bm": [
+        f"""CREATE TABLE {table} (AsOfDate DATE, Symbol VARCHAR, Price DECIMAL, IndexName VARCHAR,
+            PRIMARY KEY (AsOfDate, Symbol))""" for table in ("FTSE", "MerrillLynch", "GSCI")
+    ],
+}
+
+ASSET_CLASS_NAMES = {
+    "EM_BOND": "신흥국채권", "HY_BOND": "하이일드채권", "GM_BOND": "글로벌채권", "KR_BOND": "국내채권",
+    "EM_STOCK": "신흥국주식", "DM_STOCK": "선진국주식", "GM_TECH_STOCK": "글로벌기술주", "KR_STOCK": "국내주식",
+    "GOLD": "금", "ETC": "기타",
+}
+
+
+def business_days(start: datetime.date, end: datetime.date) -> np.ndarray:
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1, dtype='datetime64[D]')
+    return days[np.is_busday(days)]
+
+
+def _connect(path: str, ddl: list) -> sqlite3.Connection:
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    for statement in ddl:
+        conn.execute(statement)
+    return conn
+
+
+# 합성 데이터 생성. 반환값: {"OAK_DB": uri, "BLUE_DB": uri, "BM_DB": uri, ...}
+def generate(out_dir: str, fund_count: int, years: int = 11, end_date: str = '2021-08-09', seed: int = 0) -> dict:
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    config = get_config()
+    asset_class_map = config["ASSET_CLASS_MAP"]
+
+    end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+    start = end.replace(year=end.year - years)
+    dates = business_days(start, end)
+    date_str = np.datetime_as_string(dates, unit='D')
+    n_days = len(dates)
+
+    # ---BM 가격: 로그 수익률 random walk
+    bm_returns = {symbol: rng.normal(0.0002, 0.01 if symbol.startswith('I') else 0.004, n_days)
+                  for symbol in BM_SOURCES}
+    bm_prices = {symbol: 1000 * np.exp(np.cumsum(ret)) for symbol, ret in bm_returns.items()}
+
+    bm_conn = _connect(os.path.join(out_dir, 'bm.db'), REMOTE_TABLES["bm"])
+    for symbol, (table, index_name) in BM_SOURCES.items():
+        bm_conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?, ?)",
+                            zip(date_str, [symbol] * n_days, bm_prices[symbol].round(4).tolist(),
+                                [index_name] * n_days))
+    bm_conn.commit()
+    bm_conn.close()
+
+    # ---펀드 기본 정보
+    asset_classes = list(asset_class_map.keys())
+    class_idx = rng.integers(0, len(asset_classes), fund_count)
+    symbols = [f"K55{i:09d}" for i in range(fund_count)]
+    companies = [f"C{i:03d}" for i in range(50)]
+
+    # 일부는 최근 출시, 일부는 데이터가 끊김, 일부는 규모가 작음, 일부는 C클래스가 아님
+    inception_idx = np.where(rng.random(fund_count) < 0.15, rng.integers(n_days - 400, n_days - 20, fund_count),
+                             rng.integers(0, n_days // 3, fund_count))
+    last_idx = np.where(rng.random(fund_count) < 0.05, rng.integers(n_days // 2, n_days - 5, fund_count), n_days - 1)
+    last_idx = np.maximum(last_idx, np.minimum(inception_idx + 10, n_days - 1))
+    small = rng.random(fund_count) < 0.15
+    correlated = rng.random(fund_count) < 0.8
+    share_class = np.where(rng.random(fund_count) < 0.8, "C-e", "A")
+    name_filtered = rng.random(fund_count) < 0.05
+
+    fund_info = []
+    for i, symbol in enumerate(symbols):
+        asset_class = asset_classes[class_idx[i]]
+        word = "레버리지" if name_filtered[i] else "증권투자신탁"
+        name = f"합성{ASSET_CLASS_NAMES[asset_class]}{i}{word}(주식){share_class[i]}"
+        fund_info.append((symbol, name, asset_class))
+
+    # ---BLUE_DB: Trading, Operation, Company
+    blue_conn = _connect(os.path.join(out_dir, 'blue.db'), REMOTE_TABLES["blue"])
+    for i, (symbol, name, asset_class) in enumerate(fund_info):
+        bm_symbol = asset_class_map[asset_class] if asset_class != "ETC" else "I04781"
+        lo, hi = inception_idx[i], last_idx[i] + 1
+        noise = rng.normal(0, 0.003, hi - lo)
+        ret = bm_returns[bm_symbol][lo:hi] + noise if correlated[i] else rng.normal(0.0002, 0.01, hi - lo)
+        adjusted_nav = 1000 * np.exp(np.cumsum(ret))
+        nav = adjusted_nav * 0.98
+        base_aum = 3e9 if small[i] else rng.uniform(6e9, 5e11)
+        aum = base_aum * adjusted_nav / adjusted_nav[0]
+        company = companies[i % len(companies)]
+        count = hi - lo
+        blue_conn.executemany("INSERT INTO Trading VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              zip(date_str[lo:hi], [symbol] * count, [company] * count, nav.round(2).tolist(),
+                                  aum.round(0).tolist(), (aum * 0.97).round(0).tolist(),
+                                  adjusted_nav.round(2).tolist(), aum.round(0).tolist()))
+        blue_conn.execute("INSERT INTO Operation VALUES (?, ?, ?, NULL)", (symbol, name, str(date_str[lo])))
+    blue_conn.executemany("INSERT INTO Company VALUES (?, ?)", [(code, f"합성자산운용{code}") for code in companies])
+    blue_conn.commit()
+    blue_conn.close()
+
+    # ---OAK_DB: 월말 asset_info snapshot, macro_score
+    oak_conn = _connect(os.path.join(out_dir, 'oak.db'), REMOTE_TABLES["oak"])
+    months = sorted({d[:7] for d in date_str})
+    month_last = {}
+    for d in date_str:
+        month_last[d[:7]] = d
+    # 월말 + 마지막 날짜
+    month_ends = [str(month_last[m]) for m in months]
+
+    for snapshot in month_ends:
+        snapshot_idx = int(np.searchsorted(date_str, snapshot))
+        rows = [(snapshot, symbol, name, "보통", ASSET_CLASS_NAMES[asset_class], asset_class, "글로벌",
+                 asset_class_map[asset_class])
+                for i, (symbol, name, asset_class) in enumerate(fund_info) if inception_idx[i] <= snapshot_idx]
+        oak_conn.executemany("INSERT INTO asset_info VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    for month in months:
+        for score_id in ("DM_STOCK", "EM_STOCK", "KR_STOCK"):
+            oak_conn.execute("INSERT INTO macro_score VALUES (?, ?, ?)",
+                             (f"{month}-01", score_id, int(rng.integers(-1, 2))))
+    oak_conn.commit()
+    oak_conn.close()
+
+    uris = {
+        "OAK_DB": f"sqlite:///{os.path.abspath(os.path.join(out_dir, 'oak.db'))}",
+        "BLUE_DB": f"sqlite:///{os.path.abspath(os.path.join(out_dir, 'blue.db'))}",
+        "BM_DB": f"sqlite:///{os.path.abspath(os.path.join(out_dir, 'bm.db'))}",
+    }
+    manifest = {"funds": fund_count, "years": years, "end_date": end_date, "seed": seed,
+                "days": n_days, "trading_rows": int(sum(last_idx + 1 - inception_idx)), "uris": uris}
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# 같은 조건으로 만든 데이터가 있으면 재사용
+def ensure(out_dir: str, fund_count: int, years: int = 11, end_date: str = '2021-08-09', seed: int = 0) -> dict:
+    manifest_file = os.path.join(out_dir, 'manifest.json')
+    if os.path.exists(manifest_file):
+        with open(manifest_file, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if (manifest["funds"], manifest["years"], manifest["end_date"], manifest["seed"]) == \
+                (fund_count, years, end_date, seed):
+            return manifest
+    return generate(out_dir, fund_count, years, end_date, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 원격 db 만들기")
+    parser.add_argument('--funds', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--end-date', default='2021-08-09')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    manifest = generate(args.out, args.funds, args.years, args.end_date, args.seed)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# work queue 확장성: 같은 작업을 worker 프로세스 수만 바꿔가며 처리
+# 사용법(frappe 디렉토리에서): python -m bench.work_queue [--processes 1 2 4] [--start 2021-06-01]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from backtest import Backtest
+from bench import synthetic
+from bench.results import save_result
+from frappeController import FrappeController
+from logger import CustomLogger, NullSink
+from workQueue import WorkQueue, run_workers
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = CustomLogger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="work queue 벤치마크")
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=int, default=11)
+    parser.add_argument('--start', default='2021-06-01')
+    parser.add_argument('--end', default='2021-08-09')
+    parser.add_argument('--freq', default='W-FRI')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    logger.set_sinks([NullSink()])
+    manifest = synthetic.ensure(os.path.join(args.data_dir, f"f{args.funds}_y{args.years}"), args.funds, args.years,
+                                args.end)
+    os.environ.update(manifest["uris"])
+
+    work_dir = tempfile.mkdtemp(prefix="frappe_queue_bench_")
+    try:
+        # 로컬 db는 한 번만 채워두고 모든 worker가 같이 읽음
+        local_db_file = os.path.join(work_dir, 'local.db')
+        controller = FrappeController(local_db_file=local_db_file)
+        backtest = Backtest(controller, args.start, args.end, args.freq)
+        backtest.sync_universe()
+        dates = backtest.trading_dates()
+        controller.local_store.close()
+
+        runs = []
+        for processes in args.processes:
+            queue = WorkQueue(os.path.join(work_dir, f"queue_{processes}"))
+            queue.create(args.start, args.end, args.freq, dates, [controller.config])
+            started = time.perf_counter()
+            count = run_workers(queue.queue_dir, processes, local_db_file, wait=False)
+            runs.append({"processes": processes, "units": count, "wall_s": time.perf_counter() - started})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for run in runs:
+        run["speedup"] = runs[0]["wall_s"] / run["wall_s"]
+        run["efficiency"] = run["speedup"] * runs[0]["processes"] / run["processes"]
+    result = {"funds": args.funds, "start": args.start, "end": args.end, "freq": args.freq,
+              "cpu_count": os.cpu_count(), "runs": runs}
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        save_result("work_queue", result)
+
+
+if __name__ == '__main__':
+    main()
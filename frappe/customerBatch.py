@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from frappeController import FrappeController
+from logger import CustomLogger
+from profiler import Profiler
+
+logger = CustomLogger()
+profiler = Profiler()
+
+# config에 CUSTOMER_BATCH가 없을 때
+DEFAULT_CUSTOMER_BATCH = {
+    "TABLE": "customer",
+    "ID_COLUMN": "customer_id",
+    "SCORE_COLUMN": "risk_score",
+    "CHUNK_SIZE": 50000,
+    "SAVE_BATCH": 10000,
+    "RESULT_TABLE": "customer_portfolio",
+    "PORTFOLIO_TABLE": "customer_portfolio_item",
+}
+
+
+# 고객 DB(OAK_DB)의 고객 전체를 id 순서로 chunk씩 읽어서 고객별 포트폴리오를 저장
+# 위험 점수는 주식 비율(0~1, RISK_TYPE 값과 같은 단위)
+# screen ~ post-select는 한 번만, 비중 보정/포트폴리오 선정은 반올림 비중이 같은 고객끼리 한 번만 하고
+# 고객 row에는 포트폴리오 id만(포트폴리오 구성은 PORTFOLIO_TABLE에 한 번씩)
+class CustomerBatch:
+    def __init__(self, controller: FrappeController, target_date: str, settings: dict = None, sync: bool = True):
+        self.controller = controller
+        self.target_date = target_date
+        self.sync = sync
+        self.settings = DEFAULT_CUSTOMER_BATCH | controller.config.get("CUSTOMER_BATCH", {}) | (settings or {})
+        self.db_adaptor = controller.customer_db_adaptor
+
+        self.postselected_fund_df = None
+        self.portfolio_ids = {}  # 반올림 비중 tuple -> 포트폴리오 id
+        self.saved_portfolio_ids = set()
+        self.stats = {"customers": 0, "skipped": 0, "chunks": 0, "portfolios": 0}
+
+    def create_tables(self):
+        self.db_adaptor.save(f"""
+            CREATE TABLE IF NOT EXISTS {self.settings['RESULT_TABLE']} (
+                customer_id VARCHAR(64),
+                date DATE,
+                portfolio_id VARCHAR(32),
+                PRIMARY KEY(customer_id, date)
+            )
+        """)
+        self.db_adaptor.save(f"""
+            CREATE TABLE IF NOT EXISTS {self.settings['PORTFOLIO_TABLE']} (
+                date DATE,
+                portfolio_id VARCHAR(32),
+                asset_id VARCHAR(32),
+                asset_class_symbol VARCHAR(32),
+                weight DOUBLE,
+                PRIMARY KEY(date, portfolio_id, asset_id)
+            )
+        """)
+
+    # 모든 고객이 같이 쓰는 단계(screen, pre/post-select) 한 번, 같은 날짜 결과는 지우고 다시
+    def prepare(self):
+        controller = self.controller
+        total_fund_df = controller.load_funds_info(controller.customer_db_adaptor, self.target_date)
+        if self.sync:
+            controller.dump_fund_trading_data(tuple(total_fund_df['asset_id']))
+            controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+
+        selected_fund_df = controller.screening(total_fund_df, self.target_date)
+        preselected_fund_df = controller.preselecting(selected_fund_df, self.target_date)
+        self.postselected_fund_df = controller.postselecting(preselected_fund_df)
+
+        self.create_tables()
+        for table in (self.settings['RESULT_TABLE'], self.settings['PORTFOLIO_TABLE']):
+            self.db_adaptor.save(f"DELETE FROM {table} WHERE date = :date", {"date": self.target_date})
+
+    # id 순서로 CHUNK_SIZE씩(OFFSET 대신 마지막 id 다음부터)
+    def chunks(self):
+        id_column = self.settings['ID_COLUMN']
+        score_column = self.settings['SCORE_COLUMN']
+        chunk_size = self.settings['CHUNK_SIZE']
+        last_id = None
+        while True:
+            where, params = "", {"limit": chunk_size}
+            if last_id is not None:
+                where, params = f"WHERE {id_column} > :last_id", params | {"last_id": last_id}
+            query = f"""
+                SELECT {id_column}, {score_column}
+                    FROM {self.settings['TABLE']}
+                    {where}
+                    ORDER BY {id_column}
+                    LIMIT :limit
+            """
+            result = self.db_adaptor.get(query, params)
+            if not len(result):
+                break
+            ids = result.arrays[id_column]
+            # 점수 column은 float64 배열로 옴(NULL은 NaN). 값이 전부 NULL인 chunk는 object 배열
+            yield ids, pd.to_numeric(result.arrays[score_column], errors='coerce').astype(float)
+            if len(result) < chunk_size:
+                break
+            last_id = ids[-1].item() if isinstance(ids[-1], np.generic) else ids[-1]
+
+    # 반올림 비중 하나의 포트폴리오 id(처음 보는 비중이면 보정/선정해서 저장)
+    def portfolio_id(self, columns: list, key: tuple) -> str:
+        portfolio_id = self.portfolio_ids.get(key)
+        if portfolio_id is not None:
+            return portfolio_id
+
+        controller = self.controller
+        weight_dict = controller.correct_weight_dict(self.postselected_fund_df, dict(zip(columns, key)))
+        portfolio_df = controller.select_portfolio(self.postselected_fund_df, {"CUSTOMER": weight_dict},
+                                                   True)["CUSTOMER"]
+        rows = [{"date": self.target_date, "asset_id": asset_id, "asset_class_symbol": asset_class,
+                 "weight": float(weight)}
+                for asset_id, asset_class, weight in zip(portfolio_df['asset_id'], portfolio_df['asset_class_symbol'],
+                                                         portfolio_df['weight'])]
+        portfolio_id = hashlib.sha1(json.dumps(rows, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+        # 반올림 비중이 달라도 보정 후 같은 포트폴리오일 수 있음
+        if portfolio_id not in self.saved_portfolio_ids:
+            self.db_adaptor.save_many(f"""
+                INSERT INTO {self.settings['PORTFOLIO_TABLE']}
+                    (date, portfolio_id, asset_id, asset_class_symbol, weight)
+                    VALUES (:date, :portfolio_id, :asset_id, :asset_class_symbol, :weight)
+            """, [row | {"portfolio_id": portfolio_id} for row in rows])
+            self.saved_portfolio_ids.add(portfolio_id)
+            self.stats["portfolios"] += 1
+
+        self.portfolio_ids[key] = portfolio_id
+        return portfolio_id
+
+    def save_chunk(self, ids: np.ndarray, scores: np.ndarray):
+        valid = ~np.isnan(scores)
+        self.stats["skipped"] += int((~valid).sum())
+        ids = ids[valid]
+        if not len(ids):
+            return
+
+        # 고객별 비중을 한 번에 계산하고, 반올림 비중이 같은 고객끼리 묶기
+        columns, weights = self.controller.weight_matrix(np.clip(scores[valid], 0, 1), self.target_date)
+        keys, inverse = np.unique(np.rint(weights).astype(np.int64), axis=0, return_inverse=True)
+        portfolio_ids = np.array([self.portfolio_id(columns, tuple(key.tolist())) for key in keys], dtype=object)
+
+        insert_sql = f"""
+            INSERT INTO {self.settings['RESULT_TABLE']} (customer_id, date, portfolio_id)
+                VALUES (:customer_id, :date, :portfolio_id)
+        """
+        rows = [{"customer_id": customer_id, "date": self.target_date, "portfolio_id": portfolio_id}
+                for customer_id, portfolio_id in zip(ids.tolist(), portfolio_ids[inverse.ravel()].tolist())]
+        save_batch = self.settings['SAVE_BATCH']
+        for i in range(0, len(rows), save_batch):
+            self.db_adaptor.save_many(insert_sql, rows[i:i + save_batch])
+        self.stats["customers"] += len(rows)
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        with profiler.run("customer_batch", target_date=self.target_date):
+            self.prepare()
+            for ids, scores in self.chunks():
+                self.save_chunk(ids, scores)
+                self.stats["chunks"] += 1
+                logger.log_info(f"고객 {self.stats['customers']}명 저장")
+
+        elapsed = time.perf_counter() - started
+        self.stats["elapsed_s"] = elapsed
+        self.stats["customers_per_min"] = self.stats["customers"] / elapsed * 60 if elapsed else None
+        logger.log(f"고객 포트폴리오 저장 끝: {self.stats['customers']}명, 포트폴리오 {self.stats['portfolios']}개, "
+                   f"{elapsed:.1f}초")
+        return self.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="고객 DB의 전체 고객 포트폴리오 일괄 생성")
+    parser.add_argument('--date', required=True)
+    parser.add_argument('--no-sync', action='store_true', help="원격과 동기화하지 않고 로컬 데이터만 사용")
+    args = parser.parse_args()
+
+    print(json.dumps(CustomerBatch(FrappeController(), args.date, sync=not args.no_sync).run(), indent=2))
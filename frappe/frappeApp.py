@@ -1,5 +1,4 @@
 import datetime
-import sqlite3
 
 import dearpygui.dearpygui as dpg
 
@@ -8,16 +7,18 @@ from gui.fundTab import FundTab
 from gui.fundTable import FundTable
 from frappeController import FrappeController
 from gui.fundTree import FundTree
-from logger import CustomLogger
+from gui.logWindow import DpgLogSink
+from gui.profilePanel import ProfilePanel
+from logger import CustomLogger, FileSink
+from pipelineDag import PipelineDag
+from profiler import Profiler
+from syncScheduler import BACKGROUND
 import pandas as pd
 
-# config 파일 불러오기
-import json
-with open('config.json') as f:
-    config = json.load(f)
-
 # 로그 실행
 logger = CustomLogger()
+# 단계별 계측
+profiler = Profiler()
 
 # # 연환산수익률 계산
 # def cal_annualized_rate(fund_df):
@@ -45,9 +46,17 @@ class FrappeApp:
 
     def __init__(self):
         self.controller = FrappeController()
+        # 단계별 결과 캐시(위험 유형만 바꾸면 weighting 이후만 다시)
+        self.pipeline = PipelineDag(self.controller)
         self.target_date = None
+        self.log_sink = None
 
     def run(self):
+        # 로그 창과 로그 파일 붙이기
+        self.log_sink = logger.add_sink(DpgLogSink())
+        logger.add_sink(FileSink())
+        config = self.controller.config
+
         # RA process 시각화 버튼 id
         button_id_list = []
         for i in range(6):
@@ -74,17 +83,15 @@ class FrappeApp:
         def load_recent_fund_callback(sender, app_data, user_data):
             symbol_tuple = tuple(self.controller.fund_df['total_fund_df']['asset_id'])
 
-            with sqlite3.connect(self.controller.local_db_file) as conn:
-                logger.log_warning("펀드들의 최신 Trading 데이터를 가져옵니다.")
-                self.controller.dump_fund_trading_data(conn, symbol_tuple)
-            logger.log_warning("최신 Trading 데이터 로딩 끝")
+            # 차트 클릭이나 RA 프로세스가 이 갱신 뒤에 줄 서지 않게 background 우선순위로
+            futures = self.controller.sync_scheduler.submit(symbol_tuple, BACKGROUND)
+            logger.log_warning(f"펀드 {len(futures)}개의 최신 Trading 데이터를 background로 가져옵니다.")
 
         def load_recent_bm_callback(sender, app_data, user_data):
             bm_symbol_tuple = tuple(config["ASSET_CLASS_MAP"].values())
 
-            with sqlite3.connect(self.controller.local_db_file) as conn:
-                logger.log_warning("BM 지표들의 최신 데이터를 가져옵니다.")
-                self.controller.dump_bm_price_data(conn, bm_symbol_tuple)
+            logger.log_warning("BM 지표들의 최신 데이터를 가져옵니다.")
+            self.controller.dump_bm_price_data(bm_symbol_tuple)
             logger.log_warning("최신 BM 데이터 로딩 끝")
 
         # 화면 구성
@@ -93,8 +100,11 @@ class FrappeApp:
             with dpg.menu_bar():
                 dpg.add_menu_item(label="RA GUI")
                 with dpg.menu(label="LOG"):
-                    dpg.add_menu_item(label="Hide", callback=lambda: dpg.hide_item(logger.window_id))
-                    dpg.add_menu_item(label="Call", callback=lambda: dpg.show_item(logger.window_id))
+                    dpg.add_menu_item(label="Hide", callback=lambda: dpg.hide_item(self.log_sink.window_id))
+                    dpg.add_menu_item(label="Call", callback=lambda: dpg.show_item(self.log_sink.window_id))
+
+                with dpg.menu(label="Profile"):
+                    dpg.add_menu_item(label="Last runs", callback=lambda: ProfilePanel(self.controller).draw_window())
 
                 with dpg.menu(label="Process"):
                     dpg.add_menu_item(label="Reset", callback=reset_process_callback, user_data={"app": app})
@@ -127,7 +137,18 @@ class FrappeApp:
         dpg.set_primary_window(app, True)
 
         self.change_to_korean()
-        dpg.start_dearpygui()
+
+        # 로그는 프레임마다 한 번씩 모아서 화면에 출력
+        viewport = dpg.create_viewport()
+        dpg.setup_dearpygui(viewport=viewport)
+        dpg.show_viewport(viewport)
+        while dpg.is_dearpygui_running():
+            logger.flush()
+            dpg.render_dearpygui_frame()
+
+            # 첫 프레임이 그려진 다음에 원격 db 연결
+            self.controller.warm_up()
+        dpg.cleanup_dearpygui()
 
     def get_date_callback(self, sender, app_data, user_data):
         date_dict = dpg.get_value(sender)
@@ -173,63 +194,21 @@ class FrappeApp:
             return
 
         # ---날짜를 제대로 입력 받았으면 해당 날짜를 타겟으로 RA 프로세스 진행
-        # 전체 펀드 불러오기
-        logger.log("전체 펀드 유니버스 로딩")
-        total_fund_df = self.controller.load_funds_info(self.controller.customer_db_adaptor, self.target_date)
-        self.controller.fund_df["total_fund_df"] = total_fund_df
-        dpg.configure_item(progress_bar, default_value=0.16, overlay="16%")
-
-        # screen 단계
-        logger.log("Screening 시작. 끝날 때까지 기다려주세요.")
-        selected_fund_df = self.controller.screening(self.controller.fund_df["total_fund_df"], self.target_date)
-        self.controller.fund_df["selected_fund_df"] = selected_fund_df
-        logger.log("Screening 끝")
-        dpg.configure_item(progress_bar, default_value=0.32, overlay="32%")
-
-        # preselect 단계
-        logger.log("Pre-Selection 시작. 끝날 때까지 기다려주세요.")
-        preselected_fund_df = self.controller.preselecting(self.controller.fund_df["selected_fund_df"],
-                                                           self.target_date)
-
-        self.controller.fund_df["preselected_fund_df"] = preselected_fund_df
-        logger.log("Pre-Selection 끝.")
-        dpg.configure_item(progress_bar, default_value=0.5, overlay="52%")
-
-        # postselect 단계
-        logger.log("Post-Selection 시작. 끝날 때까지 기다려주세요.")
-        asset_class_top_5_df = preselected_fund_df.sort_values(by="period_return", ascending=False).groupby(
-            "asset_class_symbol").head(5)
-        asset_class_top_5_df = asset_class_top_5_df.sort_values(by=["asset_class_symbol", "period_return"],
-                                                                ascending=[False, False])
-
-        self.controller.fund_df["postselected_fund_df"] = asset_class_top_5_df
-        logger.log("Post-Selection 끝.")
-        dpg.configure_item(progress_bar, default_value=0.66, overlay="68%")
-
-        # weighting, allocation 단계
-        logger.log("Allocation 시작. 끝날 때까지 기다려주세요.")
-        postselected_fund_df = self.controller.fund_df["postselected_fund_df"]
-
         # 사용자가 선택한 위험 유형
+        config = self.controller.config
         user_risk_type = config["RISK_TYPE"] if radio_key == 'ALL' else {radio_key: config["RISK_TYPE"][radio_key]}
 
-        weight_by_risk = self.controller.weighting(self.target_date, user_risk_type)
-        portfolio_by_risk = self.controller.select_portfolio(postselected_fund_df, weight_by_risk)
-
-        self.controller.fund_df["weight_by_risk"] = weight_by_risk
-        self.controller.fund_df["portfolio_by_risk"] = portfolio_by_risk
-        logger.log("Allocation 끝.")
-        dpg.configure_item(progress_bar, default_value=0.82, overlay="84%")
-
-        # correction 단계
-        logger.log("Correction 시작. 끝날 때까지 기다려주세요.")
-        postselected_fund_df = self.controller.fund_df["postselected_fund_df"]
-        new_weight_by_risk, new_portfolio_by_risk = self.controller.correcting(postselected_fund_df, weight_by_risk)
-
-        self.controller.fund_df["new_weight_by_risk"] = new_weight_by_risk
-        self.controller.fund_df["new_portfolio_by_risk"] = new_portfolio_by_risk
-        logger.log("Correction 끝.")
-        dpg.configure_item(progress_bar, default_value=1, overlay="100%")
+        # 단계가 끝날 때마다 진행 상황 표시(입력이 그대로인 단계는 이전 결과 재사용)
+        def on_node(node, i, count, hit):
+            logger.log(f"{node.label} {'이전 결과 사용' if hit else '끝'}")
+            progress = (i + 1) / count
+            dpg.configure_item(progress_bar, default_value=progress, overlay=f"{progress:.0%}")
+
+        # 중간에 실패해도 run을 닫아서 다음 run에 섞이지 않게
+        with profiler.run("pipeline", target_date=self.target_date, risk_type=radio_key):
+            logger.log("RA 프로세스 시작. 끝날 때까지 기다려주세요.")
+            self.pipeline.run(self.target_date, user_risk_type, on_node)
+            dpg.configure_item(progress_bar, default_value=1, overlay="100%")
 
         with dpg.group(label='RA process', parent=main_id):
             main_tab_id = dpg.generate_uuid()
@@ -0,0 +1,18 @@
+import json
+import os
+
+# config 파일 위치: 환경변수 FRAPPE_CONFIG가 없으면 이 파일 옆의 config.json
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+_config_cache = {}
+
+
+# config 파일 불러오기(처음 부를 때 한 번만 읽음)
+def get_config(config_file: str = None) -> dict:
+    config_file = config_file or os.environ.get('FRAPPE_CONFIG', DEFAULT_CONFIG_FILE)
+    config = _config_cache.get(config_file)
+    if config is None:
+        with open(config_file, encoding='utf-8') as f:
+            config = json.load(f)
+        _config_cache[config_file] = config
+    return config
@@ -1,37 +1,172 @@
+import copy
 import datetime
+import decimal
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import create_engine
-from sqlalchemy.exc import ArgumentError
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.exc import ArgumentError, SQLAlchemyError
+import numpy as np
 import pandas as pd
 import atexit
 import re
 import sqlite3
-import os, json
-
-from logger import CustomLogger
-
-# config 파일 불러오기
+import hashlib
 import json
-with open('config.json') as f:
-    config = json.load(f)
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyticsPushdown import LATEST_ROW_SQL, PERIOD_RETURN_SQL, symbol_param
+from frappeConfig import get_config
+from fundMetrics import HISTORY_MODIFIERS, METRIC_COLUMNS, compute_metrics
+from localStore import LocalStore
+from logger import CustomLogger
+from profiler import Profiler, profile_stage
+from queryLog import QueryLog
+from rollingCorr import CORR_LAG_WEEKS, CORR_WINDOW_WEEKS, rolling_spearman, weekly_frame
+from syncScheduler import INTERACTIVE, PIPELINE, SyncScheduler
+from tradingCalendar import DateIndex
 
 # 로그 실행
 logger = CustomLogger()
+# 단계별 계측
+profiler = Profiler()
+# 쿼리 단위 기록/slow query log
+query_log = QueryLog()
+
+
+# 캐시에 들고 있는 frame의 column별 dtype. 'float'은 config의 CACHE_FLOAT_DTYPE(float64 또는 float32)
+TRADE_SCHEMA = {
+    "Symbol": "category",
+    "CompanyCode": "category",
+    "NAV": "float",
+    "AUM": "float",
+    "NetAssets": "float",
+    "AdjustedNAV": "float",
+    "ShareClassAUM": "float",
+}
+BM_SCHEMA = {
+    "AsOfDate": "datetime64[ns]",
+    "Symbol": "category",
+    "Price": "float",
+    "IndexName": "category",
+}
+
+# config에 SCREENING_RULE/SELECTION_RULE이 없을 때(원래 코드에 있던 값)
+DEFAULT_SCREENING_RULE = {
+    "MIN_SHARE_CLASS_AUM": 5000000000,  # ShareClassAUM 50억 미만 제외
+    "MIN_PERIOD_YEARS": 2,  # 출시 후 2년(=104주) + 버퍼 미만 제외
+    "PERIOD_BUFFER_WEEKS": 5,
+    "MIN_CORRELATION": 0.8,  # BM과 스피어만 상관계수 미만 제외(채권 제외)
+}
+DEFAULT_SELECTION_RULE = {
+    "TOP_N": 5,  # 자산군별 기간 수익률 상위 펀드 수
+    "MAX_WEIGHT": 30,  # 펀드 하나의 최대 비중
+    "MIN_WEIGHT": 5,  # 자산군/펀드 최소 비중
+}
+
+# BM 가격이 있는 원격 table(source별로 따로 동기화)
+BM_SOURCES = ("FTSE", "MerrillLynch", "GSCI")
+
+
+# 반복되는 문자열은 category, 가격은 float, 날짜는 datetime64로
+# 숫자가 아닌 값(NULL, 예전 로컬 db에 'None' 문자열로 들어간 NULL)은 NaN
+def compact_frame(df: pd.DataFrame, schema: dict, float_dtype: str = "float64") -> pd.DataFrame:
+    dtypes = {column: (float_dtype if dtype == "float" else dtype)
+              for column, dtype in schema.items() if column in df.columns}
+    df = df.assign(**{column: pd.to_numeric(df[column], errors='coerce')
+                      for column, dtype in schema.items() if dtype == "float" and column in df.columns})
+    return df.astype(dtypes)
+
+
+# 숫자 column은 float64/int64 배열로, 나머지(문자열, 날짜)는 object 배열로. column 타입은 첫 값으로 판단
+# Decimal(MySQL DECIMAL)도 float64로. exact면 자릿수가 잘리지 않게 Decimal object 그대로(로컬에 str로 저장할 때)
+def _column_array(values, exact: bool = False) -> np.ndarray:
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, (int, float, decimal.Decimal)) and not isinstance(sample, bool) \
+            and not (exact and isinstance(sample, decimal.Decimal)):
+        # sqlite는 DECIMAL column의 정수 값(1000.0)을 int로 주므로 모든 값이 int일 때만 int64(아니면 소수점이 잘림)
+        if isinstance(sample, int) and all(isinstance(value, int) for value in values):
+            try:
+                return np.array(values, dtype=np.int64)
+            except (OverflowError, TypeError, ValueError):
+                pass
+        try:
+            # Decimal은 numpy가 하나씩 바꾸면 느려서 float()으로 먼저
+            return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+        except (TypeError, ValueError):
+            pass
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
 
 
+# 조회 결과를 column별 numpy 배열로 들고 있음(row 객체를 그대로 쌓아두지 않음)
 class FRAFetchResult:
-    def __init__(self, columns, data):
-        self.columns = columns
-        self.data = data
+    # 한 번에 cursor에서 가져올 row 수
+    chunk_size = 10000
+
+    def __init__(self, columns, data=None, arrays: dict = None, exact: bool = False):
+        self.columns = list(columns)
+        if arrays is None:
+            arrays = self._transpose(self.columns, data or [], exact)
+        self.arrays = arrays
+
+    @staticmethod
+    def _transpose(columns: list, rows, exact: bool = False) -> dict:
+        if not rows:
+            return {column: np.empty(0, dtype=object) for column in columns}
+        return {column: _column_array(values, exact) for column, values in zip(columns, zip(*rows))}
+
+    # cursor 결과를 chunk 단위로 column 배열에 옮기기
+    @classmethod
+    def from_cursor(cls, result, chunk_size: int = None, exact: bool = False):
+        columns = list(result.keys())
+        chunks = []
+        while True:
+            rows = result.fetchmany(chunk_size or cls.chunk_size)
+            if not rows:
+                break
+            chunks.append(cls._transpose(columns, rows, exact))
+        if len(chunks) == 1:
+            return cls(columns, arrays=chunks[0])
+        if not chunks:
+            return cls(columns)
+        return cls(columns, arrays={column: np.concatenate([chunk[column] for chunk in chunks])
+                                    for column in columns})
+
+    def __len__(self):
+        return len(self.arrays[self.columns[0]]) if self.columns else 0
+
+    # 이전처럼 row tuple 목록이 필요할 때
+    @property
+    def data(self) -> list:
+        return list(zip(*(self.arrays[column].tolist() for column in self.columns)))
+
+    # 배열 크기(object column은 값 일부로 추정)
+    def nbytes(self) -> int:
+        total = 0
+        for array in self.arrays.values():
+            if array.dtype != object:
+                total += array.nbytes
+            elif len(array):
+                sample = array[:200]
+                total += int(sum(len(str(value)) for value in sample) * len(array) / len(sample))
+        return total
 
     def df(self):
-        return pd.DataFrame(columns=self.columns, data=self.data)
+        return pd.DataFrame(self.arrays, columns=self.columns, copy=False)
+
+    # pyarrow가 있을 때만
+    def arrow(self):
+        import pyarrow as pa
+        return pa.table({column: self.arrays[column] for column in self.columns})
 
     def scalar(self):
-        return self.data[0][0]
+        return self.arrays[self.columns[0]][0]
 
     def list(self):
-        return list(*zip(*self.data))
+        return self.arrays[self.columns[0]].tolist()
 
     def native(self):
         return self.columns, self.data
@@ -39,6 +174,8 @@ class FRAFetchResult:
 
 class FRADBAdaptor:
     query_set = {}
+    # 만들어둔 statement 최대 개수(값을 sql에 직접 넣는 쿼리가 계속 쌓이지 않게)
+    statement_cache_size = 256
     engine = None
     conn = None
 
@@ -48,6 +185,8 @@ class FRADBAdaptor:
             type dict: db connect information
             type str: uri (uniform resource identifier)
         :param pool_recycle:
+
+        engine은 처음 get/save 할 때 만든다(connect()로 미리 만들 수도 있음)
         """
         if isinstance(info, dict):
             info = self._generate_uri(**info)
@@ -56,41 +195,136 @@ class FRADBAdaptor:
         self.pool_recycle = pool_recycle
         self.display_uri = re.sub(r'[^:]*[@$]', '******@', self.uri)
         self.echo = echo
-
-        try:
-            if echo:
-                logger.info(f"FRADBAdaptor create: {self.display_uri}")
-            self.engine = create_engine(info, pool_pre_ping=True, pool_recycle=pool_recycle)
-        except KeyError as e:
-            raise AttributeError("Need to proper key %s" % str(e))
-        except ArgumentError:
-            raise ValueError("Incorrect arguments for SQL Manager")
-
-        self.conn = self.engine.connect()
-        atexit.register(self.close)
+        self._connect_lock = threading.Lock()
+        self._atexit_registered = False
+        # (sql, IN 목록 파라미터 이름들) -> 만들어둔 statement
+        self._statement_cache = {}
 
     @staticmethod
     def _generate_uri(**info):
         db_connect_url = '{db_type}://{user}:{password}@{host}:{port}/{database}'
         return db_connect_url.format(**info)
 
-    def get(self, query, *args, **kwargs):
-        result = self.engine.execute(query, *args, **kwargs)
-        fetch_data = result.fetchall()
-        keys = result.keys()
+    # db 연결(이미 연결되어 있으면 그대로)
+    def connect(self):
+        if self.engine is not None:
+            return self.engine
+
+        with self._connect_lock:
+            if self.engine is None:
+                try:
+                    if self.echo:
+                        logger.log_info(f"FRADBAdaptor create: {self.display_uri}")
+                    # sqlite는 warm-up thread에서 연결한 걸 다른 thread에서도 써야 함
+                    connect_args = {'check_same_thread': False} if self.uri.startswith('sqlite') else {}
+                    engine = create_engine(self.uri, pool_pre_ping=True, pool_recycle=self.pool_recycle,
+                                           connect_args=connect_args)
+                except KeyError as e:
+                    raise AttributeError("Need to proper key %s" % str(e))
+                except ArgumentError:
+                    raise ValueError("Incorrect arguments for SQL Manager")
+
+                self.conn = engine.connect()
+                self.engine = engine
+                # close() 후 다시 연결해도 종료 handler는 한 번만
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+        return self.engine
+
+    @property
+    def connected(self):
+        return self.engine is not None
+
+    # :name 형식의 bind parameter 쿼리를 statement로(같은 sql은 한 번만 만듦)
+    # tuple/list 값은 IN (...) 목록으로 펼친다
+    def statement(self, query: str, params: dict = None):
+        expanding = tuple(sorted(name for name, value in (params or {}).items()
+                                 if isinstance(value, (tuple, list))))
+        key = (query, expanding)
+        stmt = self._statement_cache.get(key)
+        if stmt is None:
+            stmt = text(query)
+            if expanding:
+                stmt = stmt.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+            if len(self._statement_cache) >= self.statement_cache_size:
+                self._statement_cache.clear()
+            self._statement_cache[key] = stmt
+        return stmt
+
+    # exact면 DECIMAL column을 Decimal 그대로(로컬 db에 옮겨 담을 때)
+    def get(self, query: str, params: dict = None, exact: bool = False):
+        engine = self.connect()
+        start = time.perf_counter()
+        result = engine.execute(self.statement(query, params), params or {})
+        fetch_result = FRAFetchResult.from_cursor(result, exact=exact)
         result.close()
-        return FRAFetchResult(keys, fetch_data)
+        latency = time.perf_counter() - start
+        profiler.record_query('remote', latency, len(fetch_result))
+        query_log.record('remote', query, params, latency, len(fetch_result), fetch_result.nbytes(),
+                         explain=lambda: self.explain(query, params), trace=self.echo)
+        return fetch_result
+
+    # 결과를 chunk(FRAFetchResult)씩 넘겨주기(전체를 모으지 않고 받는 대로 저장할 때)
+    def stream(self, query: str, params: dict = None, chunk_size: int = None, exact: bool = False):
+        engine = self.connect().execution_options(stream_results=True)
+        start = time.perf_counter()
+        rows = nbytes = 0
+        result = engine.execute(self.statement(query, params), params or {})
+        try:
+            columns = list(result.keys())
+            while True:
+                chunk = result.fetchmany(chunk_size or FRAFetchResult.chunk_size)
+                if not chunk:
+                    break
+                fetch_result = FRAFetchResult(columns, chunk, exact=exact)
+                rows += len(fetch_result)
+                nbytes += fetch_result.nbytes()
+                yield fetch_result
+        finally:
+            result.close()
+            latency = time.perf_counter() - start
+            profiler.record_query('remote', latency, rows)
+            query_log.record('remote', query, params, latency, rows, nbytes,
+                             explain=lambda: self.explain(query, params), trace=self.echo)
+
+    def save(self, query: str, params: dict = None):
+        engine = self.connect()
+        start = time.perf_counter()
+        result = engine.execute(self.statement(query, params), params or {})
+        rowcount = result.rowcount
+        result.close()
+        latency = time.perf_counter() - start
+        profiler.record_query('remote', latency, rowcount)
+        query_log.record('remote', query, params, latency, rowcount, trace=self.echo)
+        return rowcount
 
-    def save(self, query, *args, **kwargs):
-        result = self.engine.execute(query, *args, **kwargs)
+    # 같은 쿼리를 여러 row에 대해 한 번에(executemany)
+    def save_many(self, query: str, rows: list):
+        if not rows:
+            return 0
+        engine = self.connect()
+        start = time.perf_counter()
+        result = engine.execute(self.statement(query, rows[0]), rows)
         rowcount = result.rowcount
         result.close()
+        latency = time.perf_counter() - start
+        profiler.record_query('remote', latency, rowcount)
+        query_log.record('remote', query, {"rows": len(rows)}, latency, rowcount, trace=self.echo)
         return rowcount
 
+    # 실행계획 조회(sqlite는 EXPLAIN QUERY PLAN)
+    def explain(self, query: str, params: dict = None) -> list:
+        prefix = "EXPLAIN QUERY PLAN" if self.uri.startswith('sqlite') else "EXPLAIN"
+        result = self.connect().execute(self.statement(f"{prefix} {query}", params), params or {})
+        rows = result.fetchall()
+        result.close()
+        return rows
+
     def close(self):
-        if not self.conn.closed:
+        if self.conn is not None and not self.conn.closed:
             if self.echo:
-                logger.info(f"FRADBAdaptor destroy: {self.display_uri}")
+                logger.log_info(f"FRADBAdaptor destroy: {self.display_uri}")
 
             self.conn.close()
             self.engine.dispose()
@@ -104,17 +338,60 @@ class FRADBAdaptor:
 
 
 class DBAdaptor(FRADBAdaptor):
+    # uri별 max_allowed_packet 캐시 파일(세션이 바뀌어도 재사용)
+    meta_cache_file = os.path.join('cache', 'db_meta.json')
+    _meta_cache_lock = threading.Lock()
+
     def __init__(self, config, pool_recycle=1200, echo=False):
         super().__init__(config, pool_recycle, echo)
 
-        self.max_packet_size = self.get_max_packet_size()
+        self._max_packet_size = None
+
+    # 처음 쓸 때 캐시 파일 -> db 순서로 확인
+    @property
+    def max_packet_size(self):
+        if self._max_packet_size is None:
+            cache = self._load_meta_cache()
+            size = cache.get(self._meta_key(), {}).get('max_packet_size')
+            if size is None:
+                size = self.get_max_packet_size()
+                self._save_meta_cache(max_packet_size=size)
+            self._max_packet_size = size
+        return self._max_packet_size
 
     def get_max_packet_size(self):
         scheme = self.uri.split(':')[0]
         if scheme.lower() == 'sqlite' or scheme.lower() == 'oracle':
             return 102400
-        query = "SHOW VARIABLES LIKE 'max_allowed_packet'"
-        return int(self.get(query).data[0][1])
+        query = "SHOW VARIABLES LIKE :name"
+        return int(self.get(query, {"name": "max_allowed_packet"}).data[0][1])
+
+    # 비밀번호가 파일에 남지 않게 uri는 hash로
+    def _meta_key(self):
+        return hashlib.sha256(self.uri.encode('utf-8')).hexdigest()
+
+    def _load_meta_cache(self):
+        try:
+            with open(self.meta_cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta_cache(self, **meta):
+        with self._meta_cache_lock:
+            cache = self._load_meta_cache()
+            cache.setdefault(self._meta_key(), {}).update(meta, uri=self.display_uri)
+            try:
+                os.makedirs(os.path.dirname(self.meta_cache_file), exist_ok=True)
+                with open(self.meta_cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, indent=2)
+            except OSError as e:
+                logger.log_warning(f"db 정보 캐시 저장 실패: {e}")
+
+    # 미리 연결해두기(background warm-up용)
+    def warm_up(self):
+        self.connect()
+        return self.max_packet_size
 
 
 class FrappeController:
@@ -124,75 +401,254 @@ class FrappeController:
     bm_db_adaptor: DBAdaptor = None
     cache_bm_price_dict: dict = {}  # key: asset_class_symbol / value: bm_price_df
     cache_fund_dict: dict = {}  # key: asset_id / value: fund_trade_df
-
-    def __init__(self):
+    local_store: LocalStore = None
+
+    def __init__(self, config: dict = None, local_db_file: str = None):
+        # config를 넘기지 않으면 config.json 사용
+        self.config = config if config is not None else get_config()
+        query_log.configure(self.config.get("SLOW_QUERY", {}))
+        if local_db_file is not None:
+            self.local_db_file = local_db_file
         self.customer_db_adaptor = DBAdaptor(os.environ.get('OAK_DB', ''))
         self.price_db_adaptor = DBAdaptor(os.environ.get('BLUE_DB', ''))
         self.bm_db_adaptor = DBAdaptor(os.environ.get('BM_DB', ''))
+        # 로컬 db 연결은 계속 재사용
+        self.local_store = LocalStore(self.local_db_file)
         # TODO: 흠 위치...클래스 아니면 인스턴스?
         self.fund_df = {
             "total_fund_df": None,
             "selected_fund_df": None,
             "preselected_fund_df": None
         }
+        self._warm_up_thread = None
+        # 운용사 코드 -> 이름(로컬 Company table에서 한 번 읽어서)
+        self.company_names = None
+        # 원격 Company에도 없던 운용사 코드
+        self.missing_company_codes = set()
+        # 캐시 frame 가격 dtype(float32면 메모리 절반, 유효숫자 7자리)
+        self.cache_float_dtype = self.config.get("CACHE_FLOAT_DTYPE", "float64")
+        # 차트/RA 프로세스/background 갱신의 펀드 동기화 요청(worker는 처음 요청할 때 시작)
+        self.sync_scheduler = SyncScheduler(self.dump_fund_trading_data, self.config.get("SYNC_WORKERS", 2))
+
+    # screen/pre-select 기준값(config 값이 없으면 기본값)
+    @property
+    def screening_rule(self) -> dict:
+        return DEFAULT_SCREENING_RULE | self.config.get("SCREENING_RULE", {})
+
+    # post-select/비중 기준값
+    @property
+    def selection_rule(self) -> dict:
+        return DEFAULT_SELECTION_RULE | self.config.get("SELECTION_RULE", {})
+
+    # 원격 db들을 background thread에서 미리 연결(창이 뜬 다음에 호출)
+    def warm_up(self):
+        if self._warm_up_thread is not None:
+            return self._warm_up_thread
+
+        def _warm_up():
+            for name, adaptor in (("OAK_DB", self.customer_db_adaptor), ("BLUE_DB", self.price_db_adaptor),
+                                  ("BM_DB", self.bm_db_adaptor)):
+                try:
+                    adaptor.warm_up()
+                    logger.log_debug(f"{name} 연결 완료")
+                except Exception as e:
+                    # 연결이 안 돼도 로컬 데이터는 볼 수 있게 경고만
+                    logger.log_warning(f"{name} 연결 실패: {e}")
+
+        self._warm_up_thread = threading.Thread(target=_warm_up, name="db-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
 
     # Main: 최신 펀드 정보 가져오기
+    # 로컬 복사본에서 target date 이하 최근 snapshot을 찾고, 처음 보는 snapshot만 원격에서 가져옴
+    @profile_stage()
     def load_funds_info(self, db_adaptor: DBAdaptor, target_date: str):
-        query = f"""
+        self.sync_asset_info_dates(db_adaptor, target_date)
+
+        snapshot = self.local_store.execute("""
+            SELECT date, fetched FROM asset_info_dates WHERE date <= :target_date ORDER BY date DESC LIMIT 1
+        """, {"target_date": target_date})
+        profiler.record_cache('asset_info', bool(snapshot) and bool(snapshot[0][1]))
+        if not snapshot:
+            return self.local_store.read_df("SELECT * FROM asset_info WHERE 0")
+
+        snapshot_date, fetched = snapshot[0]
+        if not fetched:
+            self.dump_asset_info(db_adaptor, snapshot_date)
+
+        return self.local_store.read_df("SELECT * FROM asset_info WHERE date = :date", {"date": snapshot_date})
+
+    # Local db: 원격 asset_info의 snapshot 날짜 목록을 target date까지 맞추기
+    def sync_asset_info_dates(self, db_adaptor: DBAdaptor, target_date: str):
+        watermark = self.local_store.get_watermark('asset_info_dates')
+        if watermark is not None and target_date <= watermark:
+            return
+
+        query = """
+            SELECT DISTINCT date
+                FROM asset_info
+                WHERE date > :from_date AND date <= :to_date
+        """
+        params = {"from_date": watermark or '0000-00-00', "to_date": target_date}
+        dates = [pd.Timestamp(date).strftime("%Y-%m-%d") for date in db_adaptor.get(query, params).list()]
+        self.local_store.execute_many("INSERT OR IGNORE INTO asset_info_dates (date) VALUES (?)",
+                                      [(date,) for date in dates])
+
+        # 오늘 snapshot은 아직 더 생길 수 있어서 어제까지만 확인한 걸로
+        yesterday = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        self.local_store.set_watermark('asset_info_dates', min(target_date, yesterday))
+
+    # Local db: asset_info snapshot 하나를 로컬에 복사
+    def dump_asset_info(self, db_adaptor: DBAdaptor, snapshot_date: str):
+        logger.log_warning(f"{snapshot_date} 펀드 유니버스 불러오는 중")
+        query = """
             SELECT date, asset_id, asset_name, risk_type_name, asset_class_name, asset_class_symbol,
                     investment_area_name, fund_bm_name
                 FROM asset_info
-                WHERE date = (SELECT MAX(date) FROM asset_info WHERE date <= '{target_date}')
+                WHERE date = :date
         """
-        return db_adaptor.get(query).df()
+        load_df = db_adaptor.get(query, {"date": snapshot_date}).df()
+        load_df['date'] = snapshot_date
+        with self.local_store.writer() as conn:
+            conn.execute("DELETE FROM asset_info WHERE date = :date", {"date": snapshot_date})
+            load_df.to_sql('asset_info', conn, if_exists='append', index=False)
+            conn.execute("UPDATE asset_info_dates SET fetched = 1 WHERE date = :date", {"date": snapshot_date})
 
     # Chart: 펀드 운용사 가져오기
     def load_fund_company_info(self, db_adaptor: DBAdaptor, company_code: str):
-        return db_adaptor.get(f"SELECT * FROM Company WHERE Code='{company_code}'").df()
+        if self.company_names is None or company_code not in self.company_names:
+            # 처음 보는 코드는 한 번만 다시 받고, 그래도 없는 코드는 TTL이 지날 때까지 원격에 묻지 않음
+            force = self.company_names is not None and company_code not in self.missing_company_codes
+            if self.dump_company_data(db_adaptor, force=force) or self.company_names is None:
+                self.company_names = dict(self.local_store.execute("SELECT Code, Name FROM Company"))
+                self.missing_company_codes.clear()
+            if company_code not in self.company_names:
+                self.missing_company_codes.add(company_code)
+        profiler.record_cache('company', company_code in self.company_names)
+
+        if company_code not in self.company_names:
+            return pd.DataFrame(columns=['Code', 'Name'])
+        return pd.DataFrame([{'Code': company_code, 'Name': self.company_names[company_code]}])
 
     # Screen: 펀드 출시 후 경과기간이 짧은 펀드 symbol 가져오기
     def load_funds_short_period(self, db_adaptor: DBAdaptor, least_date: datetime, fund_symbol_tuple: tuple):
-        query = f"""
+        self.dump_operation_data(db_adaptor, fund_symbol_tuple)
+        query = """
             SELECT DISTINCT Symbol, Name
                 FROM Operation
-                WHERE EndDate IS NULL AND InceptionDate > '{least_date}' AND Symbol in {fund_symbol_tuple}
+                WHERE EndDate IS NULL AND InceptionDate > :least_date
+                AND Symbol IN (SELECT value FROM json_each(:symbols))
         """
-        return db_adaptor.get(query).df()
+        params = {"least_date": least_date.strftime("%Y-%m-%d"), "symbols": json.dumps(list(fund_symbol_tuple))}
+        return self.local_store.read_df(query, params)
 
     # WEIGHT: macro_score 가져오기
+    @profile_stage()
     def load_macro_score(self, db_adaptor: DBAdaptor, target_date: str):
+        self.dump_macro_score(db_adaptor)
+
         # 현재의 이전달 데이터 가져오기
         now = datetime.datetime.strptime(target_date, "%Y-%m-%d")
         date = datetime.date(now.year, now.month, 1)
-        query = f"""
+        query = """
             SELECT *
             FROM macro_score
-            WHERE date = (SELECT MAX(date) FROM macro_score WHERE date < '{date}')
+            WHERE date = (SELECT MAX(date) FROM macro_score WHERE date < :date)
         """
-        return db_adaptor.get(query).df()
-
-    # Local db: 연결하기
+        return self.local_store.read_df(query, {"date": date.strftime("%Y-%m-%d")})
+
+    # Local db: 마지막 확인 후 REFERENCE_TTL_S가 지났는지
+    def reference_expired(self, name: str) -> bool:
+        age = self.local_store.watermark_age(name)
+        return age is None or age > self.config.get("REFERENCE_TTL_S", 43200)
+
+    # Local db: Operation 복사. 처음 보는 펀드만, TTL이 지나면 요청한 펀드 전체를 다시(EndDate 변경 반영)
+    def dump_operation_data(self, db_adaptor: DBAdaptor, symbol_tuple: tuple):
+        expired = self.reference_expired('Operation')
+        if expired:
+            symbols = list(symbol_tuple)
+        else:
+            symbols = [row[0] for row in self.local_store.execute("""
+                SELECT value FROM json_each(:symbols) WHERE value NOT IN (SELECT Symbol FROM Operation)
+            """, {"symbols": json.dumps(list(symbol_tuple))})]
+        profiler.record_cache('operation', not symbols)
+        if not symbols:
+            return
+
+        query = """
+            SELECT Symbol, Name, InceptionDate, EndDate
+                FROM Operation
+                WHERE Symbol IN :symbols
+        """
+        load_df = db_adaptor.get(query, {"symbols": tuple(symbols)}).df()
+        for column in ('InceptionDate', 'EndDate'):
+            load_df[column] = pd.to_datetime(load_df[column]).dt.strftime("%Y-%m-%d")
+
+        # 원격에 없는 펀드도 빈 row로 넣어서 다음에 다시 묻지 않게(InceptionDate가 NULL이라 필터에 안 걸림)
+        missing = set(symbols) - set(load_df['Symbol'])
+        rows = list(load_df[['Symbol', 'Name', 'InceptionDate', 'EndDate']].itertuples(index=False, name=None))
+        rows += [(symbol, None, None, None) for symbol in missing]
+        # 받은 펀드는 원격 row 전체로 교체(펀드 하나에 row가 여러 개여도 받은 순서와 상관없이 원격과 같게)
+        with self.local_store.writer() as conn:
+            conn.execute("DELETE FROM Operation WHERE Symbol IN (SELECT value FROM json_each(?))",
+                         (json.dumps(symbols),))
+            conn.executemany("INSERT INTO Operation VALUES (?, ?, ?, ?)",
+                             [tuple(None if pd.isna(value) else value for value in row) for row in rows])
+        if expired:
+            self.local_store.set_watermark('Operation', datetime.date.today().strftime("%Y-%m-%d"))
+
+    # Local db: Company 복사(작은 table이라 통째로). force면 TTL과 상관없이. 다시 받았으면 True
+    def dump_company_data(self, db_adaptor: DBAdaptor, force: bool = False) -> bool:
+        if not (force or self.reference_expired('Company')):
+            return False
+        rows = db_adaptor.get("SELECT Code, Name FROM Company").data
+        self.local_store.execute_many("INSERT OR REPLACE INTO Company VALUES (?, ?)", rows)
+        self.local_store.set_watermark('Company', datetime.date.today().strftime("%Y-%m-%d"))
+        return True
+
+    # Local db: macro_score는 로컬 최근 날짜 이후만
+    def dump_macro_score(self, db_adaptor: DBAdaptor):
+        if not self.reference_expired('macro_score'):
+            return
+        local_max_date = self.local_store.execute("SELECT MAX(date) FROM macro_score")[0][0] or '0000-00-00'
+        query = """
+            SELECT date, score_id, score_value
+                FROM macro_score
+                WHERE date > :from_date
+        """
+        load_df = db_adaptor.get(query, {"from_date": local_max_date}, exact=True).df()
+        if not load_df.empty:
+            load_df['date'] = pd.to_datetime(load_df['date']).dt.strftime("%Y-%m-%d")
+            # score_value는 Decimal일 수 있어서 str로(sqlite는 Decimal을 못 받음)
+            self.local_store.execute_many("INSERT OR REPLACE INTO macro_score VALUES (?, ?, ?)",
+                                          [(date, score_id, None if pd.isna(value) else str(value))
+                                           for date, score_id, value in load_df.itertuples(index=False, name=None)])
+        self.local_store.set_watermark('macro_score', self.local_store.execute(
+            "SELECT MAX(date) FROM macro_score")[0][0])
+
+    # Local db: 연결하기(현재 thread의 읽기 연결)
     def create_conn_sqlite(self):
         conn = None
         try:
-            conn = sqlite3.connect(self.local_db_file)  # disk에 db file 만들어짐
-            # conn = sqlite3.connect(':memory:') # memory(RAM)에 db file 만들어짐
+            conn = self.local_store.reader()
         except sqlite3.Error as e:
             logger.log_error(e)
         return conn
 
     # Local db: local과 remote db 데이터들의 max date 가져오기
-    def get_local_remote_date(self, conn: sqlite3.Connection, db_adaptor: DBAdaptor, remote_sql: str, local_sql: str):
+    def get_local_remote_date(self, db_adaptor: DBAdaptor, remote_sql: str, local_sql: str,
+                              remote_params: dict = None, local_params: dict = None):
         remote_max_date = None
         local_max_date = None
 
         try:
             # remote db에 존재하는 최대 날짜 가져오기
-            remote_df = db_adaptor.get(remote_sql).df()
-            remote_max_date = remote_df.iloc[0]['max_date'].strftime("%Y-%m-%d")
+            remote_df = db_adaptor.get(remote_sql, remote_params).df()
+            # 드라이버에 따라 date 또는 문자열로 옴
+            remote_max_date = pd.to_datetime(remote_df.iloc[0]['max_date']).strftime("%Y-%m-%d")
 
             # local db에 존재하는 최대 날짜 가져오기
-            local_df = pd.read_sql(sql=local_sql, con=conn)
+            local_df = self.local_store.read_df(local_sql, local_params)
             # 테이블이 비었을 경우 모든 날짜의 데이터를 가져온다
             local_max_date = local_df.iloc[0]['max_date'] if local_df.iloc[0]['max_date'] is not None else '0000-00-00'
         except pd.io.sql.DatabaseError as e:
@@ -205,100 +661,183 @@ class FrappeController:
         return remote_max_date, local_max_date
 
     # Local db: local db에 bm 가격 데이터 가져오기
-    def dump_bm_price_data(self, conn: sqlite3.Connection, bm_symbol_tuple: tuple):
-        # local db와 연결
-        sqlite_table = 'BM_price'
-
-        remote_sql = f"""
-            SELECT MAX(AsOfDate) as max_date
-                FROM FTSE
-                WHERE Symbol IN {bm_symbol_tuple}
-            UNION 
-            SELECT MAX(AsOfDate) as max_date
-                FROM MerrillLynch
-                WHERE Symbol IN {bm_symbol_tuple}
-            UNION
-            SELECT MAX(AsOfDate) as max_date
-                FROM GSCI
-                WHERE Symbol IN {bm_symbol_tuple}
+    # source(원격 table)마다 따로, 동시에. 서로 겹치지 않아서 UNION으로 중복 제거할 필요 없음
+    @profile_stage()
+    def dump_bm_price_data(self, bm_symbol_tuple: tuple):
+        # source별 소속 symbol과 symbol별 동기화를 마친 날짜(symbol마다 데이터가 올라오는 날짜가 다를 수 있음)
+        members, synced = self.get_bm_synced_dates(bm_symbol_tuple)
+        known = {symbol for symbols in members.values() for symbol in symbols}
+        absent = self.get_bm_absent_symbols()
+        # 어느 source에 있는지 모르는 symbol(처음 또는 새로 추가된 symbol)은 source마다 전체를 확인
+        unknown = tuple(symbol for symbol in bm_symbol_tuple if symbol not in known and symbol not in absent)
+
+        # 동기화 이후에 올라온 symbol별 원격 최근 날짜(UNION ALL 한 번)
+        # 소속 symbol은 그중 가장 이른 동기화 날짜 이후만 봐서 전체 이력을 훑지 않음(결과에 없으면 받을 게 없음)
+        queries, params = [], {}
+        for source in BM_SOURCES:
+            conditions = []
+            if members[source]:
+                conditions.append(f"(Symbol IN :members_{source} AND AsOfDate > :from_{source})")
+                params[f"members_{source}"] = members[source]
+                params[f"from_{source}"] = min(synced[symbol] for symbol in members[source])
+            if unknown:
+                conditions.append("Symbol IN :unknown")
+            if conditions:
+                queries.append(f"""
+                    SELECT '{source}' AS source, Symbol, MAX(AsOfDate) as max_date
+                        FROM {source}
+                        WHERE {" OR ".join(conditions)}
+                        GROUP BY Symbol
+                """)
+        if not queries:
+            return
+        if unknown:
+            params["unknown"] = unknown
+        remote_df = self.bm_db_adaptor.get(" UNION ALL ".join(queries), params).df().dropna()
+        # 드라이버에 따라 date 또는 문자열로 옴
+        remote_df['max_date'] = pd.to_datetime(remote_df['max_date']).dt.strftime("%Y-%m-%d")
+
+        # 어느 source에도 없는 symbol은 REFERENCE_TTL_S 동안 다시 확인하지 않음
+        if unknown:
+            self.local_store.set_watermark('BM_price:absent',
+                                           json.dumps(sorted(set(unknown) - set(remote_df['Symbol']))))
+
+        # 로컬이 늦은 symbol이 있는 source만
+        tasks = {}
+        for source, group in remote_df.groupby('source', sort=False):
+            remote_dates = dict(zip(group['Symbol'], group['max_date']))
+            ranges = self.get_bm_source_ranges(synced, remote_dates)
+            if ranges:
+                tasks[source] = (ranges, remote_dates)
+            elif set(remote_dates) & set(unknown):
+                # 처음 확인한 symbol은 받을 게 없어도 이 source 소속으로 기록
+                self.set_bm_watermark(source, remote_dates)
+        if not tasks:
+            return
+
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="bm-sync") as executor:
+            futures = {source: executor.submit(self.dump_bm_source, source, ranges, remote_dates)
+                       for source, (ranges, remote_dates) in tasks.items()}
+
+        # 한 source가 실패해도 나머지는 저장
+        for source, future in futures.items():
+            try:
+                future.result()
+            except (sqlite3.Error, SQLAlchemyError) as e:
+                logger.log_error(f"{source} BM 데이터를 로드하여 저장하는데 실패했습니다: {e}")
+
+    # Local db: source별 소속 symbol(watermark에 날짜가 있는 symbol)과 symbol별 동기화를 마친 날짜
+    # watermark에 없는 symbol(처음, 이전 형식 watermark, 새로 추가된 symbol)은 로컬 최근 날짜(없으면 처음부터)
+    def get_bm_synced_dates(self, bm_symbol_tuple: tuple) -> (dict, dict):
+        members, synced = {}, {}
+        for source in BM_SOURCES:
+            watermark = self.local_store.get_watermark(f"BM_price:{source}")
+            dates = json.loads(watermark).get("dates", {}) if watermark is not None else {}
+            members[source] = tuple(symbol for symbol in bm_symbol_tuple if symbol in dates)
+            synced.update({symbol: dates[symbol] for symbol in members[source]})
+
+        missing = [symbol for symbol in bm_symbol_tuple if symbol not in synced]
+        if missing:
+            local_dates = self.local_store.execute("""
+                SELECT s.value, (SELECT MAX(AsOfDate) FROM BM_price WHERE Symbol = s.value)
+                    FROM json_each(:symbols) s
+            """, {"symbols": json.dumps(missing)})
+            synced.update({symbol: date or '0000-00-00' for symbol, date in local_dates})
+        return members, synced
+
+    # Local db: 마지막 확인에서 어느 source에도 없던 symbol(REFERENCE_TTL_S가 지나면 다시 확인)
+    def get_bm_absent_symbols(self) -> set:
+        if self.reference_expired('BM_price:absent'):
+            return set()
+        return set(json.loads(self.local_store.get_watermark('BM_price:absent')))
+
+    # Local db: 받아야 할 [(symbol들, 이 날짜 이후, 이 날짜까지)]. 시작 날짜가 같은 symbol끼리 한 번에
+    @staticmethod
+    def get_bm_source_ranges(synced: dict, remote_dates: dict) -> list:
+        groups = {}
+        for symbol, to_date in remote_dates.items():
+            from_date = synced.get(symbol, '0000-00-00')
+            if from_date < to_date:
+                groups.setdefault(from_date, []).append(symbol)
+        return [(tuple(symbols), from_date, max(remote_dates[symbol] for symbol in symbols))
+                for from_date, symbols in groups.items()]
+
+    # symbol별로 원격 최근 날짜까지 받았다고 기록
+    def set_bm_watermark(self, source: str, remote_dates: dict):
+        watermark = self.local_store.get_watermark(f"BM_price:{source}")
+        dates = json.loads(watermark).get("dates", {}) if watermark is not None else {}
+        dates.update(remote_dates)
+        self.local_store.set_watermark(f"BM_price:{source}", json.dumps({"dates": dict(sorted(dates.items()))}))
+
+    # Local db: source 하나의 bm 가격을 받는 대로 로컬에 저장하고 watermark 갱신
+    def dump_bm_source(self, source: str, ranges: list, remote_dates: dict) -> int:
+        load_sql = f"""
+            SELECT AsOfDate, Symbol, Price, IndexName
+                FROM {source}
+                WHERE Symbol IN :symbols AND AsOfDate > :from_date AND AsOfDate <= :to_date
         """
+        insert_sql = "INSERT OR REPLACE INTO BM_price (AsOfDate, Symbol, Price, IndexName) VALUES (?, ?, ?, ?)"
+        rows = 0
+        for symbols, from_date, to_date in ranges:
+            logger.log_warning(f"{source} {from_date}~{to_date} BM 데이터 불러오는 중")
+            params = {"symbols": symbols, "from_date": from_date, "to_date": to_date}
+            for chunk in self.bm_db_adaptor.stream(load_sql, params, exact=True):
+                rows += self.local_store.execute_many(insert_sql, [tuple(None if pd.isna(value) else str(value)
+                                                                         for value in row) for row in chunk.data])
+
+        self.set_bm_watermark(source, remote_dates)
+        return rows
+
+    # Local db: local db에 trading 데이터 가져오기
+    @profile_stage()
+    def dump_fund_trading_data(self, symbol_tuple: tuple):
+        sqlite_table = 'Trading'
 
-        local_sql = f"""
+        # symbol만 바뀌므로 statement는 한 번만 만들어서 재사용
+        max_date_sql = """
             SELECT MAX(AsOfDate) as max_date
-                FROM {sqlite_table}
-                WHERE Symbol IN {bm_symbol_tuple}
+                FROM Trading
+                WHERE Symbol = :symbol
+        """
+        load_sql = """
+            SELECT AsOfDate, Symbol, CompanyCode, NAV, AUM, NetAssets, AdjustedNAV, ShareClassAUM
+                FROM Trading
+                WHERE Symbol = :symbol AND AsOfDate > :from_date AND AsOfDate <= :to_date
         """
 
-        # 각 db의 max date 가져오기
-        remote_max_date, local_max_date = self.get_local_remote_date(conn, self.bm_db_adaptor, remote_sql, local_sql)
-
-        # sqlite랑 mysql 날짜범위 비교해서 없는 날짜만 remote에서 가져오기
-        if local_max_date != remote_max_date:
-            # logger에 출력
-            logger.log_warning(f"{local_max_date}~{remote_max_date} BM 데이터 불러오는 중")
-
-            load_sql = f"""
-            SELECT AsOfDate, Symbol, Price, IndexName
-                FROM FTSE
-                WHERE Symbol IN {bm_symbol_tuple} AND AsOfDate > '{local_max_date}' AND AsOfDate <= '{remote_max_date}'
-            UNION 
-            SELECT AsOfDate, Symbol, Price, IndexName
-                FROM MerrillLynch
-                WHERE Symbol IN {bm_symbol_tuple} AND AsOfDate > '{local_max_date}' AND AsOfDate <= '{remote_max_date}'
-            UNION
-            SELECT AsOfDate, Symbol, Price, IndexName
-                FROM GSCI
-                WHERE Symbol IN {bm_symbol_tuple} AND AsOfDate > '{local_max_date}' AND AsOfDate <= '{remote_max_date}'
-            """
-
-            # local db에 추가
-            try:
-                load_df = self.bm_db_adaptor.get(load_sql).df()
-                if not load_df.empty:
-                    load_df = load_df.astype('str')
-                    load_df.to_sql(sqlite_table, conn, if_exists='append', index=False)
-            except sqlite3.Error as e:
-                logger.log_error("데이터를 로드하여 저장하는데 실패했습니다.")
-                # TODO: 사실 무슨 에러였는지 기억이....
-                print(e)
-
-    # Local db: local db에 trading 데이터 가져오기
-    def dump_fund_trading_data(self, conn: sqlite3.Connection, symbol_tuple: tuple):
-        sqlite_table = 'Trading'
+        # 펀드별로 fund_metrics가 계산된 최근 날짜
+        metrics_date = dict(self.local_store.execute("""
+            SELECT Symbol, MAX(AsOfDate) FROM fund_metrics
+                WHERE Symbol IN (SELECT value FROM json_each(:symbols))
+                GROUP BY Symbol
+        """, {"symbols": json.dumps(list(symbol_tuple))}))
+        stale_symbols = []
 
         for symbol in symbol_tuple:
-            remote_sql = f"""
-                SELECT MAX(AsOfDate) as max_date
-                    FROM Trading
-                    WHERE Symbol = '{symbol}'
-            """
-            # local db에 존재하는 최대 날짜 가져오기
-            local_sql = f"""
-                SELECT MAX(AsOfDate) as max_date
-                    FROM Trading
-                    WHERE Symbol = '{symbol}'
-            """
+            params = {"symbol": symbol}
 
             # 각 db의 max date 가져오기
-            remote_max_date, local_max_date = self.get_local_remote_date(conn, self.price_db_adaptor, remote_sql, local_sql)
+            remote_max_date, local_max_date = self.get_local_remote_date(self.price_db_adaptor, max_date_sql,
+                                                                         max_date_sql, params, params)
+
+            # 새 row가 들어왔거나 지표가 아직 없는 펀드는 지표 다시 계산
+            latest_date = remote_max_date or local_max_date
+            if latest_date not in (None, '0000-00-00') and metrics_date.get(symbol) != latest_date:
+                stale_symbols.append(symbol)
 
             # sqlite랑 mysql 날짜범위 비교해서 없는 날짜만 remote에서 가져오기
             if local_max_date != remote_max_date:
                 # logger에 출력
                 logger.log_warning(f"{symbol} {local_max_date}~{remote_max_date} 데이터 불러오는 중")
 
-                load_sql = f"""
-                    SELECT AsOfDate, Symbol, CompanyCode, NAV, AUM, NetAssets, AdjustedNAV, ShareClassAUM
-                        FROM Trading
-                        WHERE Symbol = '{symbol}' AND AsOfDate > '{local_max_date}' AND AsOfDate <= '{remote_max_date}'
-                """
-
                 # local db에 추가
                 try:
-                    load_df = self.price_db_adaptor.get(load_sql).df()
+                    load_params = {"symbol": symbol, "from_date": local_max_date, "to_date": remote_max_date}
+                    load_df = self.price_db_adaptor.get(load_sql, load_params, exact=True).df()
                     if not load_df.empty:
-                        load_df = load_df.astype('str')
-                        load_df.to_sql(sqlite_table, conn, if_exists='append', index=False)
+                        # 값은 str로(Decimal 자릿수 그대로), NULL은 NULL로
+                        load_df = load_df.astype('str').where(load_df.notna(), None)
+                        self.local_store.write_df(load_df, sqlite_table)
                 except sqlite3.IntegrityError as e:
                     logger.log_error("중복된 데이터가 있어 저장하는데 실채했습니다.")
                     print(e)
@@ -309,88 +848,174 @@ class FrappeController:
                     print(e)
                     exit(1)
 
-    # Screen: 펀드 운용금액이 낮은 펀드 symbol 가져오기
-    def get_funds_low_aum(self, symbol_tuple: tuple, target_date: str):
+        self.refresh_fund_metrics(tuple(stale_symbols))
+
+    # Local db: 펀드별 성과 지표(fund_metrics) 다시 계산
+    @profile_stage()
+    def refresh_fund_metrics(self, symbol_tuple: tuple, chunk_size: int = 500):
+        history = ", ".join(f"'{modifier}'" for modifier in HISTORY_MODIFIERS)
         query = f"""
-            SELECT DISTINCT Symbol, AsOfDate
-                FROM Trading
-                WHERE ShareClassAUM < 5000000000 AND Symbol in {symbol_tuple}
-                AND AsOfDate = (SELECT MAX(AsOfDate) FROM Trading WHERE AsOfDate <= '{target_date}')
+            WITH latest AS (
+                SELECT Symbol, MAX(AsOfDate) AS max_date
+                    FROM Trading
+                    WHERE Symbol IN (SELECT value FROM json_each(:symbols))
+                    GROUP BY Symbol
+            )
+            SELECT t.Symbol, t.AsOfDate, t.NAV, t.AdjustedNAV, t.AUM, t.ShareClassAUM
+                FROM Trading t JOIN latest l ON t.Symbol = l.Symbol
+                WHERE t.AsOfDate >= date(l.max_date, {history})
+                ORDER BY t.Symbol, t.AsOfDate
+        """
+        insert_sql = f"INSERT OR REPLACE INTO fund_metrics VALUES ({', '.join('?' * len(METRIC_COLUMNS))})"
+
+        for i in range(0, len(symbol_tuple), chunk_size):
+            chunk = symbol_tuple[i:i + chunk_size]
+            trade_df = self.local_store.read_df(query, {"symbols": json.dumps(list(chunk))})
+            rows = []
+            for symbol, group in trade_df.groupby('Symbol', sort=False):
+                # 펀드 하나 때문에 동기화 전체가 실패하지 않게(그 펀드는 지표 없이 다음 동기화에서 다시)
+                try:
+                    rows.append(compute_metrics(symbol, group))
+                except (ValueError, TypeError, ArithmeticError) as e:
+                    logger.log_error(f"{symbol} 성과 지표를 계산하지 못했습니다: {e}")
+            self.local_store.execute_many(insert_sql, rows)
+
+    # Table: 펀드별 target date 기준 최근 성과 지표
+    def load_fund_metrics(self, symbol_tuple: tuple, target_date: str) -> pd.DataFrame:
+        query = """
+            SELECT m.*
+                FROM fund_metrics m
+                JOIN (SELECT Symbol, MAX(AsOfDate) AS max_date
+                        FROM fund_metrics
+                        WHERE Symbol IN (SELECT value FROM json_each(:symbols)) AND AsOfDate <= :target_date
+                        GROUP BY Symbol) l
+                ON m.Symbol = l.Symbol AND m.AsOfDate = l.max_date
         """
+        return self.local_store.read_df(query, {"symbols": json.dumps(list(symbol_tuple)), "target_date": target_date})
+
+    # Table: 펀드별 기간 수익률(start_date 이상 첫 거래일 ~ end_date 이하 마지막 거래일)을 쿼리 한 번으로
+    # remote=True면 원격 db에서 계산해서 결과만
+    def load_period_returns(self, symbol_tuple: tuple, start_date: str, end_date: str,
+                            remote: bool = False) -> pd.DataFrame:
+        params = {"symbols": symbol_param(symbol_tuple, remote), "start_date": start_date, "end_date": end_date}
+        if remote:
+            return self.price_db_adaptor.get(PERIOD_RETURN_SQL["remote"], params).df()
+        return self.local_store.read_df(PERIOD_RETURN_SQL["local"], params)
+
+    # Table: 펀드별 target date 이하 마지막 Trading row를 쿼리 한 번으로
+    def load_latest_rows(self, symbol_tuple: tuple, target_date: str, remote: bool = False) -> pd.DataFrame:
+        params = {"symbols": symbol_param(symbol_tuple, remote), "target_date": target_date}
+        if remote:
+            return self.price_db_adaptor.get(LATEST_ROW_SQL["remote"], params).df()
+        return self.local_store.read_df(LATEST_ROW_SQL["local"], params)
+
+    # Screen: 펀드 운용금액이 낮은 펀드 symbol 가져오기
+    def get_funds_low_aum(self, symbol_tuple: tuple, target_date: str, min_aum: float = None):
+        if min_aum is None:
+            min_aum = self.screening_rule["MIN_SHARE_CLASS_AUM"]
+        # 전체 데이터의 최근 날짜(target date 이하)
+        as_of_date = self.local_store.execute("SELECT MAX(AsOfDate) FROM Trading WHERE AsOfDate <= :target_date",
+                                              {"target_date": target_date})[0][0]
+        # 그 날짜 지표가 있는 펀드는 fund_metrics에서, 없는 펀드(지표를 아직 다시 계산 안 한 펀드)는 Trading에서
+        query = """
+            SELECT DISTINCT j.value AS Symbol, :as_of_date AS AsOfDate
+                FROM json_each(:symbols) j
+                LEFT JOIN fund_metrics m ON m.Symbol = j.value AND m.AsOfDate = :as_of_date
+                LEFT JOIN Trading t ON m.Symbol IS NULL AND t.Symbol = j.value AND t.AsOfDate = :as_of_date
+                WHERE COALESCE(m.ShareClassAUM, t.ShareClassAUM) < :min_aum
+        """
+        params = {"symbols": json.dumps(list(symbol_tuple)), "as_of_date": as_of_date, "min_aum": min_aum}
 
         # TODO: 진짜 empty인지 데이터가 없어서 empty인지 if로 그래도 검사?
-        with sqlite3.connect(self.local_db_file) as conn:
-            result_df = pd.read_sql(sql=query, con=conn)
+        result_df = self.local_store.read_df(query, params)
 
         return result_df
 
     # Screen: Trading data의 최근 날짜가 타겟 날짜가 아닌 펀드 가져오기
     def get_funds_outdated(self, symbol_tuple: tuple, target_date: str):
-        query = f"""
-            SELECT Symbol, ShareClassAUM, Max(AsOfDate) as MaxDate
-                FROM Trading
-                WHERE Symbol in {symbol_tuple} AND AsOfDate <= '{target_date}'
-                GROUP BY Symbol
-                HAVING MaxDate != '{target_date}'
-        """
+        latest_df = self.load_latest_rows(symbol_tuple, target_date)
+        result_df = latest_df.loc[latest_df['AsOfDate'] != target_date, ['Symbol', 'ShareClassAUM', 'AsOfDate']]
 
-        with sqlite3.connect(self.local_db_file) as conn:
-            result_df = pd.read_sql(sql=query, con=conn)
-
-        return result_df
+        return result_df.rename(columns={'AsOfDate': 'MaxDate'}).reset_index(drop=True)
 
     # Chart: 해당 펀드의 trade 데이터 가져오기
-    def get_fund_trade_df(self, asset_id: str, target_date: str) -> pd.DataFrame:
+    # 로컬에 없으면 priority(기본은 차트 클릭)로 동기화를 요청하고 기다림
+    def get_fund_trade_df(self, asset_id: str, target_date: str, priority: int = INTERACTIVE) -> pd.DataFrame:
         # 캐시에서 해당 펀드의 trade 데이터 있는지 확인
+        # 캐시에는 target date 이후 데이터가 있을 수 있어서(백테스트 panel 등) target date까지만 잘라서
         fund_trade_df = self.cache_fund_dict.get(asset_id, None)
+        profiler.record_cache('fund_trade', fund_trade_df is not None)
         if fund_trade_df is not None:
-            return fund_trade_df
+            return fund_trade_df.loc[:target_date]
         else:
             # 없으면 DB에서 가져오기
-            with sqlite3.connect(self.local_db_file) as conn:
-                query = f"SELECT * FROM Trading WHERE Symbol='{asset_id}' AND AsOfDate <= '{target_date}'"
-                fund_trade_df = pd.read_sql(sql=query, con=conn)
-                # 데이터가 비었을 때 dump 해오기
-                if fund_trade_df.empty:
-                    symbol_tuple = (asset_id,)
-                    self.dump_fund_trading_data(conn, symbol_tuple)
-                    fund_trade_df = pd.read_sql(sql=query, con=conn)
+            query = "SELECT * FROM Trading WHERE Symbol = :symbol AND AsOfDate <= :target_date"
+            params = {"symbol": asset_id, "target_date": target_date}
+            fund_trade_df = self.local_store.read_df(query, params)
+            # 데이터가 비었을 때 dump 해오기
+            if fund_trade_df.empty:
+                self.sync_scheduler.sync((asset_id,), priority)
+                fund_trade_df = self.local_store.read_df(query, params)
 
             # fund_trade_df = self.load_fund_trade_info(self.price_db_adaptor, asset_id)
             # AsOfDate 컬럼을 index로
-            fund_trade_df = fund_trade_df.set_index('AsOfDate')
+            # 날짜 위치 검색(DateIndex)을 위해 날짜순 정렬
+            fund_trade_df = fund_trade_df.set_index(pd.DatetimeIndex(fund_trade_df.pop('AsOfDate'), name='AsOfDate'))
+            fund_trade_df = fund_trade_df.sort_index()
+            fund_trade_df = compact_frame(fund_trade_df, TRADE_SCHEMA, self.cache_float_dtype)
             self.cache_fund_dict[asset_id] = fund_trade_df
             return fund_trade_df
 
+    # 캐시 메모리 사용량(bytes)
+    def memory_report(self) -> dict:
+        fund_bytes = {asset_id: int(df.memory_usage(index=True, deep=True).sum())
+                      for asset_id, df in self.cache_fund_dict.items()}
+        bm_bytes = {symbol: int(df.memory_usage(index=True, deep=True).sum())
+                    for symbol, df in self.cache_bm_price_dict.items()}
+        fund_rows = sum(len(df) for df in self.cache_fund_dict.values())
+        total_fund_bytes = sum(fund_bytes.values())
+        return {
+            "funds": len(fund_bytes),
+            "fund_rows": fund_rows,
+            "fund_bytes": total_fund_bytes,
+            "bytes_per_fund": total_fund_bytes / len(fund_bytes) if fund_bytes else 0,
+            "bytes_per_row": total_fund_bytes / fund_rows if fund_rows else 0,
+            "bm_bytes": sum(bm_bytes.values()),
+            "bm": bm_bytes,
+            "largest_funds": sorted(fund_bytes.items(), key=lambda item: item[1], reverse=True)[:10],
+        }
+
     # Chart: bm 정보 가져오기
     def get_bm_price_df(self, asset_class: str, target_date: str) -> (pd.DataFrame, list):
         # 캐시에서 해당 펀드의 자산군에 맞는 bm 데이터 가져오기
-        key = config["ASSET_CLASS_MAP"][asset_class]
+        key = self.config["ASSET_CLASS_MAP"][asset_class]
         bm_price_df = self.cache_bm_price_dict.get(key, None)
+        profiler.record_cache('bm_price', bm_price_df is not None)
 
         # bm dict가 None 이면 bm 데이터 전체 불러오기
         if bm_price_df is None:
             # bm_df = self.load_bm_price_info(self.bm_db_adaptor, tuple(ASSET_CLASS_MAP.values()))
 
-            # local db와 연결
-            with sqlite3.connect(self.local_db_file) as conn:
-                bm_symbol_tuple = tuple(config["ASSET_CLASS_MAP"].values())
-                query = f"""
-                            SELECT AsOfDate, Symbol, Price, IndexName
-                                FROM BM_price
-                                WHERE Symbol IN {bm_symbol_tuple}
-                        """
+            bm_symbol_tuple = tuple(self.config["ASSET_CLASS_MAP"].values())
+            query = """
+                        SELECT AsOfDate, Symbol, Price, IndexName
+                            FROM BM_price
+                            WHERE Symbol IN (SELECT value FROM json_each(:symbols))
+                    """
+            params = {"symbols": json.dumps(list(bm_symbol_tuple))}
 
-                bm_df = pd.read_sql(sql=query, con=conn)
-                # 데이터가 비었을 때, dump해오기
-                if bm_df.empty:
-                    self.dump_bm_price_data(conn, bm_symbol_tuple)
-                    bm_df = pd.read_sql(sql=query, con=conn)
+            bm_df = self.local_store.read_df(query, params)
+            # 데이터가 비었을 때, dump해오기
+            if bm_df.empty:
+                self.dump_bm_price_data(bm_symbol_tuple)
+                bm_df = self.local_store.read_df(query, params)
 
-            res = bm_df.groupby('Symbol')
+            bm_df = compact_frame(bm_df, BM_SCHEMA, self.cache_float_dtype)
+            res = bm_df.groupby('Symbol', observed=True)
 
             # timelag 계산(KR만 time lag 1)
             for symbol, group in res:
+                group = group.copy()
                 if symbol in ("MLG0SK", "I04781"):
                     group['Price'] = group['Price'].shift(1)
                 else:
@@ -410,7 +1035,8 @@ class FrappeController:
         # target date 넘지 않게 자르기
         bm_price_df = bm_price_df[bm_price_df['AsOfDate'] <= target_date]
 
-        pivot_df = bm_price_df.pivot(index='AsOfDate', columns='Symbol', values='Price')
+        # category column으로 pivot하면 column이 CategoricalIndex가 돼서 문자열로
+        pivot_df = bm_price_df.astype({'Symbol': str}).pivot(index='AsOfDate', columns='Symbol', values='Price')
         pivot_df = pivot_df.astype('float')
         pivot_df.index = pd.to_datetime(pivot_df.index)  # day_name을 위해 필요
 
@@ -502,6 +1128,7 @@ class FrappeController:
         return weight_dict
 
     # SCREEN: 특정 단어들을 포함하는 펀드 제외
+    @profile_stage()
     def screen_fund_name(self, selected_fund_df: pd.DataFrame):
         # 해당 단어들을 포함하는 펀드 찾기
         logger.log(f"펀드 명칭 필터링 시작")
@@ -524,6 +1151,7 @@ class FrappeController:
         return selected_fund_df[~name_filter_fund]
 
     # SCREEN: C 클래스 이외 펀드 제외
+    @profile_stage()
     def screen_fund_class(self, selected_fund_df: pd.DataFrame):
         logger.log(f"C클래스 이외 펀드 필터링 시작")
 
@@ -539,12 +1167,12 @@ class FrappeController:
         return selected_fund_df[class_filter_fund]
 
     # SCREEN: 104주(=2년) + 5주(버퍼) 미만 펀드 제외
+    @profile_stage()
     def screen_fund_period(self, selected_fund_df: pd.DataFrame, target_date: str):
         # 타겟 날짜로부터 104주 전 날짜 찾기
         logger.log(f"펀드 출시일 기준 필터링 시작")
 
-        today = datetime.datetime.strptime(target_date, "%Y-%m-%d")
-        least_date = today - relativedelta(years=2) - relativedelta(weeks=5)
+        least_date = self.least_inception_date(target_date)
 
         # 운용 기간이 104주보다 짧은 펀드 찾기
         symbol_tuple = tuple(selected_fund_df['asset_id'])
@@ -558,7 +1186,14 @@ class FrappeController:
         # 운용기간이 104주 이상인 펀드들 남겨놓기
         return selected_fund_df[~selected_fund_df['asset_id'].isin(date_filter_fund['Symbol'])]
 
+    # SCREEN: 이 날짜보다 늦게 출시된(운용 중인) 펀드는 제외
+    def least_inception_date(self, target_date: str, rule: dict = None) -> datetime.datetime:
+        rule = rule or self.screening_rule
+        today = datetime.datetime.strptime(target_date, "%Y-%m-%d")
+        return today - relativedelta(years=rule["MIN_PERIOD_YEARS"]) - relativedelta(weeks=rule["PERIOD_BUFFER_WEEKS"])
+
     # SCREEN: Trading ShareClassAUM 50억 미만 펀드 제외
+    @profile_stage()
     def screen_fund_shareAum(self, selected_fund_df: pd.DataFrame, target_date: str):
         # 50억 미만인 펀드 찾기
         logger.log(f"펀드 운용금액 기준 필터링 시작")
@@ -577,6 +1212,7 @@ class FrappeController:
         return selected_fund_df[~selected_fund_df['asset_id'].isin(aum_filter_fund['Symbol'])]
 
     # SCREEN: Trading data가 최근에 쌓이지 않은 펀드 제외
+    @profile_stage()
     def screen_fund_last_update(self, selected_fund_df: pd.DataFrame, target_date: str):
         logger.log(f"Trading data 날짜 필터링 시작")
         symbol_tuple = tuple(selected_fund_df['asset_id'])
@@ -593,14 +1229,27 @@ class FrappeController:
         return selected_fund_df[~selected_fund_df['asset_id'].isin(trading_outdated_fund['Symbol'])]
 
     # ---PROCESS: screening 단계
+    @profile_stage()
     def screening(self, total_fund_df: pd.DataFrame, target_date: str) -> pd.DataFrame:
+        # 기준값과 상관없는 screen
+        selected_fund_df = self.screen_fund_static(total_fund_df, target_date)
+
+        # 104주(=2년) + 5주(버퍼) 미만 펀드 제외
+        selected_fund_df = self.screen_fund_period(selected_fund_df, target_date)
+
+        # Trading ShareClassAUM 50억 미만 펀드 제외
+        selected_fund_df = self.screen_fund_shareAum(selected_fund_df, target_date)
+
+        return selected_fund_df
+
+    # SCREEN: 기준값(SCREENING_RULE)과 상관없는 screen(최근 데이터, ETC, 명칭, 클래스)
+    def screen_fund_static(self, total_fund_df: pd.DataFrame, target_date: str) -> pd.DataFrame:
         # Trading data가 최근에 쌓이지 않은 펀드 제외
         selected_fund_df = self.screen_fund_last_update(total_fund_df, target_date)
         if selected_fund_df.empty:
-            with sqlite3.connect(self.local_db_file) as conn:
-                logger.log_error("해당 일의 데이터가 로컬에 업데이트 되지 않았습니다. 업데이트를 진행하겠습니다.")
-                self.dump_fund_trading_data(conn, tuple(total_fund_df['asset_id']))
-                selected_fund_df = self.screen_fund_last_update(total_fund_df, target_date)
+            logger.log_error("해당 일의 데이터가 로컬에 업데이트 되지 않았습니다. 업데이트를 진행하겠습니다.")
+            self.sync_scheduler.sync(tuple(total_fund_df['asset_id']), PIPELINE)
+            selected_fund_df = self.screen_fund_last_update(total_fund_df, target_date)
             logger.log_error("업데이트 끝")
 
         # Etc 자산군 펀드 제외
@@ -620,18 +1269,14 @@ class FrappeController:
         selected_fund_df = self.screen_fund_name(selected_fund_df)
 
         # C 클래스 이외 펀드 제외
-        selected_fund_df = self.screen_fund_class(selected_fund_df)
-
-        # 104주(=2년) + 5주(버퍼) 미만 펀드 제외
-        selected_fund_df = self.screen_fund_period(selected_fund_df, target_date)
-
-        # Trading ShareClassAUM 50억 미만 펀드 제외
-        selected_fund_df = self.screen_fund_shareAum(selected_fund_df, target_date)
-
-        return selected_fund_df
+        return self.screen_fund_class(selected_fund_df)
 
     # ---PROCESS: proselecting 단계(상관계수 구하기)
-    def preselecting(self, fund_df: pd.DataFrame, target_date: str) -> pd.DataFrame:
+    @profile_stage()
+    def preselecting(self, fund_df: pd.DataFrame, target_date: str, min_correlation: float = None) -> pd.DataFrame:
+        if min_correlation is None:
+            min_correlation = self.screening_rule["MIN_CORRELATION"]
+
         # pre-selection의 return 변수
         preselected_fund_df = pd.DataFrame(columns=['asset_id', 'asset_name', 'asset_class_symbol',
                                                     'correlation', 'period_return'])
@@ -642,44 +1287,30 @@ class FrappeController:
         # 각 펀드의 spearman 상관계수 구하기
         res = fund_df.groupby('asset_class_symbol')
 
+        # 펀드별 기간 수익률은 전체 이력을 읽지 않고 쿼리 한 번으로
+        period_returns = self.get_period_returns(tuple(fund_df['asset_id']), target_date)
+
         # 자산군별로 corr 구하기
         filtered_fund_count = 0
         for key, group in res:
-            # bm 데이터 df 불러오기
-            bm_fund_df, bm_name = self.get_bm_price_df(key, target_date)
             fund_info_dict = {}
+            trade_df_list = []
             for i in range(len(group)):
                 asset_id = group.iloc[i]['asset_id']
                 asset_name = group.iloc[i]['asset_name']
 
-                # 펀드 가격 정보 가져오기
-                trade_df = self.get_fund_trade_df(asset_id, target_date)
-                trade_df = trade_df.reset_index()
-                trade_df = trade_df.pivot(index='AsOfDate', columns='Symbol', values='AdjustedNAV')
-
-                # 해당 펀드의 기간 수익률 계산
-                # target date에서 40주까지, 최근 4주 제외
-                trade_df.index = pd.to_datetime(trade_df.index)
-                start_date = datetime.datetime.strptime(target_date, "%Y-%m-%d") - relativedelta(weeks=104)
-                end_date = datetime.datetime.strptime(target_date, "%Y-%m-%d") - relativedelta(weeks=4)
-                period_return_df = trade_df.query(
-                    f"index >= '{start_date.date()}' and index <= '{end_date.date()}'").sort_index(axis=0, ascending=True)
-
-                period_return = float(((period_return_df.iloc[-1] - period_return_df.iloc[0]) / period_return_df.iloc[0]) * 100)
-
                 fund_info_dict[asset_id] = {
                     'asset_id': asset_id,
                     'asset_name': asset_name,
                     'asset_class_symbol': key,
-                    'period_return': period_return
+                    'period_return': period_returns.get(asset_id)
                 }
 
-                # 같은 자산군 df끼리 세로로 붙임 날짜가 index, column은 asset_id, value는 price
-                bm_fund_df = self.concat_fund_bm_df(trade_df, bm_fund_df)  # 첫 bm_fund_df는 bm_df 값만 가지고 있음
+                # 상관계수용 펀드 가격 정보
+                trade_df_list.append(self.get_fund_nav_df(asset_id, target_date))
 
             # 펀드들과 BM의 스피어만 상관계수 한꺼번에 구하기
-            corr_df = self.cal_spearman_corr(bm_fund_df)
-            corr_df = corr_df[key]  # ETC는 어차피 없으므로
+            corr_df = self.get_class_corr(key, trade_df_list, target_date)
 
             # TODO: 흠...
             logger.log(f"{key} 자산군 상관계수 필터링 시작")
@@ -689,7 +1320,7 @@ class FrappeController:
                 fund_bm_corr = corr_df[asset_id]
 
                 # 스피어만 상관계수가 0.8 이상인 펀드들 추리기
-                if (fund_bm_corr >= 0.8) or ("BOND" in key):
+                if (fund_bm_corr >= min_correlation) or ("BOND" in key):
                     fund_info_dict[asset_id]['correlation'] = fund_bm_corr
                     preselected_fund_df = preselected_fund_df.append(fund_info_dict[asset_id], ignore_index=True)
                 else:
@@ -703,21 +1334,62 @@ class FrappeController:
         # 0.8 이상인 펀드 df 리턴
         return preselected_fund_df
 
+    # PRESELECT: 기간 수익률 구간(target date에서 104주 전 ~ 4주 전, 최근 4주 제외)
+    def period_return_range(self, target_date: str) -> (str, str):
+        date = pd.Timestamp(target_date)
+        return tuple((date - relativedelta(weeks=weeks)).strftime("%Y-%m-%d") for weeks in (104, 4))
+
+    # PRESELECT: 펀드별 기간 수익률(asset_id -> 수익률, 구간에 데이터가 없는 펀드는 빠짐)
+    def get_period_returns(self, symbol_tuple: tuple, target_date: str) -> dict:
+        period_df = self.load_period_returns(symbol_tuple, *self.period_return_range(target_date))
+        return dict(zip(period_df['Symbol'], period_df['period_return'].astype(float)))
+
+    # PRESELECT: 펀드 가격(펀드 하나라서 pivot 대신 column 이름만 asset_id로)
+    def get_fund_nav_df(self, asset_id: str, target_date: str) -> pd.DataFrame:
+        trade_df = self.get_fund_trade_df(asset_id, target_date, PIPELINE)
+        return trade_df[['AdjustedNAV']].rename(columns={'AdjustedNAV': asset_id})
+
+    # PRESELECT: 같은 자산군 펀드들과 BM의 스피어만 상관계수(펀드들이 모두 있는 기간으로 잘라서)
+    def get_class_corr(self, asset_class: str, trade_df_list: list, target_date: str) -> pd.Series:
+        # bm 데이터 df 불러오기
+        bm_df, bm_name = self.get_bm_price_df(asset_class, target_date)
+
+        # 같은 자산군 df끼리 가로로 한 번에 붙임 날짜가 index, column은 asset_id, value는 price
+        # (펀드마다 붙이면 펀드 수만큼 전체 frame을 다시 만듦)
+        bm_fund_df = self.concat_fund_bm_df(pd.concat(trade_df_list, axis=1), bm_df)
+
+        corr_df = self.cal_spearman_corr(bm_fund_df)
+        return corr_df[asset_class]  # ETC는 어차피 없으므로
+
+    # ---PROCESS: postselecting 단계(자산군별 기간 수익률 top 5)
+    @profile_stage()
+    def postselecting(self, preselected_fund_df: pd.DataFrame, top_n: int = None) -> pd.DataFrame:
+        if top_n is None:
+            top_n = self.selection_rule["TOP_N"]
+        asset_class_top_5_df = preselected_fund_df.sort_values(by="period_return", ascending=False).groupby(
+            "asset_class_symbol").head(top_n)
+        asset_class_top_5_df = asset_class_top_5_df.sort_values(by=["asset_class_symbol", "period_return"],
+                                                                ascending=[False, False])
+        return asset_class_top_5_df
+
     # ---PROCESS: weighting 단계
-    def weighting(self, target_date: str, user_risk_type: dict) -> dict:
+    @profile_stage()
+    def weighting(self, target_date: str, user_risk_type: dict = None) -> dict:
+        # 위험 유형을 안 넘기면 전체 위험 유형
+        if user_risk_type is None:
+            user_risk_type = self.config["RISK_TYPE"]
+
         # macro score 받아오기
-        macro_score_df = self.load_macro_score(self.customer_db_adaptor, target_date)
-        dm_stock_score = float(macro_score_df.query("score_id == 'DM_STOCK'")['score_value'])
-        score_idx = int(dm_stock_score + 1)
+        score_idx = self.macro_score_index(target_date)
 
         # 위험성향 별 자산군 비중 구하기
         weight_by_risk = {}
         for risk_type, equity in user_risk_type.items():
             # ---Equity(주식) 전체 비율 구하기 -> 일의 자리로 나눠 떨어져야함
-            equity = round(equity * config['WEIGHTING_RULE']['TOTAL_EQUITY'][score_idx] * 100, 5)
+            equity = round(equity * self.config['WEIGHTING_RULE']['TOTAL_EQUITY'][score_idx] * 100, 5)
             # equity 자산군 비중 계산
             equity_weight_dict = {}
-            for asset_class, value in config['WEIGHTING_RULE']['EQUITY'].items():
+            for asset_class, value in self.config['WEIGHTING_RULE']['EQUITY'].items():
                 equity_weight_dict[asset_class] = round(value[score_idx] * equity, 5)
             # dm stock 따로 계산
             equity_weight_dict['DM_STOCK'] = round(equity - sum(equity_weight_dict.values()), 5)
@@ -726,7 +1398,7 @@ class FrappeController:
             fixed_income = 100 - equity
             # fixed income 자산군 비중 계산
             fixed_income_weight_dict = {}
-            for asset_class, value in config['WEIGHTING_RULE']['FIXED_INCOME'].items():
+            for asset_class, value in self.config['WEIGHTING_RULE']['FIXED_INCOME'].items():
                 fixed_income_weight_dict[asset_class] = round(value[score_idx] * fixed_income, 5)
             # kr_bond 따로 계산
             fixed_income_weight_dict['KR_BOND'] = round(fixed_income - sum(fixed_income_weight_dict.values()), 5)
@@ -736,10 +1408,37 @@ class FrappeController:
 
         return weight_by_risk
 
+    # WEIGHT: DM_STOCK macro score(-1, 0, 1)를 WEIGHTING_RULE 값 위치로
+    def macro_score_index(self, target_date: str) -> int:
+        macro_score_df = self.load_macro_score(self.customer_db_adaptor, target_date)
+        dm_stock_score = float(macro_score_df.query("score_id == 'DM_STOCK'")['score_value'])
+        return int(dm_stock_score + 1)
+
+    # WEIGHT: weighting을 주식 비율 배열 전체에 한 번에(행: 주식 비율 하나, 열: 자산군)
+    def weight_matrix(self, equity: np.ndarray, target_date: str) -> (list, np.ndarray):
+        score_idx = self.macro_score_index(target_date)
+        rule = self.config['WEIGHTING_RULE']
+
+        equity = np.round(np.asarray(equity, dtype=float) * rule['TOTAL_EQUITY'][score_idx] * 100, 5)
+        equity_columns = list(rule['EQUITY'])
+        equity_weight = np.round(np.outer(equity, [rule['EQUITY'][column][score_idx] for column in equity_columns]), 5)
+        dm_stock = np.round(equity - equity_weight.sum(axis=1), 5)
+
+        fixed_income = 100 - equity
+        fixed_columns = list(rule['FIXED_INCOME'])
+        fixed_weight = np.round(np.outer(fixed_income, [rule['FIXED_INCOME'][column][score_idx]
+                                                        for column in fixed_columns]), 5)
+        kr_bond = np.round(fixed_income - fixed_weight.sum(axis=1), 5)
+
+        columns = equity_columns + ['DM_STOCK'] + fixed_columns + ['KR_BOND']
+        return columns, np.column_stack([equity_weight, dm_stock, fixed_weight, kr_bond])
+
     # ---PROCESS: 주어진 비중으로 포트폴리오 산출 단계
-    def select_portfolio(self, postselected_fund_df: pd.DataFrame, weight_by_risk: dict, CORRECT: bool = False) -> dict:
-        MAX_WEIGHT = 30
-        MIN_WEIGHT = 5
+    @profile_stage()
+    def select_portfolio(self, postselected_fund_df: pd.DataFrame, weight_by_risk: dict, CORRECT: bool = False,
+                         max_weight: float = None, min_weight: float = None) -> dict:
+        MAX_WEIGHT = self.selection_rule["MAX_WEIGHT"] if max_weight is None else max_weight
+        MIN_WEIGHT = self.selection_rule["MIN_WEIGHT"] if min_weight is None else min_weight
 
         # 각 자산군의 top5 df를 자산군끼리 묶기
         res = postselected_fund_df.groupby('asset_class_symbol')
@@ -754,8 +1453,8 @@ class FrappeController:
             # TODO: 3중 for구문
             for asset_class, fund_group in res:
                 fund_group = fund_group.sort_values(by="period_return", ascending=False)
-                # 비중이 없는 자산군은 표시 안함
-                total_weight = weight_list[asset_class]
+                # 비중이 없는 자산군은 표시 안함(WEIGHTING_RULE에 없는 자산군 포함)
+                total_weight = weight_list.get(asset_class, 0)
                 if total_weight == 0:
                     continue
 
@@ -800,73 +1499,111 @@ class FrappeController:
 
     # TODO: portfolio_by_risk를 그냥 postselected_fund_df가 할수 있을 것 같은데...
     # ---PROCESS: correcting 단계
-    def correcting(self, postselected_fund_df: pd.DataFrame, weight_by_risk: dict) -> (dict, dict):
-        MAX_WEIGHT = 30
-        MIN_WEIGHT = 5
-
+    @profile_stage()
+    def correcting(self, postselected_fund_df: pd.DataFrame, weight_by_risk: dict, max_weight: float = None,
+                   min_weight: float = None) -> (dict, dict):
         for risk_type, weight_dict in weight_by_risk.items():
-            # # TODO: df로 하면 편한데 일단 dict로 해보기
-            # weight_df = pd.DataFrame(list(weight_dict.items()), columns=['asset_class', 'weight'])
-
-            # ---1. 일의 자리로 반올림
-            for asset_class, weight in weight_dict.items():
-                weight_dict[asset_class] = round(weight)
-
-            # 비중 총합이 100인지 확인
-            weight_dict = self.correct_total_weight(weight_dict)
-
-            # ---2. 포트폴리오에 없는 자산군 유형의 비중은 N분할
-            # TODO: 아어ㅏㅓ마ㅓ;ㅣㅏㅓ
-            stock_left = 0
-            bond_left = 0
-            stock_num = 0
-            bond_num = 0
-            for asset_class, weight in list(weight_dict.items()):
-                if asset_class not in postselected_fund_df['asset_class_symbol'].unique():
-                    if 'BOND' in asset_class:
-                        bond_left += weight
-                        del weight_dict[asset_class]
-                    elif 'STOCK' in asset_class or 'GOLD' in asset_class:
-                        stock_left += weight
-                        del weight_dict[asset_class]
-                else:
-                    if 'BOND' in asset_class:
-                        bond_num += 1
-                    elif 'STOCK' in asset_class or 'GOLD' in asset_class:
-                        stock_num += 1
-
-            # 정확히 분할이 안될 경우, 몫은 동등하게 가지고, 나머지는 defulat 자산에 넣기
-            # TODO: 불필요한 순회?, 계산 에러처리...
-            stock_quot = stock_left // stock_num
-            bond_quot = bond_left // bond_num
-            for asset_class in weight_dict.keys():
+            weight_by_risk[risk_type] = self.correct_weight_dict(postselected_fund_df, weight_dict, min_weight)
+
+        # 수정된 비중에 따라 위험성향별 포트폴리오 선정
+        portfolio_by_risk = self.select_portfolio(postselected_fund_df, weight_by_risk, True, max_weight, min_weight)
+
+        return weight_by_risk, portfolio_by_risk
+
+    # CORRECT: 위험 유형 하나의 자산군 비중 보정(넘긴 dict는 그대로 두고 새 dict 리턴)
+    def correct_weight_dict(self, postselected_fund_df: pd.DataFrame, weight_dict: dict,
+                            min_weight: float = None) -> dict:
+        MIN_WEIGHT = self.selection_rule["MIN_WEIGHT"] if min_weight is None else min_weight
+
+        # # TODO: df로 하면 편한데 일단 dict로 해보기
+        # weight_df = pd.DataFrame(list(weight_dict.items()), columns=['asset_class', 'weight'])
+
+        # ---1. 일의 자리로 반올림
+        weight_dict = {asset_class: round(weight) for asset_class, weight in weight_dict.items()}
+
+        # 비중 총합이 100인지 확인
+        weight_dict = self.correct_total_weight(weight_dict)
+
+        # ---2. 포트폴리오에 없는 자산군 유형의 비중은 N분할
+        # TODO: 아어ㅏㅓ마ㅓ;ㅣㅏㅓ
+        stock_left = 0
+        bond_left = 0
+        stock_num = 0
+        bond_num = 0
+        for asset_class, weight in list(weight_dict.items()):
+            if asset_class not in postselected_fund_df['asset_class_symbol'].unique():
                 if 'BOND' in asset_class:
-                    weight_dict[asset_class] += bond_quot
+                    bond_left += weight
+                    del weight_dict[asset_class]
                 elif 'STOCK' in asset_class or 'GOLD' in asset_class:
-                    weight_dict[asset_class] += stock_quot
-            weight_dict['DM_STOCK'] += (stock_left % stock_num)
-            weight_dict['KR_BOND'] += (bond_left % bond_num)
+                    stock_left += weight
+                    del weight_dict[asset_class]
+            else:
+                if 'BOND' in asset_class:
+                    bond_num += 1
+                elif 'STOCK' in asset_class or 'GOLD' in asset_class:
+                    stock_num += 1
+
+        # 정확히 분할이 안될 경우, 몫은 동등하게 가지고, 나머지는 defulat 자산에 넣기
+        # TODO: 불필요한 순회?, 계산 에러처리...
+        stock_quot = stock_left // stock_num
+        bond_quot = bond_left // bond_num
+        for asset_class in weight_dict.keys():
+            if 'BOND' in asset_class:
+                weight_dict[asset_class] += bond_quot
+            elif 'STOCK' in asset_class or 'GOLD' in asset_class:
+                weight_dict[asset_class] += stock_quot
+        weight_dict['DM_STOCK'] += (stock_left % stock_num)
+        weight_dict['KR_BOND'] += (bond_left % bond_num)
+
+        # ---3. 비중이 최소비중 미만인 자산군은 default 자산에 포함시키기
+        for asset_class, weight in weight_dict.items():
+            # TODO: 자기 자신거 들어가서 문제. 한번 더 더하니까 -> 해결해쓴ㄴ데 이게 최선?
+            if weight < MIN_WEIGHT:
+                if 'BOND' in asset_class and asset_class != 'KR_BOND':
+                    weight_dict['KR_BOND'] += weight
+                elif ('STOCK' in asset_class or 'GOLD' in asset_class) and asset_class != 'DM_STOCK':
+                    weight_dict['DM_STOCK'] += weight
 
-            # ---3. 비중이 최소비중 미만인 자산군은 default 자산에 포함시키기
-            for asset_class, weight in weight_dict.items():
-                # TODO: 자기 자신거 들어가서 문제. 한번 더 더하니까 -> 해결해쓴ㄴ데 이게 최선?
-                if weight < MIN_WEIGHT:
-                    if 'BOND' in asset_class and asset_class != 'KR_BOND':
-                        weight_dict['KR_BOND'] += weight
-                    elif ('STOCK' in asset_class or 'GOLD' in asset_class) and asset_class != 'DM_STOCK':
-                        weight_dict['DM_STOCK'] += weight
+        return weight_dict
 
-            weight_by_risk[risk_type] = weight_dict
+    # ---PROCESS: 전체 RA 프로세스(GUI 없이 실행할 때)
+    def run_pipeline(self, target_date: str, user_risk_type: dict = None) -> dict:
+        with profiler.run("pipeline", target_date=target_date):
+            return self._run_pipeline(target_date, user_risk_type)
 
-        # 수정된 비중에 따라 위험성향별 포트폴리오 선정
-        portfolio_by_risk = self.select_portfolio(postselected_fund_df, weight_by_risk, True)
+    def _run_pipeline(self, target_date: str, user_risk_type: dict = None) -> dict:
+        # 전체 펀드 불러오기
+        self.fund_df["total_fund_df"] = self.load_funds_info(self.customer_db_adaptor, target_date)
 
-        return weight_by_risk, portfolio_by_risk
+        # screen 단계
+        self.fund_df["selected_fund_df"] = self.screening(self.fund_df["total_fund_df"], target_date)
+
+        # preselect 단계
+        self.fund_df["preselected_fund_df"] = self.preselecting(self.fund_df["selected_fund_df"], target_date)
+
+        # postselect 단계
+        postselected_fund_df = self.postselecting(self.fund_df["preselected_fund_df"])
+        self.fund_df["postselected_fund_df"] = postselected_fund_df
+
+        # weighting, allocation 단계
+        weight_by_risk = self.weighting(target_date, user_risk_type)
+        self.fund_df["weight_by_risk"] = weight_by_risk
+        self.fund_df["portfolio_by_risk"] = self.select_portfolio(postselected_fund_df, weight_by_risk)
+
+        # correction 단계(correcting은 넘긴 dict를 고쳐 쓰므로 weighting 결과는 그대로 두고 복사본을)
+        new_weight_by_risk, new_portfolio_by_risk = self.correcting(postselected_fund_df,
+                                                                    copy.deepcopy(weight_by_risk))
+        self.fund_df["new_weight_by_risk"] = new_weight_by_risk
+        self.fund_df["new_portfolio_by_risk"] = new_portfolio_by_risk
+
+        return self.fund_df
 
     # 같은 기간으로 자른 bm df와 trade df 가로로 합치기
     def concat_fund_bm_df(self, trade_df: pd.DataFrame, bm_df: pd.DataFrame) -> pd.DataFrame:
-        # index 타입이 서로 같아야 함
-        trade_df.index = pd.to_datetime(trade_df.index)
+        # index 타입이 서로 같아야 함(이미 DatetimeIndex면 변환 생략)
+        if not isinstance(trade_df.index, pd.DatetimeIndex):
+            trade_df.index = pd.to_datetime(trade_df.index)
 
         # 펀드 가격 df와 bm 가격 df 합치기
         bm_fund_df = pd.concat([bm_df, trade_df], axis=1).ffill().dropna()
@@ -884,16 +1621,22 @@ class FrappeController:
 
         # 최근 날짜 기준 weekly 데이터로 전환
         date = bm_fund_df.index[-1]
-        day_name = date.strftime("%a")
-
-        corr_df = bm_fund_df.resample(f'W-{day_name}').ffill()
+        corr_df = weekly_frame(bm_fund_df)
 
         # 104주 데이터로 자르기, 최근 4주 데이터 제외
-        start_date = date - relativedelta(weeks=104)
-        end_date = date - relativedelta(weeks=4)
-        corr_df = corr_df.query(f"index >= '{start_date}' and index <= '{end_date}'")
+        date_index = DateIndex(corr_df.index)
+        start_date = date_index.offset_date('weeks', CORR_WINDOW_WEEKS, date)
+        end_date = date_index.offset_date('weeks', CORR_LAG_WEEKS, date)
+        corr_df = corr_df.iloc[date_index.between(start_date, end_date)]
 
         # 펀드들과 BM의 스피어만 상관계수 한꺼번에 구하기
         corr_df = corr_df.corr(method='spearman')
 
         return corr_df
+
+    # 주 단위 날짜마다 ref column(BM)과의 스피어만 상관계수 추이(각 날짜에서 cal_spearman_corr와 같은 구간)
+    # 날짜마다 다시 순위를 매기지 않고 전체 기간을 한 번 훑어서
+    def cal_spearman_corr_trend(self, bm_fund_df: pd.DataFrame, ref_column: str,
+                                min_periods: int = None) -> pd.DataFrame:
+        corr_df = weekly_frame(bm_fund_df.astype('float'))
+        return rolling_spearman(corr_df, ref_column, min_periods=min_periods)
@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from tradingCalendar import DateIndex
+
+# fund_metrics table column 순서(sqlite_table의 DDL과 같음)
+METRIC_COLUMNS = (
+    "Symbol", "AsOfDate", "NAV", "AdjustedNAV", "AUM", "ShareClassAUM",
+    "return_1m", "return_3m", "return_ytd", "return_1y", "return_3y", "return_104w", "volatility_1y",
+)
+
+# 기간 수익률: (column, 단위, 기간)
+RETURN_PERIODS = (
+    ("return_1m", "months", 1),
+    ("return_3m", "months", 3),
+    ("return_1y", "years", 1),
+    ("return_3y", "years", 3),
+    ("return_104w", "weeks", 104),
+)
+
+# 계산에 필요한 최근 데이터 범위(sqlite date() modifier). 3년 수익률 + 휴일 여유
+HISTORY_MODIFIERS = ("-3 years", "-10 days")
+
+# 연율화에 쓰는 1년 거래일 수
+TRADING_DAYS = 252
+
+
+def _period_return(nav: np.ndarray, pos: int):
+    if pos < 0 or not nav[pos] or np.isnan(nav[pos]) or np.isnan(nav[-1]):
+        return None
+    return float((nav[-1] - nav[pos]) / nav[pos] * 100)
+
+
+# 숫자가 아니면(NULL, 예전 로컬 db의 'None' 문자열) None
+def _number(value):
+    value = pd.to_numeric(value, errors='coerce')
+    return None if pd.isna(value) else float(value)
+
+
+# 펀드 하나의 최근 데이터(AsOfDate 순 정렬)로 fund_metrics row 만들기. 값이 없는 지표는 NULL
+def compute_metrics(symbol: str, trade_df: pd.DataFrame) -> tuple:
+    date_index = DateIndex(trade_df['AsOfDate'])
+    nav = pd.to_numeric(trade_df['AdjustedNAV'], errors='coerce').to_numpy(dtype=float)
+    latest = trade_df.iloc[-1]
+
+    metrics = {column: _period_return(nav, date_index.lookback(unit, period))
+               for column, unit, period in RETURN_PERIODS}
+    metrics["return_ytd"] = _period_return(nav, date_index.year_start(date_index.date(-1).year))
+
+    # 최근 1년 일간 로그수익률의 표준편차(연율화)
+    pos = date_index.lookback("years", 1)
+    window = nav[max(pos, 0):]
+    window = window[window > 0]
+    if len(window) > 2:
+        metrics["volatility_1y"] = float(np.diff(np.log(window)).std(ddof=1) * math.sqrt(TRADING_DAYS) * 100)
+    else:
+        metrics["volatility_1y"] = None
+
+    row = {
+        "Symbol": symbol,
+        "AsOfDate": str(latest['AsOfDate']),
+        "NAV": _number(latest['NAV']),
+        "AdjustedNAV": _number(latest['AdjustedNAV']),
+        "AUM": _number(latest['AUM']),
+        "ShareClassAUM": _number(latest['ShareClassAUM']),
+        **metrics,
+    }
+    return tuple(row[column] for column in METRIC_COLUMNS)
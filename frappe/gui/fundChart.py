@@ -1,13 +1,11 @@
 import math
 import pandas as pd
 
-import datetime
-from dateutil.relativedelta import relativedelta
-
 import dearpygui.dearpygui as dpg
 
 from logger import CustomLogger
 from gui.frappeComponent import FrappeComponent
+from tradingCalendar import DateIndex
 
 
 logger = CustomLogger()
@@ -31,7 +29,7 @@ class FundChart(FrappeComponent):
         name = user_data['asset_name']
         asset_class = user_data['asset_class_symbol']
 
-        with dpg.window(label=name, width=1200, height=800, on_close=self.close_callback):
+        with dpg.window(label=name, width=1200, height=850, on_close=self.close_callback):
             # LOG: asset_id 출력
             logger.log_info(f"Click: {name} ({asset_id})")
 
@@ -48,12 +46,15 @@ class FundChart(FrappeComponent):
             # 펀드와 BM의 상관계수 구하기
             if asset_class == "ETC":
                 fund_bm_corr = "N/A"
+                corr_trend = None
                 # column명 접근을 위해
                 asset_class_li = ["KR_STOCK", "DM_STOCK"]
             else:
                 # 계산에 필요한 column 남기기
                 # corr_df = bm_fund_df[['AdjustedNAV', asset_class]].astype('float')
                 corr_df = bm_fund_df[['AdjustedNAV', asset_class]]
+                # 주 단위 상관계수 추이(전체 기간 한 번에)
+                corr_trend = self.controller.cal_spearman_corr_trend(corr_df, asset_class)['AdjustedNAV'].dropna()
                 # 상관계수 계산
                 corr_df = self.controller.cal_spearman_corr(corr_df)
                 fund_bm_corr = corr_df.iloc[0][1]
@@ -88,6 +89,7 @@ class FundChart(FrappeComponent):
 
             # index인 AsOfDate를 column으로 바꾸기
             trade_df = trade_df.reset_index()
+            trade_date_index = DateIndex(trade_df['AsOfDate'])
             # 가장 최근 데이터
             latest = trade_df.iloc[-1]
 
@@ -108,14 +110,14 @@ class FundChart(FrappeComponent):
             # 기간별 수익률
             with dpg.group(pos=[400, 50]):
                 # 주말은 포함 X 마지막에서 날짜 계산
-                dpg.add_text(f"올해 수익률: {self.cal_this_year_rate(trade_df):.2f}%")
+                dpg.add_text(f"올해 수익률: {self.cal_this_year_rate(trade_df, trade_date_index):.2f}%")
                 dpg.add_same_line(spacing=20)
-                dpg.add_text(f"1개월 수익률: {self.cal_yield(trade_df, 'months', 1)}")
+                dpg.add_text(f"1개월 수익률: {self.cal_yield(trade_df, 'months', 1, trade_date_index)}")
                 dpg.add_same_line(spacing=20)
-                dpg.add_text(f"3개월 수익률: {self.cal_yield(trade_df, 'months', 3)}")
-                dpg.add_text(f"1년 수익률: {self.cal_yield(trade_df, 'years', 1)}")
+                dpg.add_text(f"3개월 수익률: {self.cal_yield(trade_df, 'months', 3, trade_date_index)}")
+                dpg.add_text(f"1년 수익률: {self.cal_yield(trade_df, 'years', 1, trade_date_index)}")
                 dpg.add_same_line(spacing=20)
-                dpg.add_text(f"3년 수익률: {self.cal_yield(trade_df, 'years', 3)}")
+                dpg.add_text(f"3년 수익률: {self.cal_yield(trade_df, 'years', 3, trade_date_index)}")
                 dpg.add_same_line(spacing=20)
                 dpg.add_text(f"상관 계수: {fund_bm_corr}")
 
@@ -130,6 +132,7 @@ class FundChart(FrappeComponent):
             # 기간 조절 버튼
             user_data = {
                 "bm_fund_df": bm_fund_df,
+                "date_index": DateIndex(bm_fund_df['AsOfDate']),
                 "date_label": date_label,
                 "xaxis": xaxis,
                 "yaxis": yaxis,
@@ -187,40 +190,56 @@ class FundChart(FrappeComponent):
                 company_df = self.controller.load_fund_company_info(self.controller.price_db_adaptor, latest['CompanyCode'])
                 dpg.add_text(f"운용사: {company_df['Name'][0]}")
 
+            # BM 상관계수 추이(2년 구간이 찰 때부터)
+            if corr_trend is not None and not corr_trend.empty:
+                self.draw_corr_trend(corr_trend)
+
+    # 상관계수 추이 그래프
+    def draw_corr_trend(self, corr_trend: pd.Series):
+        trend_xaxis = dpg.generate_uuid()
+        trend_yaxis = dpg.generate_uuid()
+        trend_x = list(range(len(corr_trend)))
+        trend_label = list(zip(corr_trend.index.strftime('%Y-%m-%d'), trend_x))
+
+        with dpg.plot(label="상관 계수 추이(주 단위)", width=700, height=150, pos=[400, 650]):
+            dpg.add_plot_axis(dpg.mvXAxis, label="x", id=trend_xaxis)
+            self.set_custom_x_axis_ticks(trend_xaxis, trend_label)
+            dpg.add_plot_axis(dpg.mvYAxis, label="corr", id=trend_yaxis)
+            min_correlation = self.controller.screening_rule["MIN_CORRELATION"]
+            dpg.set_axis_limits(trend_yaxis, min(corr_trend.min(), min_correlation) - 0.05, 1)
+            dpg.add_line_series(trend_x, corr_trend.values.astype('float').tolist(), label="CORR", parent=trend_yaxis)
+
     # 수익률 계산
-    def cal_yield(self, df: pd.DataFrame, unit: str, period: int):
-        # 가장 최근 데이터
-        latest = df.iloc[-1]
-
-        # TODO: 영업일이 아닐수 있음 -> 전으로 가는게 맞다 1. 데이터를 채워서 가져오거나, 전꺼 찾거나, 지금 방법은??
-        try:
-            if unit == "years":
-                target_date = latest['AsOfDate'] - relativedelta(years=period)
-                target_nav = df[df['AsOfDate'] <= target_date].iloc[-1]
-            elif unit == "months":
-                target_date = latest['AsOfDate'] - relativedelta(months=period)
-                target_nav = df[df['AsOfDate'] <= target_date].iloc[-1]
-        except IndexError:
+    def cal_yield(self, df: pd.DataFrame, unit: str, period: int, date_index: DateIndex = None):
+        if date_index is None:
+            date_index = DateIndex(df['AsOfDate'])
+
+        # 영업일이 아니면 그 전 영업일 기준
+        pos = date_index.lookback(unit, period)
+        if pos < 0:
             # 해당 날짜 데이터가 없어서 수익률을 구할 수 없을 때
             return "N/A"
 
-        before = target_nav['AdjustedNAV']
-        latest = latest['AdjustedNAV']
+        nav = df['AdjustedNAV'].values
+        before = nav[pos]
+        latest = nav[-1]
         return f"{float((latest - before) / before * 100):.2f}%"
 
     # 올해 수익률 계산
-    def cal_this_year_rate(self, fund_df: pd.DataFrame) -> float:
-        now = datetime.datetime.now()
-        new_year = now.replace(month=1, day=1)
+    def cal_this_year_rate(self, fund_df: pd.DataFrame, date_index: DateIndex = None) -> float:
+        if date_index is None:
+            date_index = DateIndex(fund_df['AsOfDate'])
 
+        nav = fund_df['AdjustedNAV'].values
         # 현재 data
-        now = fund_df.iloc[-1]
-        now_nav = now['AdjustedNAV']
+        now_nav = nav[-1]
 
         # 작년 마지막날 data
         # TODO: 근데 1월 1일이 없으면 작년 12월걸로 들어감. 올해 첫 영업일 계산???
-        new_year = fund_df[fund_df['AsOfDate'] <= new_year].iloc[-1]
-        new_year_nav = new_year['AdjustedNAV']
+        pos = date_index.year_start()
+        if pos < 0:
+            return float('nan')
+        new_year_nav = nav[pos]
 
         return float((now_nav - new_year_nav) / new_year_nav) * 100
 
@@ -255,6 +274,7 @@ class FundChart(FrappeComponent):
     def period_button_callback(self, sender, app_data, user_data):
         # 해당 기간 만큼의 인덱스 찾기(최소)
         bm_fund_df = user_data["bm_fund_df"]
+        date_index = user_data["date_index"]
         unit = user_data["unit"]
         period = user_data["period"]
         date_label = user_data["date_label"]
@@ -263,21 +283,11 @@ class FundChart(FrappeComponent):
         asset_class_li = user_data["asset_class_li"]
         bm_line = user_data["bm_line"]
 
-        # 가장 최근 데이터
-        latest = bm_fund_df.iloc[-1]
-
-        # TODO: 흠..
-        if unit == "years":
-            min_date = latest['AsOfDate'] - relativedelta(years=period)
-        elif unit == "months":
-            min_date = latest['AsOfDate'] - relativedelta(months=period)
-
-        # 기간넘치면 가장 과거 데이터로 가져오기
-        if min_date < bm_fund_df.iloc[0]['AsOfDate']:
-            min_date = bm_fund_df.iloc[0]['AsOfDate']
+        # 가장 최근 데이터에서 기간만큼 전 날짜부터(기간넘치면 가장 과거 데이터부터)
+        min_date = date_index.offset_date(unit, period)
 
         # 해당 범위에 맞게 df 준비
-        range_bm_fund_df = bm_fund_df[bm_fund_df['AsOfDate'] >= min_date]
+        range_bm_fund_df = bm_fund_df.iloc[date_index.on_or_after(min_date):]
 
         # 날짜에 맞는 펀드 x,y 데이터
         period_x = range_bm_fund_df.index.values.astype('int').tolist()
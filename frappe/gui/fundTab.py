@@ -1,6 +1,7 @@
 import sqlite3
 
 import dearpygui.dearpygui as dpg
+import pandas as pd
 
 from frappeController import FrappeController
 from gui.frappeComponent import FrappeComponent
@@ -11,6 +12,16 @@ from logger import CustomLogger
 # 로그 실행
 logger = CustomLogger()
 
+# 표에 같이 보여줄 성과 지표(fund_metrics) column -> 표시 이름
+METRIC_DISPLAY_COLUMNS = {
+    "return_1m": "1개월(%)",
+    "return_3m": "3개월(%)",
+    "return_ytd": "올해(%)",
+    "return_1y": "1년(%)",
+    "return_3y": "3년(%)",
+    "volatility_1y": "변동성(%)",
+}
+
 
 class FundTab(FrappeComponent):
     def draw_tab_window(self, target_date: str, main_tab_id: int):
@@ -27,6 +38,7 @@ class FundTab(FrappeComponent):
                 total_fund_df = total_fund_df[
                     ['asset_id', 'asset_name', 'risk_type_name', 'asset_class_name', 'asset_class_symbol',
                      'investment_area_name', 'fund_bm_name']]
+                total_fund_df = self.with_metrics(total_fund_df, target_date)
 
                 # 시각화
                 with dpg.group():
@@ -48,6 +60,7 @@ class FundTab(FrappeComponent):
         selected_fund_df = self.controller.fund_df["selected_fund_df"][
             ['asset_id', 'asset_name', 'risk_type_name', 'asset_class_name', 'asset_class_symbol',
              'investment_area_name', 'fund_bm_name']]
+        selected_fund_df = self.with_metrics(selected_fund_df, target_date)
 
         # 시각화
         with dpg.tab(label="After Screening", parent=parent) as screen:
@@ -156,4 +169,13 @@ class FundTab(FrappeComponent):
                 #                user_data={"parent": parent, "date": date})
 
             allocation_tree = FundTree(self.controller)
-            allocation_tree.draw_portfolio_tree(new_weight_by_risk, new_portfolio_by_risk, target_date)
\ No newline at end of file
+            allocation_tree.draw_portfolio_tree(new_weight_by_risk, new_portfolio_by_risk, target_date)
+
+    # 펀드 표에 로컬 db의 성과 지표 붙이기(지표가 없으면 N/A)
+    def with_metrics(self, fund_df: pd.DataFrame, target_date: str) -> pd.DataFrame:
+        metrics_df = self.controller.load_fund_metrics(tuple(fund_df['asset_id']), target_date)
+        metrics_df = metrics_df.set_index('Symbol')[list(METRIC_DISPLAY_COLUMNS)]
+        metrics_df = metrics_df.applymap(lambda value: "N/A" if pd.isna(value) else f"{value:.2f}")
+        fund_df = fund_df.join(metrics_df, on='asset_id')
+        fund_df[list(METRIC_DISPLAY_COLUMNS)] = fund_df[list(METRIC_DISPLAY_COLUMNS)].fillna("N/A")
+        return fund_df.rename(columns=METRIC_DISPLAY_COLUMNS)
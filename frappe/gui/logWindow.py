@@ -0,0 +1,94 @@
+import threading
+from collections import deque
+
+import dearpygui.dearpygui as dpg
+
+from logger import LOG_FILE, LOG_LEVELS, NullSink
+
+
+# dearpygui 로그 창. emit은 ring buffer에 쌓기만 하고 화면 출력은 flush()에서 프레임마다 한 번에
+class DpgLogSink(NullSink):
+    def __init__(self):
+        self._auto_scroll = True
+        self.filter_id = None
+        self.window_id = dpg.add_window(label="roboLogger", pos=(500, 300), width=800, height=500)
+
+        # 화면에 남겨둘 최대 줄 수(넘으면 오래된 줄부터 하나씩 지움)
+        self.flush_count = 1000
+        # 한 프레임에 화면에 새로 그릴 최대 줄 수
+        self.frame_limit = 200
+
+        self._pending = deque(maxlen=self.flush_count)
+        self._pending_lock = threading.Lock()
+        self._items = deque()  # 화면에 떠있는 text item id
+        self._last = None  # 마지막 줄 [level, message, item_id, 반복 횟수]
+        self._dropped = 0  # 화면에 그려지기 전에 밀려난 줄 수(파일에는 남아있음)
+
+        with dpg.group(horizontal=True, parent=self.window_id):
+            dpg.add_checkbox(label="Auto-scroll", default_value=True,
+                             callback=lambda sender: self.auto_scroll(dpg.get_value(sender)))
+            dpg.add_button(label="Clear", callback=lambda: self.clear_log())
+
+        dpg.add_input_text(label="Filter", callback=lambda sender: dpg.set_value(self.filter_id, dpg.get_value(sender)),
+                           parent=self.window_id)
+        self.child_id = dpg.add_child(parent=self.window_id, autosize_x=True, autosize_y=True)
+        self.filter_id = dpg.add_filter_set(parent=self.child_id)
+
+    def auto_scroll(self, value):
+        self._auto_scroll = value
+
+    def emit(self, now, level, message):
+        with self._pending_lock:
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append((now, level, message))
+
+    # 쌓인 로그를 한 번에 화면에 출력
+    def flush(self):
+        if not self._pending:
+            return
+
+        with self._pending_lock:
+            records = list(self._pending)[:self.frame_limit]
+            for _ in range(len(records)):
+                self._pending.popleft()
+            dropped, self._dropped = self._dropped, 0
+
+        # 화면에 못 그리고 밀려난 줄은 파일에서 확인
+        if dropped:
+            text = f"... {dropped}줄 생략 ({LOG_FILE} 참고)"
+            self._items.append(dpg.add_text(text, parent=self.filter_id, filter_key=text, color=LOG_LEVELS[1][1]))
+            self._last = None
+
+        for now, level, message in records:
+            # 바로 앞 줄과 같은 메시지면 새 줄을 만들지 않고 횟수만 올린다
+            if self._last is not None and self._last[0] == level and self._last[1] == message:
+                self._last[3] += 1
+                text = self._format(now, level, message, self._last[3])
+                dpg.set_value(self._last[2], text)
+                dpg.configure_item(self._last[2], filter_key=text)
+                continue
+
+            text = self._format(now, level, message)
+            new_log = dpg.add_text(text, parent=self.filter_id, filter_key=text, color=LOG_LEVELS[level][1])
+            self._items.append(new_log)
+            self._last = [level, message, new_log, 1]
+
+        # 화면에 남길 줄 수를 넘으면 오래된 줄만 지우기
+        while len(self._items) > self.flush_count:
+            dpg.delete_item(self._items.popleft())
+
+        if self._auto_scroll:
+            dpg.set_y_scroll(self.child_id, -1.0)
+
+    @staticmethod
+    def _format(now, level, message, repeat=1):
+        text = f'{now.strftime("%H:%M:%S.%f")} [{LOG_LEVELS[level][0]}]\t\t{message}'
+        if repeat > 1:
+            text += f" (x{repeat})"
+        return text
+
+    def clear_log(self):
+        dpg.delete_item(self.filter_id, children_only=True)
+        self._items.clear()
+        self._last = None
@@ -0,0 +1,67 @@
+import dearpygui.dearpygui as dpg
+
+from gui.frappeComponent import FrappeComponent
+from profiler import Profiler
+
+profiler = Profiler()
+
+
+class ProfilePanel(FrappeComponent):
+    # 최근 N번 실행의 단계별 계측 결과 창
+    def draw_window(self, n: int = 5):
+        reports = profiler.last_reports(n)
+
+        with dpg.window(label="Profile", width=1000, height=600, on_close=self.close_callback):
+            with dpg.group(horizontal=True):
+                dpg.add_button(label="Save JSON", callback=self.save_json_callback)
+                dpg.add_button(label="Prometheus", callback=self.prometheus_callback)
+
+            if not reports:
+                dpg.add_text("아직 실행 기록이 없습니다.")
+                return
+
+            # 최신 실행부터
+            for report in reversed(reports):
+                label = f"{report['started_at']} {report['name']} {report['meta']}  " \
+                        f"wall {report['wall_s']:.2f}s / cpu {report['cpu_s']:.2f}s"
+                with dpg.tree_node(label=label, default_open=report is reports[-1]):
+                    self.draw_summary(report)
+                    self.draw_stage_table(report)
+
+    def draw_summary(self, report: dict):
+        for source, stat in report["queries"].items():
+            dpg.add_text(f"{source} 쿼리: {stat['count']}회 / {stat['latency_s']:.3f}s / {stat['rows']} rows")
+        for cache, stat in report["cache"].items():
+            ratio = "N/A" if stat["hit_ratio"] is None else f"{stat['hit_ratio'] * 100:.1f}%"
+            dpg.add_text(f"{cache} 캐시: hit {stat['hit']} / miss {stat['miss']} ({ratio})")
+
+    def draw_stage_table(self, report: dict):
+        columns = ["단계", "wall(s)", "cpu(s)", "rows in", "rows out", "remote 쿼리", "remote(s)", "local 쿼리", "local(s)"]
+        with dpg.table(header_row=True, policy=dpg.mvTable_SizingFixedFit, row_background=True, resizable=True,
+                       borders_innerV=True, borders_outerV=True, borders_innerH=True, borders_outerH=True):
+            for column in columns:
+                dpg.add_table_column(label=column)
+
+            for stage in report["stages"]:
+                remote = stage["queries"].get("remote", {"count": 0, "latency_s": 0})
+                local = stage["queries"].get("local", {"count": 0, "latency_s": 0})
+                # 하위 단계는 들여쓰기
+                name = ("  " if stage["parent"] else "") + stage["name"]
+                cells = [name, f"{stage['wall_s']:.3f}", f"{stage['cpu_s']:.3f}", stage["rows_in"], stage["rows_out"],
+                         remote["count"], f"{remote['latency_s']:.3f}", local["count"], f"{local['latency_s']:.3f}"]
+                for cell in cells:
+                    dpg.add_text("" if cell is None else str(cell))
+                    dpg.add_table_next_column()
+
+    def save_json_callback(self, sender, app_data, user_data):
+        for report in profiler.last_reports():
+            profiler.save_report(report, "profile")
+
+    def prometheus_callback(self, sender, app_data, user_data):
+        with dpg.window(label="Prometheus", width=700, height=500, on_close=self.close_callback):
+            dpg.add_input_text(default_value=profiler.to_prometheus(), multiline=True, readonly=True,
+                               width=-1, height=-1)
+
+    # callback을 호출한 item을 삭제
+    def close_callback(self, sender):
+        dpg.delete_item(sender)
@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+
+from profiler import Profiler
+from queryLog import QueryLog
+from sqlite_table import create_tables
+
+# 단계별 계측
+profiler = Profiler()
+# 쿼리 단위 기록/slow query log
+query_log = QueryLog()
+
+
+# thread의 읽기 연결. thread가 끝나서 threading.local에서 빠지면 연결을 닫음
+class _ReaderHandle:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+# 로컬 sqlite db 연결 관리
+# 읽기는 thread마다 연결 하나씩 재사용(thread가 끝나면 닫음), 쓰기는 연결 하나를 lock으로 순서대로
+class LocalStore:
+    def __init__(self, db_file: str, mmap_size: int = 256 * 1024 * 1024, cache_size_kb: int = 64 * 1024,
+                 cached_statements: int = 256):
+        self.db_file = db_file
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._conns = []  # 만든 연결 전부(close 용)
+        self._conns_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._schema_ready = False
+
+    # close()는 다른 thread에서 부를 수 있어서 check_same_thread=False
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, cached_statements=self.cached_statements, check_same_thread=False)
+        # WAL: 쓰는 중에도 다른 thread에서 읽기 가능
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+
+        if not self._schema_ready:
+            create_tables(conn)
+            self._schema_ready = True
+
+        with self._conns_lock:
+            self._conns.append(conn)
+        return conn
+
+    # 현재 thread의 읽기 연결
+    # ThreadPoolExecutor처럼 잠깐 쓰고 끝나는 thread의 연결(mmap 포함)이 close()까지 쌓이지 않게
+    def reader(self) -> sqlite3.Connection:
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            handle = _ReaderHandle(self._connect())
+            weakref.finalize(handle, self._release, handle.conn)
+            self._local.handle = handle
+        return handle.conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._conns_lock:
+            if conn in self._conns:
+                self._conns.remove(conn)
+        conn.close()
+
+    # 쓰기 연결(한 번에 한 thread만)
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def read_df(self, query: str, params=None) -> pd.DataFrame:
+        start = time.perf_counter()
+        df = pd.read_sql(sql=query, con=self.reader(), params=params)
+        latency = time.perf_counter() - start
+        profiler.record_query('local', latency, len(df))
+        query_log.record('local', query, params, latency, len(df), int(df.memory_usage(deep=False).sum()),
+                         explain=lambda: self.explain(query, params))
+        return df
+
+    def execute(self, query: str, params=()) -> list:
+        start = time.perf_counter()
+        rows = self.reader().execute(query, params).fetchall()
+        latency = time.perf_counter() - start
+        profiler.record_query('local', latency, len(rows))
+        query_log.record('local', query, params, latency, len(rows), explain=lambda: self.explain(query, params))
+        return rows
+
+    # 실행계획 조회
+    def explain(self, query: str, params=None) -> list:
+        return self.reader().execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+
+    # 같은 쿼리를 여러 row에 대해 한 번에
+    def execute_many(self, query: str, rows: list) -> int:
+        start = time.perf_counter()
+        with self.writer() as conn:
+            rowcount = conn.executemany(query, rows).rowcount
+        latency = time.perf_counter() - start
+        profiler.record_query('local', latency, rowcount)
+        query_log.record('local', query, {"rows": len(rows)}, latency, rowcount)
+        return rowcount
+
+    def write_df(self, df: pd.DataFrame, table: str):
+        start = time.perf_counter()
+        with self.writer() as conn:
+            df.to_sql(table, conn, if_exists='append', index=False)
+        profiler.record_query('local', time.perf_counter() - start, len(df))
+
+    # 동기화 watermark(없으면 None)
+    def get_watermark(self, name: str):
+        rows = self.execute("SELECT value FROM sync_watermark WHERE name = :name", {"name": name})
+        return rows[0][0] if rows else None
+
+    def set_watermark(self, name: str, value: str):
+        with self.writer() as conn:
+            conn.execute("""
+                INSERT INTO sync_watermark (name, value, updated_at) VALUES (:name, :value, CURRENT_TIMESTAMP)
+                    ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, {"name": name, "value": value})
+
+    # watermark를 마지막으로 바꾼 뒤 지난 시간(초). 없으면 None
+    def watermark_age(self, name: str):
+        rows = self.execute("""
+            SELECT (julianday('now') - julianday(updated_at)) * 86400 FROM sync_watermark WHERE name = :name
+        """, {"name": name})
+        return rows[0][0] if rows else None
+
+    # table 데이터가 바뀌었는지 비교하는 값(마지막 rowid, INSERT/REPLACE마다 커짐)
+    def table_version(self, table: str):
+        return self.execute(f"SELECT MAX(rowid) FROM {table}")[0][0]
+
+    def close(self):
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+        self._local = threading.local()
+        self._writer = None
@@ -1,6 +1,9 @@
+import atexit
 import datetime
-
-import dearpygui.dearpygui as dpg
+import logging
+import logging.handlers
+import os
+import queue
 
 
 def singleton(cls):
@@ -14,86 +17,112 @@ def singleton(cls):
     return getInstance
 
 
-@singleton
-class CustomLogger:
-    def __init__(self):
+# 로그 레벨별 (이름, 글자색)
+LOG_LEVELS = (
+    ("TRACE", (0, 255, 0, 255)),
+    ("DEBUG", (64, 128, 255, 255)),
+    ("INFO", (255, 255, 255, 255)),
+    ("WARNING", (255, 255, 0, 255)),
+    ("ERROR", (255, 0, 0, 255)),
+    ("CRITICAL", (255, 0, 0, 255)),
+)
+
+# CustomLogger 레벨 -> stdlib logging 레벨
+STDLIB_LEVELS = (5, logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+
+# 파일 로그 설정
+LOG_FILE = os.path.join('log', 'frappe.log')
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+
+
+# ---sink: 로그 한 줄(now, level, message)을 받아서 어딘가에 출력
+class NullSink:
+    def emit(self, now, level, message):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
 
-        self.log_level = 0
-        self._auto_scroll = True
-        self.filter_id = None
-        self.window_id = dpg.add_window(label="roboLogger", pos=(500, 300), width=800, height=500)
-        self.count = 0
-        self.flush_count = 1000
 
-        with dpg.group(horizontal=True, parent=self.window_id):
-            dpg.add_checkbox(label="Auto-scroll", default_value=True,
-                             callback=lambda sender: self.auto_scroll(dpg.get_value(sender)))
-            dpg.add_button(label="Clear", callback=lambda: dpg.delete_item(self.filter_id, children_only=True))
+# 파이썬 logging으로 넘기기(headless 실행용)
+class StdlibSink(NullSink):
+    def __init__(self, name='frappe'):
+        self.logger = logging.getLogger(name)
 
-        dpg.add_input_text(label="Filter", callback=lambda sender: dpg.set_value(self.filter_id, dpg.get_value(sender)),
-                           parent=self.window_id)
-        self.child_id = dpg.add_child(parent=self.window_id, autosize_x=True, autosize_y=True)
-        self.filter_id = dpg.add_filter_set(parent=self.child_id)
+    def emit(self, now, level, message):
+        self.logger.log(STDLIB_LEVELS[level], message)
 
-        with dpg.theme() as self.trace_theme:
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (0, 255, 0, 255))
 
-        with dpg.theme() as self.debug_theme:
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (64, 128, 255, 255))
+# 회전 파일 로그. 파일 쓰기는 background thread에서
+class FileSink(NullSink):
+    def __init__(self, log_file=LOG_FILE, max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUP_COUNT):
+        self.log_file = log_file
+        log_dir = os.path.dirname(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
 
-        with dpg.theme() as self.info_theme:
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (255, 255, 255, 255))
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                       backupCount=backup_count, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(message)s"))
 
-        with dpg.theme() as self.warning_theme:
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (255, 255, 0, 255))
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
 
-        with dpg.theme() as self.error_theme:
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (255, 0, 0, 255))
+    def emit(self, now, level, message):
+        line = f'{now.strftime("%Y-%m-%d %H:%M:%S.%f")} [{LOG_LEVELS[level][0]}] {message}'
+        self._queue.put_nowait(logging.makeLogRecord({"msg": line, "levelno": STDLIB_LEVELS[level]}))
 
-        with dpg.theme() as self.critical_theme:
-            dpg.add_theme_color(dpg.mvThemeCol_Text, (255, 0, 0, 255))
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
 
-    def auto_scroll(self, value):
-        self._auto_scroll = value
+
+@singleton
+class CustomLogger:
+    def __init__(self):
+
+        self.log_level = 0
+        # 기본은 stdlib logging. GUI는 FrappeApp에서 dpg sink를 붙인다
+        self.sinks = [StdlibSink()]
+        atexit.register(self.close)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+            sink.close()
+
+    def set_sinks(self, sinks):
+        for sink in self.sinks:
+            if sink not in sinks:
+                sink.close()
+        self.sinks = list(sinks)
 
     def _log(self, message, level):
 
-        if level < self.log_level:
+        if level < self.log_level or not self.sinks:
             return
 
-        self.count += 1
-
-        if self.count > self.flush_count:
-            self.clear_log()
-
-        theme = self.info_theme
-
-        if level == 0:
-            message = "[TRACE]\t\t" + message
-            theme = self.trace_theme
-        elif level == 1:
-            message = "[DEBUG]\t\t" + message
-            theme = self.debug_theme
-        elif level == 2:
-            message = "[INFO]\t\t" + message
-        elif level == 3:
-            message = "[WARNING]\t\t" + message
-            theme = self.warning_theme
-        elif level == 4:
-            message = "[ERROR]\t\t" + message
-            theme = self.error_theme
-        elif level == 5:
-            message = "[CRITICAL]\t\t" + message
-            theme = self.critical_theme
-
         # 출력 시간
-        message = f'{datetime.datetime.now().strftime("%H:%M:%S.%f")} {message}'
+        now = datetime.datetime.now()
+        message = str(message)
+
+        for sink in self.sinks:
+            sink.emit(now, level, message)
 
-        new_log = dpg.add_text(message, parent=self.filter_id, filter_key=message)
-        dpg.set_item_theme(new_log, theme)
-        if self._auto_scroll:
-            scroll_max = dpg.get_y_scroll_max(self.child_id)
-            dpg.set_y_scroll(self.child_id, -1.0)
+    # 프레임마다 호출: 버퍼에 쌓아두는 sink들 출력
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
 
     def log(self, message):
         self._log(message, 0)
@@ -113,6 +142,6 @@ class CustomLogger:
     def log_critical(self, message):
         self._log( message, 5)
 
-    def clear_log(self):
-        dpg.delete_item(self.filter_id, children_only=True)
-        self.count = 0
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,121 @@
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+
+from frappeController import FrappeController
+from logger import CustomLogger
+from profiler import Profiler
+
+logger = CustomLogger()
+profiler = Profiler()
+
+# node마다 들고 있는 결과 수(날짜/위험 유형을 오가도 바로 나오게)
+MAX_ENTRIES = 8
+
+
+# RA 프로세스 단계 하나
+# inputs: 앞 단계 node 이름, "target_date"/"risk_type", "config:<section>", "table:<로컬 table>"
+class Node:
+    def __init__(self, name: str, func, inputs: tuple, label: str = None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.label = label or name
+        self.cache = OrderedDict()  # 입력 hash -> 결과
+
+
+# RA 프로세스를 입력을 선언한 단계들의 DAG로
+# 단계 결과는 입력 값(앞 단계는 그 단계의 입력 hash) hash로 캐시해서, 바뀐 입력의 아래 단계만 다시 계산
+# 위험 유형이나 WEIGHTING_RULE만 바꾸면 weighting 이후만 다시
+class PipelineDag:
+    def __init__(self, controller: FrappeController, max_entries: int = MAX_ENTRIES):
+        self.controller = controller
+        self.max_entries = max_entries
+        self.nodes = OrderedDict()  # 선언 순서 = 실행 순서
+        self.executed = []  # 마지막 run에서 다시 계산한 node
+
+        c = controller
+        self.add("total_fund_df", lambda target_date, **_: c.load_funds_info(c.customer_db_adaptor, target_date),
+                 ("target_date", "table:asset_info"), "전체 펀드 유니버스")
+        self.add("selected_fund_df", lambda total_fund_df, target_date, **_: c.screening(total_fund_df, target_date),
+                 ("total_fund_df", "target_date", "config:SCREENING_RULE", "table:Trading", "table:Operation"),
+                 "Screening")
+        self.add("preselected_fund_df",
+                 lambda selected_fund_df, target_date, **_: c.preselecting(selected_fund_df, target_date),
+                 ("selected_fund_df", "target_date", "config:SCREENING_RULE", "config:ASSET_CLASS_MAP",
+                  "table:Trading", "table:BM_price"), "Pre-Selection")
+        self.add("postselected_fund_df", lambda preselected_fund_df, **_: c.postselecting(preselected_fund_df),
+                 ("preselected_fund_df", "config:SELECTION_RULE"), "Post-Selection")
+        self.add("weight_by_risk", lambda target_date, risk_type, **_: c.weighting(target_date, risk_type),
+                 ("target_date", "risk_type", "config:WEIGHTING_RULE", "table:macro_score"), "Weighting")
+        self.add("portfolio_by_risk",
+                 lambda postselected_fund_df, weight_by_risk, **_: c.select_portfolio(postselected_fund_df,
+                                                                                      weight_by_risk),
+                 ("postselected_fund_df", "weight_by_risk", "config:SELECTION_RULE"), "Allocation")
+        # correcting은 넘긴 dict를 고쳐 쓰므로 캐시된 weighting 결과 대신 복사본을
+        self.add("correction",
+                 lambda postselected_fund_df, weight_by_risk, **_: c.correcting(postselected_fund_df,
+                                                                                copy.deepcopy(weight_by_risk)),
+                 ("postselected_fund_df", "weight_by_risk", "config:SELECTION_RULE"), "Correction")
+
+    def add(self, name: str, func, inputs: tuple, label: str = None):
+        unknown = [key for key in inputs if ":" not in key and key not in self.nodes
+                   and key not in ("target_date", "risk_type")]
+        if unknown:
+            raise ValueError(f"{name} 단계의 입력 {unknown}이 앞 단계에 없습니다")
+        self.nodes[name] = Node(name, func, inputs, label)
+
+    # 외부 입력 값(앞 단계 node는 keys에서)
+    def input_value(self, key: str, params: dict, keys: dict):
+        if key in keys:
+            return keys[key]
+        if key.startswith("config:"):
+            return self.controller.config.get(key[len("config:"):])
+        if key.startswith("table:"):
+            return self.controller.local_store.table_version(key[len("table:"):])
+        return params[key]
+
+    def input_hash(self, node: Node, params: dict, keys: dict) -> str:
+        values = [(key, self.input_value(key, params, keys)) for key in node.inputs]
+        return hashlib.sha256(json.dumps([node.name, values], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    # 전체 단계 실행(캐시된 단계는 건너뜀). on_node(node, 순서, 전체 수, 캐시 여부)는 단계가 끝날 때마다
+    def run(self, target_date: str, user_risk_type: dict = None, on_node=None) -> dict:
+        if user_risk_type is None:
+            user_risk_type = self.controller.config["RISK_TYPE"]
+        params = {"target_date": target_date, "risk_type": user_risk_type}
+
+        keys, outputs = {}, {}
+        self.executed = []
+        for i, node in enumerate(self.nodes.values()):
+            key = self.input_hash(node, params, keys)
+            hit = key in node.cache
+            profiler.record_cache('pipeline_node', hit)
+            if hit:
+                node.cache.move_to_end(key)
+                output = node.cache[key]
+            else:
+                output = node.func(**params, **{name: outputs[name] for name in node.inputs if name in outputs})
+                self.executed.append(node.name)
+                # 단계 안에서 로컬 데이터를 동기화했으면(처음 보는 snapshot 등) 바뀐 입력으로 저장
+                key = self.input_hash(node, params, keys)
+                node.cache[key] = output
+                if len(node.cache) > self.max_entries:
+                    node.cache.popitem(last=False)
+            keys[node.name], outputs[node.name] = key, output
+            if on_node is not None:
+                on_node(node, i, len(self.nodes), hit)
+
+        logger.log(f"다시 계산한 단계: {', '.join(self.executed) or '없음'}")
+
+        fund_df = self.controller.fund_df
+        for name in ("total_fund_df", "selected_fund_df", "preselected_fund_df", "postselected_fund_df",
+                     "weight_by_risk", "portfolio_by_risk"):
+            fund_df[name] = outputs[name]
+        fund_df["new_weight_by_risk"], fund_df["new_portfolio_by_risk"] = outputs["correction"]
+        return fund_df
+
+    def clear(self):
+        for node in self.nodes.values():
+            node.cache.clear()
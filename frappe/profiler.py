@@ -0,0 +1,239 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from logger import singleton
+
+
+# 단계 하나의 측정 결과
+class StageRecord:
+    def __init__(self, name: str, parent: str = None, rows_in: int = None):
+        self.name = name
+        self.parent = parent
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        # source(remote/local)별 [쿼리 수, 총 latency(초), 가져온 row 수]
+        self.queries = {}
+
+    def add_query(self, source: str, latency: float, rows: int):
+        stat = self.queries.setdefault(source, [0, 0.0, 0])
+        stat[0] += 1
+        stat[1] += latency
+        stat[2] += rows or 0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "queries": {source: {"count": count, "latency_s": round(latency, 6), "rows": rows}
+                        for source, (count, latency, rows) in self.queries.items()},
+        }
+
+
+# 파이프라인 한 번 실행의 측정 결과
+class RunProfile:
+    def __init__(self, name: str, meta: dict = None):
+        self.name = name
+        self.meta = meta or {}
+        self.started_at = datetime.datetime.now()
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.stages = []
+        self.total = StageRecord(name)
+        self.cache = {}  # cache 이름별 [hit, miss]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "meta": self.meta,
+            "started_at": self.started_at.isoformat(timespec='seconds'),
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "queries": self.total.to_dict()["queries"],
+            "cache": {name: {"hit": hit, "miss": miss, "hit_ratio": round(hit / (hit + miss), 4) if hit + miss else None}
+                      for name, (hit, miss) in self.cache.items()},
+            "stages": [stage.to_dict() for stage in self.stages],
+        }
+
+
+# 파이프라인 계측: 단계별 시간, row 수, 쿼리 수/latency, 캐시 적중률
+@singleton
+class Profiler:
+    def __init__(self):
+        self.history = deque(maxlen=20)  # 최근 실행 결과
+        self.current = None
+        self.report_dir = None  # 지정하면 실행이 끝날 때마다 json 저장
+        self._lock = threading.Lock()
+        self._local = threading.local()  # thread별 진행중인 stage stack
+        self._run_started = None
+
+        # 프로세스 전체 누적값(prometheus용)
+        self.query_totals = {}  # source -> [count, latency, rows]
+        self.cache_totals = {}  # cache -> [hit, miss]
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    # ---실행 단위
+    def start_run(self, name: str, **meta) -> RunProfile:
+        with self._lock:
+            self.current = RunProfile(name, meta)
+            self._run_started = (time.perf_counter(), time.process_time())
+        return self.current
+
+    def end_run(self) -> dict:
+        with self._lock:
+            run = self.current
+            if run is None:
+                return None
+            run.wall_s = time.perf_counter() - self._run_started[0]
+            run.cpu_s = time.process_time() - self._run_started[1]
+            self.history.append(run)
+            self.current = None
+
+        report = run.to_dict()
+        if self.report_dir:
+            self.save_report(report, self.report_dir)
+        return report
+
+    @contextmanager
+    def run(self, name: str, **meta):
+        self.start_run(name, **meta)
+        try:
+            yield self.current
+        finally:
+            self.end_run()
+
+    # ---단계
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        stack = self._stack()
+        record = StageRecord(name, stack[-1].name if stack else None, rows_in)
+        run = self.current
+        if run is not None:
+            with self._lock:
+                run.stages.append(record)
+
+        stack.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall
+            record.cpu_s = time.process_time() - cpu
+            stack.pop()
+
+    # ---쿼리/캐시 기록
+    def record_query(self, source: str, latency: float, rows: int = None):
+        stack = self._stack()
+        with self._lock:
+            stat = self.query_totals.setdefault(source, [0, 0.0, 0])
+            stat[0] += 1
+            stat[1] += latency
+            stat[2] += rows or 0
+            if self.current is not None:
+                self.current.total.add_query(source, latency, rows)
+                if stack:
+                    stack[-1].add_query(source, latency, rows)
+
+    def record_cache(self, cache: str, hit: bool):
+        with self._lock:
+            for counter in (self.cache_totals, self.current.cache if self.current is not None else {}):
+                stat = counter.setdefault(cache, [0, 0])
+                stat[0 if hit else 1] += 1
+
+    # ---출력
+    def last_reports(self, n: int = None) -> list:
+        runs = list(self.history)
+        if n is not None:
+            runs = runs[-n:]
+        return [run.to_dict() for run in runs]
+
+    def to_json(self, n: int = None) -> str:
+        return json.dumps(self.last_reports(n), ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def save_report(report: dict, report_dir: str) -> str:
+        os.makedirs(report_dir, exist_ok=True)
+        started = report["started_at"].replace(':', '').replace('-', '')
+        path = os.path.join(report_dir, f"{report['name']}_{started}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+    # Prometheus text format: 누적 카운터 + 마지막 실행의 단계별 값
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            query_totals = {source: list(stat) for source, stat in self.query_totals.items()}
+            cache_totals = {cache: list(stat) for cache, stat in self.cache_totals.items()}
+            last = self.history[-1] if self.history else None
+
+        lines.append("# TYPE frappe_queries_total counter")
+        for source, (count, _, _) in query_totals.items():
+            lines.append(f'frappe_queries_total{{source="{source}"}} {count}')
+        lines.append("# TYPE frappe_query_seconds_total counter")
+        for source, (_, latency, _) in query_totals.items():
+            lines.append(f'frappe_query_seconds_total{{source="{source}"}} {latency:.6f}')
+        lines.append("# TYPE frappe_query_rows_total counter")
+        for source, (_, _, rows) in query_totals.items():
+            lines.append(f'frappe_query_rows_total{{source="{source}"}} {rows}')
+        lines.append("# TYPE frappe_cache_requests_total counter")
+        for cache, (hit, miss) in cache_totals.items():
+            lines.append(f'frappe_cache_requests_total{{cache="{cache}",result="hit"}} {hit}')
+            lines.append(f'frappe_cache_requests_total{{cache="{cache}",result="miss"}} {miss}')
+
+        if last is not None:
+            lines.append("# TYPE frappe_run_wall_seconds gauge")
+            lines.append(f'frappe_run_wall_seconds{{run="{last.name}"}} {last.wall_s:.6f}')
+            # 같은 이름의 단계가 여러 번 불렸으면 합쳐서
+            for metric, attr in (("wall_seconds", "wall_s"), ("cpu_seconds", "cpu_s"),
+                                 ("rows_in", "rows_in"), ("rows_out", "rows_out")):
+                values = {}
+                for stage in last.stages:
+                    value = getattr(stage, attr)
+                    if value is not None:
+                        values[stage.name] = values.get(stage.name, 0) + value
+                lines.append(f"# TYPE frappe_stage_{metric} gauge")
+                for stage_name, value in values.items():
+                    lines.append(f'frappe_stage_{metric}{{run="{last.name}",stage="{stage_name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+def _row_count(value):
+    # DataFrame이면 행 수, dict(위험유형별 결과)면 key 수
+    if hasattr(value, 'shape'):
+        return int(value.shape[0])
+    if isinstance(value, (dict, list, tuple)):
+        return len(value)
+    return None
+
+
+# 메소드 단계 계측 decorator. 첫 인자(self 다음)가 DataFrame이면 rows_in으로 기록
+def profile_stage(name: str = None):
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            rows_in = _row_count(args[0]) if args else None
+            with Profiler().stage(stage_name, rows_in) as record:
+                result = func(self, *args, **kwargs)
+                record.rows_out = _row_count(result[0] if isinstance(result, tuple) else result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,96 @@
+import datetime
+import json
+import os
+import re
+import threading
+
+from frappeConfig import get_config
+from logger import CustomLogger, singleton
+
+logger = CustomLogger()
+
+# config의 SLOW_QUERY가 없을 때 기본값
+DEFAULT_SLOW_QUERY = {
+    "THRESHOLD_S": 0.5,
+    "EXPLAIN": True,
+    "LOG_FILE": os.path.join('log', 'slow_query.jsonl'),
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+# 값만 다른 쿼리를 같은 쿼리로 묶기 위해 literal을 ?로 바꾸고 공백 정리
+def normalize_sql(sql) -> str:
+    sql = str(sql)
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+# 쿼리 단위 기록. threshold를 넘는 쿼리는 slow query log(json lines)에 EXPLAIN과 함께 저장
+@singleton
+class QueryLog:
+    def __init__(self):
+        # configure 전에 기록하면 그때 config.json의 SLOW_QUERY로(import할 때 config를 읽지 않게)
+        self.configured = False
+        self.threshold_s = DEFAULT_SLOW_QUERY["THRESHOLD_S"]
+        self.explain = DEFAULT_SLOW_QUERY["EXPLAIN"]
+        self.log_file = DEFAULT_SLOW_QUERY["LOG_FILE"]
+        self.trace = False  # True면 모든 쿼리를 debug 로그로
+        self.slow_count = 0
+        self._lock = threading.Lock()
+
+    # SLOW_QUERY 설정(FrappeController가 자기 config로)
+    def configure(self, slow_query: dict):
+        setting = {**DEFAULT_SLOW_QUERY, **slow_query}
+        self.threshold_s = setting["THRESHOLD_S"]
+        self.explain = setting["EXPLAIN"]
+        self.log_file = setting["LOG_FILE"]
+        self.configured = True
+
+    def record(self, source: str, sql, params, latency: float, rows: int, nbytes: int = None, explain=None,
+               trace: bool = False):
+        """
+        :param source: 'remote' / 'local'
+        :param explain: slow query일 때 실행계획을 가져올 함수(인자 없음). 없으면 생략
+        :param trace: True면 self.trace와 상관없이 debug 로그로
+        """
+        if not self.configured:
+            self.configure(get_config().get("SLOW_QUERY", {}))
+        slow = self.threshold_s is not None and latency >= self.threshold_s
+        if not (slow or trace or self.trace):
+            return
+
+        normalized = normalize_sql(sql)
+        if trace or self.trace:
+            logger.log_debug(f"[{source}] {latency * 1000:.1f}ms rows={rows} bytes={nbytes} {normalized}")
+        if not slow:
+            return
+
+        entry = {
+            "time": datetime.datetime.now().isoformat(timespec='milliseconds'),
+            "source": source,
+            "sql": normalized,
+            "params": params or None,
+            "latency_s": round(latency, 6),
+            "rows": rows,
+            "bytes": nbytes,
+        }
+        if self.explain and explain is not None and normalized.upper().startswith(("SELECT", "WITH")):
+            try:
+                entry["explain"] = [[str(value) for value in row] for row in explain()]
+            except Exception as e:
+                entry["explain_error"] = str(e)
+
+        logger.log_warning(f"slow query [{source}] {latency:.3f}s rows={rows}: {normalized[:200]}")
+        with self._lock:
+            self.slow_count += 1
+            log_dir = os.path.dirname(self.log_file)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# cal_spearman_corr 구간: 기준일에서 104주 전 ~ 4주 전(양 끝 포함, 주 단위 101개)
+CORR_WINDOW_WEEKS = 104
+CORR_LAG_WEEKS = 4
+CORR_WINDOW = CORR_WINDOW_WEEKS - CORR_LAG_WEEKS + 1
+
+
+# 최근 날짜의 요일 기준 주 단위 데이터로 전환(cal_spearman_corr와 같은 방식)
+def weekly_frame(bm_fund_df: pd.DataFrame) -> pd.DataFrame:
+    day_name = bm_fund_df.index[-1].strftime("%a")
+    return bm_fund_df.resample(f'W-{day_name}').ffill()
+
+
+# column별 window 안의 순위(동점은 평균 순위)를 들고 있다가 한 주가 들어오고 나갈 때 바뀐 만큼만 고침
+# 매번 window 전체를 다시 정렬하지 않고, 값 하나가 들어오고 나갈 때 O(window) 비교로 순위 갱신
+class RollingSpearman:
+    def __init__(self, columns: int, window: int = CORR_WINDOW):
+        self.window = window
+        self.values = np.full((window, columns), np.nan)  # ring buffer(빈 칸은 nan)
+        self.ranks = np.zeros((window, columns))
+        self.size = 0
+        self.head = 0  # 다음에 쓸 위치(가득 차면 가장 오래된 값 위치)
+
+    # 가장 오래된 값 빼기: 그보다 큰 값은 순위 -1, 같은 값은 -0.5
+    def _remove(self, pos: int):
+        old = self.values[pos].copy()
+        self.values[pos] = np.nan
+        self.ranks[pos] = 0
+        self.ranks -= (self.values > old) + 0.5 * (self.values == old)
+
+    # 새 값 넣기: 그보다 큰 값은 순위 +1, 같은 값은 +0.5, 새 값은 (작은 값 수) + (같은 값 수 + 2) / 2
+    def _insert(self, pos: int, row: np.ndarray):
+        greater = self.values > row
+        equal = self.values == row
+        self.ranks += greater + 0.5 * equal
+        self.ranks[pos] = (self.values < row).sum(axis=0) + (equal.sum(axis=0) + 2) / 2
+        self.values[pos] = row
+
+    def push(self, row):
+        row = np.asarray(row, dtype=float)
+        if self.size == self.window:
+            self._remove(self.head)
+        else:
+            self.size += 1
+        self._insert(self.head, row)
+        self.head = (self.head + 1) % self.window
+
+    # 현재 window에서 ref column과 각 column의 스피어만 상관계수(window 안에 nan이 있는 column은 nan)
+    def corr(self, ref: int = 0) -> np.ndarray:
+        values = self.values[:self.size]
+        deviation = self.ranks[:self.size] - (self.size + 1) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = (deviation * deviation[:, [ref]]).sum(axis=0) / np.sqrt(
+                (deviation ** 2).sum(axis=0) * (deviation[:, ref] ** 2).sum())
+        complete = ~np.isnan(values).any(axis=0)
+        if not complete[ref]:
+            return np.full(len(result), np.nan)
+        result[~complete] = np.nan
+        return result
+
+
+# 주 단위 frame 전체를 한 번 훑어서 날짜별 ref column과의 상관계수 추이 구하기
+# 날짜 t의 값은 t - lag 주에서 끝나는 window(cal_spearman_corr를 t에서 부른 것과 같은 구간)
+def rolling_spearman(weekly_df: pd.DataFrame, ref_column: str, window: int = CORR_WINDOW,
+                     lag: int = CORR_LAG_WEEKS, min_periods: int = None) -> pd.DataFrame:
+    min_periods = window if min_periods is None else min_periods
+    engine = RollingSpearman(len(weekly_df.columns), window)
+    ref = weekly_df.columns.get_loc(ref_column)
+
+    values = weekly_df.to_numpy(dtype=float)
+    result = np.full(values.shape, np.nan)
+    for i, row in enumerate(values):
+        engine.push(row)
+        if engine.size >= min_periods:
+            result[i] = engine.corr(ref)
+
+    return pd.DataFrame(result, index=weekly_df.index, columns=weekly_df.columns).shift(lag)
@@ -0,0 +1,225 @@
+import argparse
+import copy
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+from frappeController import DEFAULT_SCREENING_RULE, DEFAULT_SELECTION_RULE, FrappeController
+from logger import CustomLogger
+from profiler import Profiler
+
+logger = CustomLogger()
+profiler = Profiler()
+
+# sweep할 수 있는 기준값(SCREENING_RULE + SELECTION_RULE)
+RULE_KEYS = tuple(DEFAULT_SCREENING_RULE) + tuple(DEFAULT_SELECTION_RULE)
+
+
+# 기준값 grid({기준값: [값, ...]})의 모든 조합. grid에 없는 기준값은 base 값
+def expand_grid(grid: dict, base: dict) -> list:
+    unknown = set(grid) - set(RULE_KEYS)
+    if unknown:
+        raise ValueError(f"알 수 없는 기준값: {sorted(unknown)}")
+    keys = list(grid)
+    return [base | dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+# 같은 날짜에서 screen/pre-select/post-select/비중 기준값 조합별 RA 결과 비교
+# 기준값과 상관없는 데이터(명칭/클래스 screen, 펀드 가격, 기간 수익률, 출시일, ShareClassAUM, 비중)는 한 번만 구하고
+# 조합마다 mask로 유니버스만 다시 고름
+# 상관계수는 자산군 펀드들이 모두 있는 기간으로 잘라서 구하므로(concat_fund_bm_df) 자산군 유니버스가 같은 조합끼리 재사용
+class ScenarioSweep:
+    def __init__(self, controller: FrappeController, target_date: str, grid: dict, user_risk_type: dict = None,
+                 sync: bool = True):
+        self.controller = controller
+        self.target_date = target_date
+        self.user_risk_type = user_risk_type
+        self.sync = sync
+        self.base = controller.screening_rule | controller.selection_rule
+        self.scenarios = expand_grid(grid, self.base)
+
+        self.static_fund_df = None
+        self.period_returns = {}  # asset_id -> 기간 수익률
+        self.nav_dfs = {}  # asset_id -> 펀드 가격
+        self.class_corrs = {}  # (자산군, asset_id tuple) -> 상관계수 Series
+        self.portfolios = {}  # (post-select asset_id tuple, MAX_WEIGHT, MIN_WEIGHT) -> 포트폴리오 결과
+        self.weight_by_risk = None
+
+        self.results = []  # 조합별 결과(fund_df와 같은 key)
+        self.skipped = []  # (조합 번호, 에러)
+
+    # 기준값과 상관없는 데이터 한 번에
+    def prepare(self):
+        controller = self.controller
+        total_fund_df = controller.load_funds_info(controller.customer_db_adaptor, self.target_date)
+        if self.sync:
+            controller.dump_fund_trading_data(tuple(total_fund_df['asset_id']))
+            controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+
+        static_fund_df = controller.screen_fund_static(total_fund_df, self.target_date).reset_index(drop=True)
+        symbol_tuple = tuple(static_fund_df['asset_id'])
+        symbols = json.dumps(list(symbol_tuple))
+
+        # 출시일(운용 중인 펀드만, screen_fund_period와 같은 기준). 운용 중인 row가 여러 개면 가장 늦은 출시일
+        controller.dump_operation_data(controller.price_db_adaptor, symbol_tuple)
+        operation_df = controller.local_store.read_df("""
+            SELECT Symbol, MAX(InceptionDate) AS InceptionDate
+                FROM Operation
+                WHERE EndDate IS NULL AND Symbol IN (SELECT value FROM json_each(:symbols))
+                GROUP BY Symbol
+        """, {"symbols": symbols})
+        inception = static_fund_df['asset_id'].map(operation_df.set_index('Symbol')['InceptionDate'])
+
+        # target date 이전 마지막 거래일의 ShareClassAUM(screen_fund_shareAum과 같은 기준)
+        aum_df = controller.local_store.read_df("""
+            SELECT Symbol, MAX(ShareClassAUM) AS ShareClassAUM
+                FROM Trading
+                WHERE Symbol IN (SELECT value FROM json_each(:symbols))
+                AND AsOfDate = (SELECT MAX(AsOfDate) FROM Trading WHERE AsOfDate <= :target_date)
+                GROUP BY Symbol
+        """, {"symbols": symbols, "target_date": self.target_date})
+        aum = static_fund_df['asset_id'].map(aum_df.set_index('Symbol')['ShareClassAUM'])
+
+        self.static_fund_df = static_fund_df.assign(inception_date=inception.astype(object),
+                                                    share_class_aum=aum.astype(float))
+        self.period_returns = controller.get_period_returns(symbol_tuple, self.target_date)
+        self.weight_by_risk = controller.weighting(self.target_date, self.user_risk_type)
+
+    # 조합 하나의 screen 결과 mask(출시일/ShareClassAUM이 없는 펀드는 원래 쿼리처럼 제외하지 않음)
+    def screen_mask(self, rule: dict) -> np.ndarray:
+        least_date = self.controller.least_inception_date(self.target_date, rule).strftime("%Y-%m-%d")
+        inception = self.static_fund_df['inception_date']
+        too_young = inception.notna().to_numpy() & (inception.fillna("").to_numpy(dtype=str) > least_date)
+        low_aum = (self.static_fund_df['share_class_aum'] < rule["MIN_SHARE_CLASS_AUM"]).to_numpy()
+        return ~too_young & ~low_aum
+
+    def nav_df(self, asset_id: str) -> pd.DataFrame:
+        nav_df = self.nav_dfs.get(asset_id)
+        if nav_df is None:
+            nav_df = self.controller.get_fund_nav_df(asset_id, self.target_date)
+            self.nav_dfs[asset_id] = nav_df
+        return nav_df
+
+    def class_corr(self, asset_class: str, asset_ids: tuple) -> pd.Series:
+        key = (asset_class, asset_ids)
+        corr = self.class_corrs.get(key)
+        profiler.record_cache('sweep_corr', corr is not None)
+        if corr is None:
+            trade_df_list = [self.nav_df(asset_id) for asset_id in asset_ids]
+            corr = self.controller.get_class_corr(asset_class, trade_df_list, self.target_date)
+            self.class_corrs[key] = corr
+        return corr
+
+    # 조합 하나의 유니버스(preselecting과 같은 순서/column)
+    def preselect(self, selected_fund_df: pd.DataFrame, rule: dict) -> pd.DataFrame:
+        frames = []
+        for asset_class, group in selected_fund_df.groupby('asset_class_symbol'):
+            asset_ids = tuple(group['asset_id'])
+            corr = self.class_corr(asset_class, asset_ids)[list(asset_ids)].to_numpy()
+            keep = (corr >= rule["MIN_CORRELATION"]) | ("BOND" in asset_class)
+            frames.append(pd.DataFrame({
+                'asset_id': group['asset_id'].to_numpy()[keep],
+                'asset_name': group['asset_name'].to_numpy()[keep],
+                'asset_class_symbol': asset_class,
+                'correlation': corr[keep],
+                'period_return': [self.period_returns.get(asset_id) for asset_id in np.array(asset_ids)[keep]],
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['asset_id', 'asset_name', 'asset_class_symbol', 'correlation',
+                                         'period_return'])
+        return pd.concat(frames, ignore_index=True)
+
+    # post-select 결과와 MAX/MIN_WEIGHT가 같은 조합은 포트폴리오도 같음
+    def allocate(self, postselected_fund_df: pd.DataFrame, rule: dict) -> dict:
+        key = (tuple(postselected_fund_df['asset_id']), rule["MAX_WEIGHT"], rule["MIN_WEIGHT"])
+        result = self.portfolios.get(key)
+        if result is None:
+            controller = self.controller
+            portfolio_by_risk = controller.select_portfolio(postselected_fund_df, self.weight_by_risk, False,
+                                                            rule["MAX_WEIGHT"], rule["MIN_WEIGHT"])
+            new_weight_by_risk, new_portfolio_by_risk = controller.correcting(
+                postselected_fund_df, copy.deepcopy(self.weight_by_risk), rule["MAX_WEIGHT"], rule["MIN_WEIGHT"])
+            result = {"weight_by_risk": self.weight_by_risk, "portfolio_by_risk": portfolio_by_risk,
+                      "new_weight_by_risk": new_weight_by_risk, "new_portfolio_by_risk": new_portfolio_by_risk}
+            self.portfolios[key] = result
+        return result
+
+    def evaluate(self, rule: dict) -> dict:
+        selected_fund_df = self.static_fund_df[self.screen_mask(rule)]
+        preselected_fund_df = self.preselect(selected_fund_df, rule)
+        postselected_fund_df = self.controller.postselecting(preselected_fund_df, rule["TOP_N"])
+        return {"rule": rule,
+                "selected_fund_df": selected_fund_df.drop(columns=['inception_date', 'share_class_aum']),
+                "preselected_fund_df": preselected_fund_df,
+                "postselected_fund_df": postselected_fund_df,
+                **self.allocate(postselected_fund_df, rule)}
+
+    def run(self) -> pd.DataFrame:
+        with profiler.run("scenario_sweep", target_date=self.target_date):
+            if self.static_fund_df is None:
+                self.prepare()
+            logger.log(f"기준값 조합 {len(self.scenarios)}개 비교 시작")
+
+            self.results = []
+            for i, rule in enumerate(self.scenarios):
+                try:
+                    self.results.append(self.evaluate(rule))
+                except (IndexError, KeyError, ValueError, ZeroDivisionError) as e:
+                    logger.log_error(f"{i}번 조합 실패: {rule}, {e!r}")
+                    self.results.append(None)
+                    self.skipped.append((i, repr(e)))
+        return self.summary()
+
+    # 조합별 유니버스 크기와 base(config 기준값) 대비 유니버스 겹침, 위험 유형별 포트폴리오 변경 비중
+    def summary(self) -> pd.DataFrame:
+        base = self.evaluate(self.base)
+        base_universe = set(base["postselected_fund_df"]['asset_id'])
+        base_weights = self.portfolio_weights(base)
+
+        rows = []
+        for i, (rule, result) in enumerate(zip(self.scenarios, self.results)):
+            row = {"scenario": i, **rule}
+            if result is not None:
+                universe = set(result["postselected_fund_df"]['asset_id'])
+                row.update(selected=len(result["selected_fund_df"]), preselected=len(result["preselected_fund_df"]),
+                           postselected=len(universe),
+                           universe_overlap=len(universe & base_universe) / len(universe | base_universe)
+                           if universe | base_universe else 1.0)
+                for risk_type, weights in self.portfolio_weights(result).items():
+                    base_weight = base_weights.get(risk_type, {})
+                    row[f"turnover_{risk_type}"] = sum(abs(weights.get(asset_id, 0) - base_weight.get(asset_id, 0))
+                                                       for asset_id in set(weights) | set(base_weight)) / 2
+            rows.append(row)
+        return pd.DataFrame(rows).set_index("scenario")
+
+    @staticmethod
+    def portfolio_weights(result: dict) -> dict:
+        return {risk_type: dict(zip(portfolio_df['asset_id'], portfolio_df['weight'].astype(float)))
+                for risk_type, portfolio_df in result["new_portfolio_by_risk"].items()}
+
+    # 조합별 위험 유형별 최종 포트폴리오(long format)
+    def portfolio_table(self) -> pd.DataFrame:
+        frames = [portfolio_df.assign(scenario=i, risk_type=risk_type)
+                  for i, result in enumerate(self.results) if result is not None
+                  for risk_type, portfolio_df in result["new_portfolio_by_risk"].items()]
+        columns = ['scenario', 'risk_type', 'asset_class_symbol', 'asset_id', 'asset_name', 'weight']
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="screen/선정 기준값 조합별 RA 결과 비교")
+    parser.add_argument('--date', required=True)
+    parser.add_argument('--grid', required=True,
+                        help='기준값 grid JSON(예: \'{"MIN_CORRELATION": [0.7, 0.8], "MAX_WEIGHT": [25, 30]}\')')
+    parser.add_argument('--no-sync', action='store_true', help="원격과 동기화하지 않고 로컬 데이터만 사용")
+    parser.add_argument('--portfolios', default=None, help="조합별 포트폴리오를 저장할 csv 파일")
+    args = parser.parse_args()
+
+    sweep = ScenarioSweep(FrappeController(), args.date, json.loads(args.grid), sync=not args.no_sync)
+    print(sweep.run().round(3).to_string())
+    if args.portfolios:
+        sweep.portfolio_table().to_csv(args.portfolios, index=False)
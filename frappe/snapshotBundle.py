@@ -0,0 +1,224 @@
+import argparse
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import time
+
+from frappeController import FrappeController
+from localStore import LocalStore
+from logger import CustomLogger
+from sqlite_table import TABLES, create_tables
+
+logger = CustomLogger()
+
+# bundle 형식 버전(manifest 구조나 member 이름이 바뀌면 올림)
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+DB_NAME = "local.db.gz"
+# 파일을 읽고 쓰는 단위
+COPY_CHUNK = 1024 * 1024
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# table별 row 수와 최근 날짜(날짜 column이 있는 table만)
+def _table_summary(conn: sqlite3.Connection) -> dict:
+    tables = {}
+    for table in TABLES:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        summary = {"rows": conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]}
+        date_column = next((column for column in ('AsOfDate', 'date') if column in columns), None)
+        if date_column is not None:
+            summary["max_date"] = conn.execute(f"SELECT MAX({date_column}) FROM {table}").fetchone()[0]
+        tables[table] = summary
+    return tables
+
+
+# 로컬 db 전체(Trading, BM_price, 기준 정보 table, watermark)를 압축 bundle 하나로
+# sqlite backup API로 복사해서 내보내는 중에 동기화가 돌아도 한 시점의 데이터
+def export_bundle(local_store: LocalStore, path: str, compresslevel: int = 6) -> dict:
+    start = time.perf_counter()
+    work_dir = tempfile.mkdtemp(prefix="frappe_bundle_")
+    try:
+        db_file = os.path.join(work_dir, 'local.db')
+        with sqlite3.connect(db_file) as dst:
+            local_store.reader().backup(dst)
+            # 복사본은 WAL 없이 파일 하나로
+            dst.execute("PRAGMA journal_mode=DELETE")
+            tables = _table_summary(dst)
+            watermarks = dict(dst.execute("SELECT name, value FROM sync_watermark"))
+        dst.close()
+
+        gz_file = os.path.join(work_dir, DB_NAME)
+        with open(db_file, 'rb') as src, gzip.open(gz_file, 'wb', compresslevel=compresslevel) as gz:
+            shutil.copyfileobj(src, gz, COPY_CHUNK)
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+            "sqlite_version": sqlite3.sqlite_version,
+            "db_sha256": _file_sha256(db_file),
+            "db_bytes": os.path.getsize(db_file),
+            "gz_sha256": _file_sha256(gz_file),
+            "gz_bytes": os.path.getsize(gz_file),
+            "tables": tables,
+            "watermarks": watermarks,
+        }
+        manifest_bytes = json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8')
+
+        # 다 쓴 다음에 이름을 바꿔서 중간에 실패해도 반쯤 쓴 bundle이 남지 않게
+        tmp_path = f"{path}.tmp"
+        with tarfile.open(tmp_path, 'w') as tar:
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(manifest_bytes)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+            tar.add(gz_file, arcname=DB_NAME)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.log(f"bundle 내보내기 끝: {path} ({manifest['gz_bytes'] / 1024 / 1024:.1f}MB, "
+               f"{time.perf_counter() - start:.1f}초)")
+    return manifest
+
+
+def read_manifest(path: str) -> dict:
+    with tarfile.open(path, 'r') as tar:
+        return json.load(tar.extractfile(MANIFEST_NAME))
+
+
+# bundle의 db를 풀어서 checksum, row 수 확인(맞지 않으면 ValueError)
+def _extract_db(path: str, work_dir: str) -> (str, dict):
+    with tarfile.open(path, 'r') as tar:
+        manifest = json.load(tar.extractfile(MANIFEST_NAME))
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"지원하지 않는 bundle 형식입니다: {manifest.get('format')}")
+
+        gz_file = os.path.join(work_dir, DB_NAME)
+        with open(gz_file, 'wb') as f:
+            shutil.copyfileobj(tar.extractfile(DB_NAME), f, COPY_CHUNK)
+    if _file_sha256(gz_file) != manifest["gz_sha256"]:
+        raise ValueError(f"{path}: 압축 파일 checksum이 manifest와 다릅니다")
+
+    db_file = os.path.join(work_dir, 'local.db')
+    with gzip.open(gz_file, 'rb') as gz, open(db_file, 'wb') as f:
+        shutil.copyfileobj(gz, f, COPY_CHUNK)
+    os.remove(gz_file)
+    if _file_sha256(db_file) != manifest["db_sha256"]:
+        raise ValueError(f"{path}: db checksum이 manifest와 다릅니다")
+
+    with sqlite3.connect(db_file) as conn:
+        tables = _table_summary(conn)
+    conn.close()
+    mismatched = [table for table, summary in manifest["tables"].items()
+                  if tables.get(table, {}).get("rows") != summary["rows"]]
+    if mismatched:
+        raise ValueError(f"{path}: row 수가 manifest와 다른 table {mismatched}")
+    return db_file, manifest
+
+
+def _is_empty(local_store: LocalStore) -> bool:
+    return not any(local_store.execute(f"SELECT 1 FROM {table} LIMIT 1") for table in TABLES)
+
+
+# bundle을 로컬 db로 한 번에 불러오기
+# 빈 로컬 db면 backup API로 통째로 복사, 이미 데이터가 있으면 로컬 row/watermark를 남기고 없는 row만 추가
+# 이후 동기화는 가져온 데이터의 최근 날짜(watermark) 이후만 받음
+def import_bundle(local_store: LocalStore, path: str) -> dict:
+    start = time.perf_counter()
+    work_dir = tempfile.mkdtemp(prefix="frappe_bundle_")
+    try:
+        db_file, manifest = _extract_db(path, work_dir)
+
+        if _is_empty(local_store):
+            mode = "restore"
+            src = sqlite3.connect(db_file)
+            try:
+                with local_store.writer() as conn:
+                    src.backup(conn)
+                    # 예전 bundle에 없던 table/index
+                    create_tables(conn)
+            finally:
+                src.close()
+            inserted = {table: summary["rows"] for table, summary in manifest["tables"].items()}
+        else:
+            mode = "merge"
+            inserted = {}
+            # 예전 bundle이면 로컬 db와 같은 schema/migration으로 맞춘 다음에 합치기
+            with sqlite3.connect(db_file) as conn:
+                create_tables(conn)
+            conn.close()
+            with local_store.writer() as conn:
+                conn.execute("ATTACH DATABASE ? AS bundle", (db_file,))
+            try:
+                with local_store.writer() as conn:
+                    for table in manifest["tables"]:
+                        if table not in TABLES:
+                            continue
+                        bundle_columns = {row[1] for row in conn.execute(f"PRAGMA bundle.table_info({table})")}
+                        columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")
+                                            if row[1] in bundle_columns)
+                        inserted[table] = conn.execute(f"""
+                            INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM bundle.{table}
+                        """).rowcount
+            finally:
+                with local_store.writer() as conn:
+                    conn.execute("DETACH DATABASE bundle")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # 불러온 데이터와 캐시가 섞이지 않게
+    FrappeController.cache_fund_dict.clear()
+    FrappeController.cache_bm_price_dict.clear()
+
+    elapsed = time.perf_counter() - start
+    logger.log(f"bundle 불러오기 끝({mode}): {sum(inserted.values())} row, {elapsed:.1f}초")
+    return {"mode": mode, "rows": inserted, "seconds": elapsed,
+            "max_dates": {table: summary.get("max_date") for table, summary in manifest["tables"].items()}}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="로컬 db bundle 내보내기/불러오기(새 설치에서 전체 backfill 대신)")
+    parser.add_argument('--local-db', default=None, help="로컬 sqlite 파일(기본은 FrappeController 기본값)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="로컬 db를 bundle로")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--level', type=int, default=6, help="gzip 압축 수준(1-9)")
+
+    import_parser = subparsers.add_parser('import', help="bundle을 로컬 db로")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--sync-date', default=None, help="불러온 뒤 이 날짜까지 원격과 동기화(bundle 이후만)")
+
+    info_parser = subparsers.add_parser('info', help="bundle manifest 출력")
+    info_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(read_manifest(args.path), indent=2, ensure_ascii=False))
+    else:
+        controller = FrappeController(local_db_file=args.local_db)
+        if args.command == 'export':
+            manifest = export_bundle(controller.local_store, args.path, args.level)
+            print(json.dumps({key: manifest[key] for key in ("db_bytes", "gz_bytes", "tables")}, indent=2))
+        else:
+            print(json.dumps(import_bundle(controller.local_store, args.path), indent=2))
+            if args.sync_date is not None:
+                total_fund_df = controller.load_funds_info(controller.customer_db_adaptor, args.sync_date)
+                controller.dump_fund_trading_data(tuple(total_fund_df['asset_id']))
+                controller.dump_bm_price_data(tuple(controller.config["ASSET_CLASS_MAP"].values()))
+        controller.local_store.close()
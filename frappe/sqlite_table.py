@@ -2,29 +2,19 @@
 
 import sqlite3
 
-
-def create_connection(db_file):
-    conn = None
-    try:
-        conn = sqlite3.connect(db_file) # disk에 db file 만들어짐
-        # conn = sqlite3.connect(':memory:') # memory(RAM)에 db file 만들어짐
-        print(sqlite3.version)
-    except sqlite3.Error as e:
-        print(e)
-
-    cursor = conn.cursor()
-    bm_price_info = """
-        CREATE TABLE BM_price (
+TABLES = {
+    "BM_price": """
+        CREATE TABLE IF NOT EXISTS BM_price (
             AsOfDate DATE,
             Symbol VARCHAR,
             Price DECIMAL,
             IndexName VARCHAR,
             PRIMARY KEY (AsOfDate, Symbol)
         );
-    """
+    """,
 
-    trading = """
-        CREATE TABLE Trading (
+    "Trading": """
+        CREATE TABLE IF NOT EXISTS Trading (
             AsOfDate DATE ,
             Symbol VARCHAR,
             CompanyCode VARCHAR,
@@ -35,10 +25,146 @@ def create_connection(db_file):
             ShareClassAUM DECIMAL,
             PRIMARY KEY(AsOfDate, Symbol)
         );
-    """
+    """,
+
+    # 동기화할 때 새 row가 들어온 펀드만 다시 계산하는 성과 지표(수익률은 %)
+    "fund_metrics": """
+        CREATE TABLE IF NOT EXISTS fund_metrics (
+            Symbol VARCHAR,
+            AsOfDate DATE,
+            NAV DECIMAL,
+            AdjustedNAV DECIMAL,
+            AUM DECIMAL,
+            ShareClassAUM DECIMAL,
+            return_1m DECIMAL,
+            return_3m DECIMAL,
+            return_ytd DECIMAL,
+            return_1y DECIMAL,
+            return_3y DECIMAL,
+            return_104w DECIMAL,
+            volatility_1y DECIMAL,
+            PRIMARY KEY(Symbol, AsOfDate)
+        );
+    """,
+
+    # 원격 asset_info snapshot 복사본
+    "asset_info": """
+        CREATE TABLE IF NOT EXISTS asset_info (
+            date DATE,
+            asset_id VARCHAR,
+            asset_name VARCHAR,
+            risk_type_name VARCHAR,
+            asset_class_name VARCHAR,
+            asset_class_symbol VARCHAR,
+            investment_area_name VARCHAR,
+            fund_bm_name VARCHAR,
+            PRIMARY KEY(date, asset_id)
+        );
+    """,
+
+    # 원격에 있는 asset_info snapshot 날짜 목록(fetched: 로컬에 복사했는지)
+    "asset_info_dates": """
+        CREATE TABLE IF NOT EXISTS asset_info_dates (
+            date DATE PRIMARY KEY,
+            fetched INTEGER DEFAULT 0
+        );
+    """,
+
+    # 원격 기준 정보 복사본(Operation, Company, macro_score)
+    # Operation은 펀드 하나에 row가 여러 개일 수 있어서(종료된 row + 운용 중인 row) 원격 row를 그대로, 펀드 단위로 교체
+    "Operation": """
+        CREATE TABLE IF NOT EXISTS Operation (
+            Symbol VARCHAR,
+            Name VARCHAR,
+            InceptionDate DATE,
+            EndDate DATE
+        );
+    """,
+
+    "Company": """
+        CREATE TABLE IF NOT EXISTS Company (
+            Code VARCHAR PRIMARY KEY,
+            Name VARCHAR
+        );
+    """,
+
+    "macro_score": """
+        CREATE TABLE IF NOT EXISTS macro_score (
+            date DATE,
+            score_id VARCHAR,
+            score_value DECIMAL,
+            PRIMARY KEY(date, score_id)
+        );
+    """,
+
+    # 원격 데이터를 어디까지 확인했는지(이름별)
+    "sync_watermark": """
+        CREATE TABLE IF NOT EXISTS sync_watermark (
+            name VARCHAR PRIMARY KEY,
+            value VARCHAR,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """,
+}
+
+# 펀드별 조회가 대부분이라 Symbol 먼저인 index 추가
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_trading_symbol_date ON Trading (Symbol, AsOfDate);",
+    "CREATE INDEX IF NOT EXISTS idx_bm_price_symbol_date ON BM_price (Symbol, AsOfDate);",
+    "CREATE INDEX IF NOT EXISTS idx_fund_metrics_date ON fund_metrics (AsOfDate);",
+    "CREATE INDEX IF NOT EXISTS idx_operation_symbol ON Operation (Symbol);",
+]
+
+# 예전 동기화가 NULL을 문자열로 저장했을 수 있는 Trading column(원격 DECIMAL은 'None', float은 'nan')
+_TRADING_NULLABLE = ("CompanyCode", "NAV", "AUM", "NetAssets", "AdjustedNAV", "ShareClassAUM")
+
+# 이미 있는 로컬 db 고치기. 순서대로 한 번씩(PRAGMA user_version에 몇 번째까지 했는지), 뒤에만 추가
+MIGRATIONS = [
+    [
+        f"""
+        UPDATE Trading
+            SET {", ".join(f"{column} = CASE WHEN {column} IN ('None', 'nan') THEN NULL ELSE {column} END"
+                           for column in _TRADING_NULLABLE)}
+            WHERE 'None' IN ({", ".join(_TRADING_NULLABLE)}) OR 'nan' IN ({", ".join(_TRADING_NULLABLE)})
+        """,
+    ],
+    # Symbol이 PRIMARY KEY라 펀드당 row 하나만 남던 Operation은 비우고 다시 받기
+    [
+        "DROP TABLE Operation",
+        TABLES["Operation"],
+        "DELETE FROM sync_watermark WHERE name = 'Operation'",
+    ],
+]
+
+
+# 없는 table만 만들고, 아직 안 한 migration 실행
+def create_tables(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    for ddl in TABLES.values():
+        cursor.execute(ddl)
+
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for statements in MIGRATIONS[version:]:
+        for sql in statements:
+            cursor.execute(sql)
+    cursor.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+    # migration으로 다시 만든 table의 index도
+    for ddl in INDEXES:
+        cursor.execute(ddl)
+    conn.commit()
+
+
+def create_connection(db_file):
+    conn = None
+    try:
+        conn = sqlite3.connect(db_file) # disk에 db file 만들어짐
+        # conn = sqlite3.connect(':memory:') # memory(RAM)에 db file 만들어짐
+        print(sqlite3.version)
+    except sqlite3.Error as e:
+        print(e)
 
-    cursor.execute(bm_price_info)
-    cursor.execute(trading)
+    create_tables(conn)
 
     if conn:
         conn.close()
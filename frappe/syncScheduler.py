@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, wait
+
+from logger import CustomLogger
+
+logger = CustomLogger()
+
+# 우선순위(작을수록 먼저): 차트 클릭 > 지금 돌고 있는 RA 프로세스 > background 전체 갱신
+INTERACTIVE = 0
+PIPELINE = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PIPELINE: "pipeline", BACKGROUND: "background"}
+
+
+# 펀드 Trading 동기화 요청을 우선순위 queue로
+# symbol 하나씩 꺼내서 동기화하므로, 급한 요청은 이미 받고 있는 symbol만 기다리고 bulk 갱신 뒤에 줄 서지 않음
+# 이미 queue에 있거나 받고 있는 symbol은 같은 Future를 돌려줌(더 급한 요청이면 우선순위만 올림)
+class SyncScheduler:
+    def __init__(self, sync_func, workers: int = 2, name: str = "trading-sync"):
+        self.sync_func = sync_func  # symbol tuple을 받아서 동기화
+        self.workers = workers
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._heap = []  # (우선순위, 순번, symbol)
+        self._counter = itertools.count()
+        self._queued = {}  # symbol -> 지금 queue에서의 우선순위
+        self._futures = {}  # queue에 있거나 받고 있는 symbol -> Future
+        self._threads = []
+        self._closed = False
+        self.stats = {"submitted": 0, "deduplicated": 0, "promoted": 0, "synced": 0, "failed": 0}
+
+    # 동기화 요청. symbol -> Future(결과는 None, 실패하면 exception)
+    def submit(self, symbol_tuple: tuple, priority: int = PIPELINE) -> dict:
+        futures = {}
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} scheduler가 이미 종료되었습니다")
+            for symbol in dict.fromkeys(symbol_tuple):
+                self.stats["submitted"] += 1
+                future = self._futures.get(symbol)
+                if future is None:
+                    future = self._futures[symbol] = Future()
+                    self._push(symbol, priority)
+                else:
+                    self.stats["deduplicated"] += 1
+                    # 아직 queue에 있으면 더 급한 쪽으로(이전 항목은 꺼낼 때 건너뜀)
+                    if priority < self._queued.get(symbol, priority):
+                        self.stats["promoted"] += 1
+                        self._push(symbol, priority)
+                futures[symbol] = future
+            self._start_workers()
+            self._cond.notify_all()
+        return futures
+
+    # 요청하고 끝날 때까지 기다리기. 실패한 symbol이 있으면 첫 exception을 다시 올림
+    def sync(self, symbol_tuple: tuple, priority: int = PIPELINE, timeout: float = None):
+        futures = self.submit(symbol_tuple, priority)
+        done, not_done = wait(futures.values(), timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)}개 펀드 동기화가 {timeout}초 안에 끝나지 않았습니다")
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+
+    # 우선순위별 queue에 남은 symbol 수
+    def pending(self) -> dict:
+        with self._cond:
+            counts = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority in self._queued.values():
+                counts[PRIORITY_NAMES[priority]] += 1
+            return counts
+
+    def _push(self, symbol: str, priority: int):
+        self._queued[symbol] = priority
+        heapq.heappush(self._heap, (priority, next(self._counter), symbol))
+
+    def _start_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for i in range(len(self._threads), self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # 다음 symbol(우선순위가 올라가서 남은 이전 항목은 건너뜀). 종료되면 None
+    def _next(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    priority, _, symbol = heapq.heappop(self._heap)
+                    if self._queued.get(symbol) == priority:
+                        del self._queued[symbol]
+                        return symbol, priority
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            symbol, priority = item
+            future = self._futures[symbol]
+            try:
+                self.sync_func((symbol,))
+            except BaseException as e:  # dump 중 exit()도 기다리는 쪽에서 받게
+                logger.log_error(f"{symbol} 동기화 실패({PRIORITY_NAMES[priority]}): {e!r}")
+                with self._cond:
+                    self.stats["failed"] += 1
+                    del self._futures[symbol]
+                future.set_exception(e)
+            else:
+                with self._cond:
+                    self.stats["synced"] += 1
+                    del self._futures[symbol]
+                future.set_result(None)
+
+    # queue에 남은 요청은 취소하고 worker 종료
+    def shutdown(self, wait_workers: bool = True):
+        with self._cond:
+            self._closed = True
+            for symbol in list(self._queued):
+                self._futures.pop(symbol).cancel()
+            self._queued.clear()
+            self._heap.clear()
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait_workers:
+            for thread in threads:
+                thread.join()
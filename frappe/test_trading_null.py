@@ -0,0 +1,106 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import PricePanel
+from frappeController import DBAdaptor, FrappeController
+from fundMetrics import METRIC_COLUMNS, compute_metrics
+from localStore import LocalStore
+from sqlite_table import create_tables
+
+SYMBOL = "K55000000001"
+TRADING_COLUMNS = ["AsOfDate", "Symbol", "CompanyCode", "NAV", "AUM", "NetAssets", "AdjustedNAV", "ShareClassAUM"]
+ROWS = [
+    ("2021-08-04", SYMBOL, "C001", 1000.5, 5e9, 5e9, 1010.25, 5e9),
+    ("2021-08-05", SYMBOL, "C001", None, 5e9, None, 1011.5, 5e9),
+    ("2021-08-06", SYMBOL, "C001", 1002.0, 5.1e9, 5.1e9, 1012.0, 5.1e9),
+]
+
+
+# 원격 Trading에 NAV가 NULL인 row가 있는 펀드
+@pytest.fixture
+def controller(tmp_path):
+    remote = tmp_path / "blue.db"
+    with sqlite3.connect(remote) as conn:
+        conn.execute("""
+            CREATE TABLE Trading (AsOfDate DATE, Symbol VARCHAR, CompanyCode VARCHAR, NAV DECIMAL, AUM DECIMAL,
+                                  NetAssets DECIMAL, AdjustedNAV DECIMAL, ShareClassAUM DECIMAL)
+        """)
+        conn.executemany("INSERT INTO Trading VALUES (?, ?, ?, ?, ?, ?, ?, ?)", ROWS)
+    conn.close()
+
+    controller = FrappeController(local_db_file=str(tmp_path / "local.db"))
+    controller.price_db_adaptor = DBAdaptor(f"sqlite:///{remote}")
+    FrappeController.cache_fund_dict.pop(SYMBOL, None)
+    yield controller
+    FrappeController.cache_fund_dict.pop(SYMBOL, None)
+    controller.sync_scheduler.shutdown()
+    controller.price_db_adaptor.close()
+    controller.local_store.close()
+
+
+def test_null_nav_is_stored_as_null(controller):
+    controller.dump_fund_trading_data((SYMBOL,))
+    rows = controller.local_store.execute("SELECT NAV, NetAssets FROM Trading WHERE AsOfDate = '2021-08-05'")
+    assert rows == [(None, None)]
+
+
+def test_null_nav_reads_as_nan(controller):
+    controller.dump_fund_trading_data((SYMBOL,))
+    fund_trade_df = controller.get_fund_trade_df(SYMBOL, "2021-08-06")
+    assert fund_trade_df['NAV'].dtype == np.float64
+    assert np.isnan(fund_trade_df['NAV'].iloc[1])
+    assert fund_trade_df['AdjustedNAV'].tolist() == [1010.25, 1011.5, 1012.0]
+
+
+# 예전 동기화가 'None' 문자열로 저장한 row도 NaN으로 읽음
+def test_legacy_none_text_reads_as_nan(controller):
+    controller.dump_fund_trading_data((SYMBOL,))
+    with controller.local_store.writer() as conn:
+        conn.execute("UPDATE Trading SET NAV = 'None' WHERE AsOfDate = '2021-08-05'")
+
+    panel = PricePanel()
+    panel.load(controller.local_store, (SYMBOL,), "2021-08-06")
+    assert np.isnan(panel.frames[SYMBOL]['NAV'].iloc[1])
+    assert np.isnan(controller.get_fund_trade_df(SYMBOL, "2021-08-06")['NAV'].iloc[1])
+
+
+# 'None' 문자열이 들어 있는 예전 로컬 db는 처음 열 때 NULL로 고침
+def test_migration_clears_legacy_none_text(tmp_path):
+    db_file = str(tmp_path / "old.db")
+    with sqlite3.connect(db_file) as conn:
+        create_tables(conn)
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute("INSERT INTO Trading VALUES ('2021-08-05', ?, 'None', 'None', '5000000000.0', 'None', "
+                     "'1011.5', '5000000000.0')", (SYMBOL,))
+    conn.close()
+
+    local_store = LocalStore(db_file)
+    try:
+        assert local_store.execute("SELECT CompanyCode, NAV, NetAssets, AdjustedNAV FROM Trading") == \
+            [(None, None, None, 1011.5)]
+    finally:
+        local_store.close()
+
+
+def test_metrics_with_null_latest_values():
+    trade_df = pd.DataFrame(ROWS, columns=TRADING_COLUMNS)
+    trade_df.loc[2, ['NAV', 'AUM']] = [None, 'None']
+    row = dict(zip(METRIC_COLUMNS, compute_metrics(SYMBOL, trade_df)))
+    assert row['NAV'] is None and row['AUM'] is None
+    assert row['AdjustedNAV'] == 1012.0 and row['ShareClassAUM'] == 5.1e9
+
+
+# 예전 'None' 문자열이 있어도 동기화(지표 계산)가 끝나고 지표는 NULL
+def test_sync_with_legacy_none_text(controller):
+    controller.dump_fund_trading_data((SYMBOL,))
+    with controller.local_store.writer() as conn:
+        conn.execute("UPDATE Trading SET AdjustedNAV = 'None', ShareClassAUM = 'None' "
+                     "WHERE AsOfDate = '2021-08-06'")
+        conn.execute("DELETE FROM fund_metrics")
+
+    controller.refresh_fund_metrics((SYMBOL,))
+    rows = controller.local_store.execute("SELECT AdjustedNAV, ShareClassAUM, return_1m FROM fund_metrics")
+    assert rows == [(None, None, None)]
@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+
+# 정렬된 거래일 배열에서 searchsorted로 날짜 위치 찾기
+# df[df['AsOfDate'] <= date].iloc[-1] 처럼 전체를 훑고 복사하는 대신 O(log n)
+class DateIndex:
+    def __init__(self, dates):
+        self.dates = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[ns]')
+        if len(self.dates) > 1 and (self.dates[1:] < self.dates[:-1]).any():
+            raise ValueError("DateIndex: 날짜가 정렬되어 있지 않습니다.")
+
+    def __len__(self):
+        return len(self.dates)
+
+    @staticmethod
+    def _to_datetime64(date) -> np.datetime64:
+        return np.datetime64(pd.Timestamp(date), 'ns')
+
+    def date(self, pos: int) -> pd.Timestamp:
+        return pd.Timestamp(self.dates[pos])
+
+    # date 이하인 마지막 거래일 위치(없으면 -1)
+    def as_of(self, date) -> int:
+        return int(np.searchsorted(self.dates, self._to_datetime64(date), side='right')) - 1
+
+    # date 이상인 첫 거래일 위치(없으면 len)
+    def on_or_after(self, date) -> int:
+        return int(np.searchsorted(self.dates, self._to_datetime64(date), side='left'))
+
+    # start 이상 end 이하인 구간
+    def between(self, start, end) -> slice:
+        return slice(self.on_or_after(start), self.as_of(end) + 1)
+
+    # 기준일(기본은 마지막 거래일)에서 period 만큼 전 날짜. unit: days/weeks/months/years
+    def offset_date(self, unit: str, period: int, end=None) -> pd.Timestamp:
+        end = self.date(-1) if end is None else pd.Timestamp(end)
+        return end - relativedelta(**{unit: period})
+
+    # 기준일에서 period 만큼 전 날짜의 as-of 위치
+    def lookback(self, unit: str, period: int, end=None) -> int:
+        return self.as_of(self.offset_date(unit, period, end))
+
+    # 올해 첫날 기준 as-of 위치(작년 마지막 거래일)
+    def year_start(self, year: int = None) -> int:
+        year = datetime.datetime.now().year if year is None else year
+        return self.as_of(datetime.datetime(year, 1, 1))
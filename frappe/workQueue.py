@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from backtest import Backtest
+from frappeConfig import get_config
+from frappeController import FrappeController
+from logger import CustomLogger
+
+logger = CustomLogger()
+
+# 작업 중인 unit 파일 mtime을 이 간격으로 갱신
+HEARTBEAT_S = 30
+# mtime이 이보다 오래된 running unit은 죽은 worker 것으로 보고 다시 pending으로
+STALE_S = 300
+# 실패하면 이 횟수까지 다시 시도, 넘으면 failed
+MAX_ATTEMPTS = 3
+# 남은 unit을 다른 worker가 처리 중일 때 확인 간격
+POLL_S = 5
+
+
+def config_hash(config: dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+
+# 임시 파일에 쓰고 os.replace로 바꿔치기(읽는 쪽이 반쯤 쓴 파일을 보지 않게)
+def write_json(path: str, data: dict):
+    tmp = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+
+def read_json(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# (날짜, config) 단위 작업을 디렉토리 하나에 파일로 관리하는 queue
+# 상태는 pending/running/done/failed 디렉토리로 나누고, 가져가기는 pending -> running os.rename(한 worker만 성공)
+# 공유 파일시스템(NFS 등)이면 다른 머신의 worker도 같은 queue를 씀
+class WorkQueue:
+    STATES = ("pending", "running", "done", "failed")
+
+    def __init__(self, queue_dir: str):
+        self.queue_dir = queue_dir
+        for name in self.STATES + ("configs",):
+            os.makedirs(os.path.join(queue_dir, name), exist_ok=True)
+
+    def path(self, state: str, unit_id: str) -> str:
+        return os.path.join(self.queue_dir, state, f"{unit_id}.json")
+
+    def units(self, state: str) -> list:
+        return sorted(name[:-len(".json")] for name in os.listdir(os.path.join(self.queue_dir, state))
+                      if name.endswith(".json"))
+
+    @property
+    def meta(self) -> dict:
+        return read_json(os.path.join(self.queue_dir, "meta.json"))
+
+    def config(self, config_id: str) -> dict:
+        return read_json(self.path("configs", config_id))
+
+    # 백테스트 기간과 config 목록으로 unit 만들기(이미 있는 unit은 그대로 둬서 다시 돌려도 이어서)
+    def create(self, start_date: str, end_date: str, freq: str, dates: list, configs: list) -> int:
+        write_json(os.path.join(self.queue_dir, "meta.json"), {"start_date": start_date, "end_date": end_date,
+                                                               "freq": freq})
+        existing = {unit_id for state in self.STATES for unit_id in self.units(state)}
+
+        count = 0
+        for config in configs:
+            config_id = config_hash(config)
+            if not os.path.exists(self.path("configs", config_id)):
+                write_json(self.path("configs", config_id), config)
+            for date in dates:
+                unit_id = f"{date}_{config_id}"
+                if unit_id in existing:
+                    continue
+                write_json(self.path("pending", unit_id), {"id": unit_id, "date": date, "config": config_id,
+                                                           "attempts": 0})
+                count += 1
+        return count
+
+    # pending unit 하나 가져가기. 다른 worker가 먼저 rename하면 다음 unit으로
+    def claim(self, worker_id: str):
+        for unit_id in self.units("pending"):
+            running = self.path("running", unit_id)
+            try:
+                os.rename(self.path("pending", unit_id), running)
+            except FileNotFoundError:
+                continue
+            unit = read_json(running)
+            unit.update(attempts=unit["attempts"] + 1, worker=worker_id, claimed_at=time.time())
+            write_json(running, unit)
+            return unit
+        return None
+
+    def heartbeat(self, unit_id: str):
+        try:
+            os.utime(self.path("running", unit_id))
+        except FileNotFoundError:
+            pass
+
+    # heartbeat가 끊긴 running unit을 pending으로 되돌리기
+    def reclaim_stale(self, stale_s: float = STALE_S) -> int:
+        now = time.time()
+        count = 0
+        for unit_id in self.units("running"):
+            running = self.path("running", unit_id)
+            try:
+                if now - os.path.getmtime(running) < stale_s:
+                    continue
+                os.rename(running, self.path("pending", unit_id))
+            except FileNotFoundError:
+                continue
+            logger.log_warning(f"{unit_id} 작업 heartbeat 끊김, 다시 대기열로")
+            count += 1
+        return count
+
+    # 결과 저장(checkpoint)
+    def complete(self, unit: dict, result: dict):
+        write_json(self.path("done", unit["id"]), unit | {"result": result})
+        try:
+            os.remove(self.path("running", unit["id"]))
+        except FileNotFoundError:
+            pass
+
+    def fail(self, unit: dict, error: str, max_attempts: int = MAX_ATTEMPTS):
+        running = self.path("running", unit["id"])
+        unit = unit | {"error": error}
+        try:
+            if unit["attempts"] >= max_attempts:
+                write_json(self.path("failed", unit["id"]), unit)
+                os.remove(running)
+            else:
+                write_json(running, unit)
+                os.rename(running, self.path("pending", unit["id"]))
+        except FileNotFoundError:
+            pass
+
+    def status(self) -> dict:
+        return {state: len(self.units(state)) for state in self.STATES}
+
+    # config별 날짜별 결과
+    def results(self) -> dict:
+        results = {}
+        for unit_id in self.units("done"):
+            unit = read_json(self.path("done", unit_id))
+            results.setdefault(unit["config"], {})[unit["date"]] = unit["result"]
+        return results
+
+
+# queue에서 unit을 가져가 RA 프로세스를 돌리는 worker(프로세스 하나에 하나)
+class Worker:
+    def __init__(self, queue: WorkQueue, local_db_file: str = None, heartbeat_s: float = HEARTBEAT_S,
+                 stale_s: float = STALE_S, max_attempts: int = MAX_ATTEMPTS):
+        self.queue = queue
+        self.local_db_file = local_db_file
+        self.heartbeat_s = heartbeat_s
+        self.stale_s = stale_s
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.backtests = {}  # config id -> Backtest(가격 panel과 캐시를 config마다 재사용)
+
+    def backtest(self, config_id: str) -> Backtest:
+        backtest = self.backtests.get(config_id)
+        if backtest is None:
+            meta = self.queue.meta
+            controller = FrappeController(config=self.queue.config(config_id), local_db_file=self.local_db_file)
+            backtest = Backtest(controller, meta["start_date"], meta["end_date"], meta["freq"], sync=False)
+            self.backtests[config_id] = backtest
+        return backtest
+
+    def run_unit(self, unit: dict) -> dict:
+        started = time.perf_counter()
+        backtest = self.backtest(unit["config"])
+        portfolios = backtest.rebalance(unit["date"])
+        fund_df = backtest.controller.fund_df
+        return {
+            "portfolios": portfolios,
+            "weights": {risk_type: {asset_class: float(weight) for asset_class, weight in weight_dict.items()}
+                        for risk_type, weight_dict in fund_df["new_weight_by_risk"].items()},
+            "counts": {key: len(fund_df[key]) for key in ("selected_fund_df", "preselected_fund_df",
+                                                          "postselected_fund_df")},
+            "elapsed_s": time.perf_counter() - started,
+        }
+
+    def _heartbeat(self, unit_id: str, stop: threading.Event):
+        while not stop.wait(self.heartbeat_s):
+            self.queue.heartbeat(unit_id)
+
+    # 처리한 unit 수. wait면 다른 worker가 처리 중인 unit이 끝날 때까지(죽으면 가져오려고) 기다림
+    def run(self, wait: bool = True) -> int:
+        count = 0
+        while True:
+            unit = self.queue.claim(self.worker_id)
+            if unit is None:
+                if self.queue.reclaim_stale(self.stale_s):
+                    continue
+                if not wait or not self.queue.units("running"):
+                    break
+                time.sleep(POLL_S)
+                continue
+
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(unit["id"], stop), daemon=True)
+            heartbeat.start()
+            try:
+                result = self.run_unit(unit)
+            except Exception as e:
+                logger.log_error(f"{unit['id']} 작업 실패({unit['attempts']}번째): {e!r}")
+                self.queue.fail(unit, repr(e), self.max_attempts)
+            else:
+                self.queue.complete(unit, result)
+                count += 1
+            finally:
+                stop.set()
+                heartbeat.join()
+        logger.log(f"worker {self.worker_id}: {count}개 작업 완료")
+        return count
+
+
+def _work(queue_dir: str, local_db_file: str, stale_s: float, wait: bool) -> int:
+    return Worker(WorkQueue(queue_dir), local_db_file, stale_s=stale_s).run(wait)
+
+
+# 이 머신에서 worker 프로세스 여러 개 돌리기
+def run_workers(queue_dir: str, processes: int, local_db_file: str = None, stale_s: float = STALE_S,
+                wait: bool = True) -> int:
+    if processes <= 1:
+        return _work(queue_dir, local_db_file, stale_s, wait)
+    with multiprocessing.Pool(processes) as pool:
+        return sum(pool.starmap(_work, [(queue_dir, local_db_file, stale_s, wait)] * processes))
+
+
+# config별 위험 유형 성과 요약
+def report(queue: WorkQueue, local_db_file: str = None) -> dict:
+    meta = queue.meta
+    summaries = {}
+    for config_id, results in queue.results().items():
+        controller = FrappeController(config=queue.config(config_id), local_db_file=local_db_file)
+        backtest = Backtest(controller, meta["start_date"], meta["end_date"], meta["freq"], sync=False)
+        backtest.load_portfolios({date: result["portfolios"] for date, result in results.items()})
+        summaries[config_id] = backtest.summary()
+    return summaries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="(날짜, config) 단위 백테스트 작업 queue")
+    parser.add_argument('--queue', required=True, help="queue 디렉토리(여러 머신이면 공유 파일시스템)")
+    parser.add_argument('--local-db', default=None, help="로컬 sqlite 파일(기본은 FrappeController 기본값)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="작업 만들기(이미 있는 작업은 건너뜀)")
+    enqueue_parser.add_argument('--start', required=True)
+    enqueue_parser.add_argument('--end', required=True)
+    enqueue_parser.add_argument('--freq', default="B", help="pandas date_range freq(B: 매 영업일, M: 월말)")
+    enqueue_parser.add_argument('--config', nargs='+', default=[None], help="config.json 변형 파일들")
+    enqueue_parser.add_argument('--no-sync', action='store_true', help="원격과 동기화하지 않고 로컬 데이터만 사용")
+
+    work_parser = subparsers.add_parser('work', help="작업 처리")
+    work_parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    work_parser.add_argument('--stale-s', type=float, default=STALE_S)
+    work_parser.add_argument('--no-wait', action='store_true', help="남은 pending 작업이 없으면 바로 종료")
+
+    subparsers.add_parser('status', help="상태별 작업 수")
+    subparsers.add_parser('report', help="config별 성과 요약")
+    args = parser.parse_args()
+
+    work_queue = WorkQueue(args.queue)
+    if args.command == 'enqueue':
+        configs = [get_config(config_file) for config_file in args.config]
+        # 거래일과 로컬 데이터는 첫 config 기준으로 한 번
+        backtest = Backtest(FrappeController(config=configs[0], local_db_file=args.local_db), args.start, args.end,
+                            args.freq, sync=not args.no_sync)
+        backtest.sync_universe()
+        count = work_queue.create(args.start, args.end, args.freq, backtest.trading_dates(), configs)
+        print(f"{count}개 작업 추가: {work_queue.status()}")
+    elif args.command == 'work':
+        count = run_workers(args.queue, args.processes, args.local_db, args.stale_s, not args.no_wait)
+        print(f"{count}개 작업 완료: {work_queue.status()}")
+    elif args.command == 'status':
+        print(json.dumps(work_queue.status()))
+    elif args.command == 'report':
+        for config_id, summary in report(work_queue, args.local_db).items():
+            print(f"[{config_id}]")
+            print(summary.round(2).to_string())